@@ -92,7 +92,6 @@ def analyze_new_file(stats, our_lines):
 def diff_files(our_path, tracking_path):
   cmd = ['diff', '--unified=0', tracking_path, our_path]
   process = subprocess.Popen(cmd, stdout=subprocess.PIPE)
-  os.waitpid(process.pid, 1)
   output = process.communicate()[0]
   return output.splitlines()
 
@@ -7,13 +7,17 @@
 import argparse
 import collections
 import datetime
+import multiprocessing
 import os
 import re
 import sys
 
 from src.build import analyze_diffs
+from src.build import build_common
 from src.build import staging
 from src.build.util import color
+from src.build.util import concurrent
+from src.build.util import file_result_cache
 
 _DEFAULT_PATHS_TO_SCAN = ['src/', 'mods/', 'canned/scripts/can_android.py',
                           'canned/scripts']
@@ -87,68 +91,69 @@ _TODO_DETAIL_OWNERS = re.compile(r'\w+([,/]\w+)*$')
 
 _MAX_TODO_AGE = datetime.timedelta(days=30)
 
-
-class Analyzer(object):
-  def __init__(self, child):
-    self._child = child
-    self._child.set_root(self)
-
-  def parse(self, file_path):
-    self.current_path = file_path
-    self._stop = False
-    with open(file_path, 'r') as source_file:
-      for index, line in enumerate(source_file):
-        self.current_line = index + 1
-        self._child.handle_line(line)
-        if self._stop:
-          return
-
-  def stop_parse(self):
-    self._stop = True
-
-
-class AnalyzeFileLevelMetadata(object):
-  def __init__(self):
-    self.file_track_path = None
-    self.has_file_ignore_tag = False
-    self.has_file_track_tag = False
-    self._root = None
-
-  def set_root(self, root):
-    self._root = root
-
-  def handle_line(self, line):
-    if analyze_diffs.FILE_IGNORE_TAG in line:
-      self.has_file_ignore_tag = True
-      self._root.stop_parse()
-
-    match = _FILE_TRACK_PATTERN.search(line)
-    if match:
-      tracking_path = match.group(1)
-      self.has_file_track_tag = True
-      self.file_track_path = tracking_path
-      self._root.stop_parse()
-
-
-class AnalyzeCodeInMODRegions(object):
-  def __init__(self, child):
-    self._root = None
-    self._child = child
-    self._in_mod_region = False
-
-  def set_root(self, root):
-    self._root = root
-    self._child.set_root(root)
-
-  def handle_line(self, line):
-    if analyze_diffs.REGION_START_TAG in line:
-      assert not self._in_mod_region
-      self._in_mod_region = True
-    elif analyze_diffs.REGION_END_TAG in line:
-      assert self._in_mod_region
-      self._in_mod_region = False
-    elif self._in_mod_region:
-      self._child.handle_line(line)
+_CACHE_FILE = os.path.join(build_common.OUT_DIR, 'analyze_todos_cache.pickle')
+_CACHE_VERSION = 1
+
+# The number of files each task of the process pool scans.
+_SCAN_CHUNK_SIZE = 64
+
+
+def _scan_file(path):
+  """Scans a file in one pass for its file-level metadata and TODO lines.
+
+  Whether only the TODOs in MOD regions count depends on whether the tracking
+  file exists, which may change without the file being changed. So the scan
+  records for each TODO line whether it is in a MOD region, and leaves the
+  check to _report_file.
+
+  Returns:
+      A dict with the file-level metadata, the TODO lines, and the first error
+      in the MOD region tags, if any.
+  """
+  has_file_ignore_tag = False
+  file_track_path = None
+  in_mod_region = False
+  mod_region_error = None
+  todo_lines = []
+  with open(path, 'r') as source_file:
+    for index, line in enumerate(source_file):
+      line_number = index + 1
+      # Only the first file-level tag counts.
+      if file_track_path is None:
+        if analyze_diffs.FILE_IGNORE_TAG in line:
+          has_file_ignore_tag = True
+          break
+        match = _FILE_TRACK_PATTERN.search(line)
+        if match:
+          file_track_path = match.group(1)
+
+      is_region_start = analyze_diffs.REGION_START_TAG in line
+      is_region_end = (not is_region_start and
+                       analyze_diffs.REGION_END_TAG in line)
+      # _OTHER_TODO_PATTERN matches any line _EXPECTED_TODO_PATTERN does.
+      if _OTHER_TODO_PATTERN.search(line):
+        todo_lines.append((line_number, line, in_mod_region and
+                           not is_region_start and not is_region_end))
+      if is_region_start:
+        if in_mod_region and mod_region_error is None:
+          mod_region_error = 'line %d: Nested MOD region' % line_number
+        in_mod_region = True
+      elif is_region_end:
+        if not in_mod_region and mod_region_error is None:
+          mod_region_error = ('line %d: MOD region end without start' %
+                              line_number)
+        in_mod_region = False
+
+  return {
+      'has_file_ignore_tag': has_file_ignore_tag,
+      'file_track_path': file_track_path,
+      'todo_lines': todo_lines,
+      'mod_region_error': mod_region_error,
+  }
+
+
+def _scan_files(paths):
+  return [_scan_file(path) for path in paths]
 
 
 def as_date(value):
@@ -170,67 +175,83 @@ class Todo(object):
     return "%s %s" % (self.__class__.__name__, self.__dict__)
 
 
-class AnalyzeTodos(object):
-  def __init__(self, reporter):
-    self._reporter = reporter
-    self._root = None
-
-  def set_root(self, root):
-    self._root = root
-
-  def _extract_detail_metadata(self, todo_metadata, details):
-    match = _TODO_DETAIL_BUG.match(details)
-    if match:
-      todo_metadata['bug'] = match.group(1)
-    elif _TODO_DETAIL_DATE.match(details):
-      try:
-        todo_metadata['created_timestamp'] = as_date(details)
-      except ValueError:
-        todo_metadata['is_nonstandard'] = True
-    elif _TODO_DETAIL_OWNERS.match(details):
-      owners = _TODO_DETAIL_OWNERS_LIST_SPLIT.split(details)
-      if owners[0] != 'crbug':  # Watch out for malformed crbug urls
-        todo_metadata['owners'] = owners
-
-  def handle_line(self, line):
-    todo_metadata = {}
-
-    match = _EXPECTED_TODO_PATTERN.search(line)
-    if match:
-      details = match.group(1)
-      self._extract_detail_metadata(todo_metadata, details)
-      if not todo_metadata:
-        todo_metadata['is_nonstandard'] = True
-    elif _OTHER_TODO_PATTERN.search(line):
+def _extract_detail_metadata(todo_metadata, details):
+  match = _TODO_DETAIL_BUG.match(details)
+  if match:
+    todo_metadata['bug'] = match.group(1)
+  elif _TODO_DETAIL_DATE.match(details):
+    try:
+      todo_metadata['created_timestamp'] = as_date(details)
+    except ValueError:
       todo_metadata['is_nonstandard'] = True
+  elif _TODO_DETAIL_OWNERS.match(details):
+    owners = _TODO_DETAIL_OWNERS_LIST_SPLIT.split(details)
+    if owners[0] != 'crbug':  # Watch out for malformed crbug urls
+      todo_metadata['owners'] = owners
 
-    if todo_metadata:
-      self._reporter.report_todo(
-          Todo(self._root.current_path, self._root.current_line, line,
-               **todo_metadata))
 
+def _parse_todo(source_path, source_line, line):
+  """Returns the Todo on the line, or None if it has no TODO."""
+  todo_metadata = {}
 
-def _analyze_file(path, reporter):
-  if os.path.abspath(path) == os.path.abspath(__file__):
-    return
+  match = _EXPECTED_TODO_PATTERN.search(line)
+  if match:
+    details = match.group(1)
+    _extract_detail_metadata(todo_metadata, details)
+    if not todo_metadata:
+      todo_metadata['is_nonstandard'] = True
+  elif _OTHER_TODO_PATTERN.search(line):
+    todo_metadata['is_nonstandard'] = True
 
-  tracking_path = staging.get_default_tracking_path(path)
-  metadata = AnalyzeFileLevelMetadata()
-  Analyzer(metadata).parse(path)
+  if not todo_metadata:
+    return None
+  return Todo(source_path, source_line, line, **todo_metadata)
 
-  if metadata.has_file_ignore_tag:
+
+def _report_file(path, scan_result, reporter):
+  if scan_result['has_file_ignore_tag']:
     reporter.report_skipping(path)
     return
 
-  if metadata.has_file_track_tag:
-    tracking_path = metadata.file_track_path
-
+  tracking_path = (scan_result['file_track_path'] or
+                   staging.get_default_tracking_path(path))
   has_tracked_file = tracking_path and os.path.exists(tracking_path)
-
-  analyzer = AnalyzeTodos(reporter)
   if has_tracked_file:
-    analyzer = AnalyzeCodeInMODRegions(analyzer)
-  Analyzer(analyzer).parse(path)
+    assert not scan_result['mod_region_error'], '%s: %s' % (
+        path, scan_result['mod_region_error'])
+
+  for line_number, line, in_mod_region in scan_result['todo_lines']:
+    if has_tracked_file and not in_mod_region:
+      continue
+    todo = _parse_todo(path, line_number, line)
+    if todo:
+      reporter.report_todo(todo)
+
+
+def _scan_files_in_parallel(paths, jobs):
+  """Scans the files in parallel.
+
+  Args:
+      paths: The paths of the files to scan.
+      jobs: The number of processes to scan with, or 0 to scan in this
+          process.
+
+  Returns:
+      A list of the scan results of |paths|, in the same order.
+  """
+  if jobs == 0:
+    executor = concurrent.SynchronousExecutor()
+  else:
+    executor = concurrent.ProcessPoolExecutor(max_workers=jobs)
+  with executor:
+    # Scanning a file takes much less time than passing it to a worker
+    # process, so the files are passed in chunks.
+    futures = [executor.submit(_scan_files, paths[i:i + _SCAN_CHUNK_SIZE])
+               for i in xrange(0, len(paths), _SCAN_CHUNK_SIZE)]
+    results = []
+    for future in futures:
+      results.extend(future.result())
+  return results
 
 
 def _all_source_code_files(paths):
@@ -245,6 +266,15 @@ def _all_source_code_files(paths):
             yield os.path.join(root, name)
 
 
+def _analyze_files(paths, reporter, cache, jobs):
+  this_file = os.path.abspath(__file__)
+  paths = [path for path in paths if os.path.abspath(path) != this_file]
+  scan_results = cache.get_all(
+      paths, lambda stale_paths: _scan_files_in_parallel(stale_paths, jobs))
+  for path, scan_result in zip(paths, scan_results):
+    _report_file(path, scan_result, reporter)
+
+
 class TodoReporter(object):
   def __init__(self, filter=None):
     self._bugs = []
@@ -428,12 +458,21 @@ def main():
       '-q', dest='query', action=StoreQueryAction, default=QueryMatchAny(),
       help=('What to match when finding TODOs, such as a bug number,'
             'a bit of text, or a filter date'))
+  parser.add_argument(
+      '-j', '--jobs', type=int, default=multiprocessing.cpu_count(),
+      help='The number of processes to scan files with. 0 scans in process.')
+  parser.add_argument(
+      '--no-cache', action='store_true',
+      help='Scan all the files, without reading or writing the cache.')
 
   args = parser.parse_args()
 
   reporter = TodoReporter(filter=args.query)
-  for file_path in _all_source_code_files(_DEFAULT_PATHS_TO_SCAN):
-    _analyze_file(file_path, reporter)
+  cache = file_result_cache.FileResultCache(
+      None if args.no_cache else _CACHE_FILE, _CACHE_VERSION)
+  _analyze_files(list(_all_source_code_files(_DEFAULT_PATHS_TO_SCAN)),
+                 reporter, cache, args.jobs)
+  cache.save()
 
   output_calls = []
 
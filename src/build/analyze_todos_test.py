@@ -0,0 +1,134 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.build import analyze_diffs
+from src.build import analyze_todos
+from src.build.util import file_result_cache
+
+
+class _Reporter(analyze_todos.TodoReporter):
+  def __init__(self):
+    super(_Reporter, self).__init__(filter=analyze_todos.QueryMatchAny())
+
+  def get_todos(self):
+    return [(os.path.basename(todo.source_path), todo.source_line,
+             todo.bug, todo.owners, todo.is_nonstandard,
+             todo.created_timestamp is not None) for todo in self._todos]
+
+  def get_skipped_paths(self):
+    return [os.path.basename(path) for path in self._skipped_paths]
+
+
+class AnalyzeTodosTest(unittest.TestCase):
+  def setUp(self):
+    # The paths in the tracking tags must not look like TODOs.
+    self._tmpdir = tempfile.mkdtemp(prefix='analyze_test')
+    self._srcdir = os.path.join(self._tmpdir, 'src')
+    os.mkdir(self._srcdir)
+    self._cache_path = os.path.join(self._tmpdir, 'out', 'cache.pickle')
+    self._tracking_path = self._write('tracking', '')
+    self._write('plain', '\n'.join([
+        '# TODO(crbug.com/123): Fix.',
+        '# TODO(alice,bob): Tidy.',
+        '# TODO(2013/09/19): Old.',
+        '# TODO(2013/02/31): Not a date.',
+        '# TODO(crbug.com/abc): Malformed.',
+        '# todo: Nonstandard.',
+        'x = 1',
+        '']))
+    self._write('ignored', '# TODO(alice): Ignored.\n%s\n' %
+                analyze_diffs.FILE_IGNORE_TAG)
+    # Only the TODOs in the MOD regions are reported for a tracked file, even
+    # when the tracking tag follows the TODOs.
+    self._write('tracked', '\n'.join([
+        '# TODO(alice): Not in a MOD region.',
+        analyze_diffs.REGION_START_TAG + ' TODO(alice): On the tag.',
+        '# TODO(bob): In a MOD region.',
+        analyze_diffs.REGION_END_TAG,
+        '%s "%s"' % (analyze_diffs.FILE_TRACK_TAG, self._tracking_path),
+        '']))
+    self._write('untracked', '\n'.join([
+        '%s "%s"' % (analyze_diffs.FILE_TRACK_TAG,
+                     os.path.join(self._tmpdir, 'nonexistent')),
+        analyze_diffs.REGION_START_TAG,
+        '# TODO(alice): Reported.',
+        '# TODO(bob): Also reported.',
+        '']))
+
+  def tearDown(self):
+    shutil.rmtree(self._tmpdir)
+
+  def _write(self, name, content):
+    path = os.path.join(self._srcdir, name)
+    with open(path, 'w') as f:
+      f.write(content)
+    return path
+
+  def _analyze(self, jobs=0):
+    """Analyzes the files with the cache on disk.
+
+    Returns:
+        The reporter, and the number of files scanned.
+    """
+    reporter = _Reporter()
+    cache = file_result_cache.FileResultCache(
+        self._cache_path, analyze_todos._CACHE_VERSION)
+    paths = sorted(analyze_todos._all_source_code_files([self._srcdir]))
+    analyze_todos._analyze_files(paths, reporter, cache, jobs)
+    cache.save()
+    return reporter, cache.computed_count
+
+  def test_analyze(self):
+    reporter, _ = self._analyze()
+    self.assertEquals(['ignored'], reporter.get_skipped_paths())
+    self.assertEquals([
+        ('plain', 1, '123', None, False, False),
+        ('plain', 2, None, ['alice', 'bob'], False, False),
+        ('plain', 3, None, None, False, True),
+        ('plain', 4, None, None, True, False),
+        ('plain', 5, None, None, True, False),
+        ('plain', 6, None, None, True, False),
+        ('tracked', 3, None, ['bob'], False, False),
+        ('untracked', 3, None, ['alice'], False, False),
+        ('untracked', 4, None, ['bob'], False, False),
+    ], reporter.get_todos())
+
+  def test_parallel(self):
+    reporter, _ = self._analyze()
+    os.remove(self._cache_path)
+    parallel_reporter, _ = self._analyze(jobs=2)
+    self.assertEquals(reporter.get_todos(), parallel_reporter.get_todos())
+    self.assertEquals(reporter.get_skipped_paths(),
+                      parallel_reporter.get_skipped_paths())
+
+  def test_cache(self):
+    reporter, scanned_count = self._analyze()
+    self.assertEquals(5, scanned_count)
+    cached_reporter, scanned_count = self._analyze()
+    self.assertEquals(0, scanned_count)
+    self.assertEquals(reporter.get_todos(), cached_reporter.get_todos())
+
+    # Only the updated file is scanned again.
+    self._write('plain', '# TODO(carol): New.\n')
+    reporter, scanned_count = self._analyze()
+    self.assertEquals(1, scanned_count)
+    self.assertEquals(('plain', 1, None, ['carol'], False, False),
+                      reporter.get_todos()[0])
+
+    # The tracking file is looked up again even if the file is not updated.
+    os.remove(self._tracking_path)
+    reporter, scanned_count = self._analyze()
+    self.assertEquals(0, scanned_count)
+    self.assertEquals(
+        [1, 2, 3], [todo[1] for todo in reporter.get_todos()
+                    if todo[0] == 'tracked'])
+
+
+if __name__ == '__main__':
+  unittest.main()
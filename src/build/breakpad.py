@@ -12,6 +12,7 @@ import os
 import re
 import subprocess
 import sys
+import tempfile
 
 from src.build import build_common
 from src.build import toolchain
@@ -26,14 +27,26 @@ _MINIDUMP_DUMP_TOOL = toolchain.get_nacl_tool('minidump_dump')
 _MINIDUMP_STACKWALK_TOOL = toolchain.get_nacl_tool('minidump_stackwalk')
 _SYMBOL_OUT_DIR = 'out/symbols'
 
+_HASH_CHUNK_SIZE = 1024 * 1024
+
 
 def _get_symbol_marker(path):
+  """Returns the marker path for the content of the binary at |path|.
+
+  The marker is keyed on the content hash, so a rebuilt binary gets a new
+  marker even if its path is unchanged.
+  """
   sha1 = hashlib.sha1()
-  with open(path) as f:
-    sha1.update(f.read())
+  with open(path, 'rb') as f:
+    for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), ''):
+      sha1.update(chunk)
   return os.path.join(_SYMBOL_OUT_DIR, 'hash', sha1.hexdigest())
 
 
+def _get_dump_syms_tool():
+  return build_common.get_build_path_for_executable('dump_syms', is_host=True)
+
+
 class _DumpSymsFilter(concurrent_subprocess.OutputHandler):
   _WARNING_RE = re.compile('|'.join([
       # TODO(crbug.com/468597): Figure out if these are benign.
@@ -64,18 +77,21 @@ class _DumpSymsFilter(concurrent_subprocess.OutputHandler):
       # C++ names.
       r".*: warning: failed to demangle .* with error -2"]))
 
-  def __init__(self):
-    """Generate a filter that will filter warnings and also allow stdout
-    result to be obtained as |stdout_result|.
+  def __init__(self, output_file):
+    """Generate a filter that will filter warnings and also write stdout
+    to |output_file|. The first line of stdout is kept as |module_line|.
     """
     super(_DumpSymsFilter, self).__init__()
-    self.stdout_result = []
+    self._output_file = output_file
+    self.module_line = None
 
   def _has_warning(self, line):
     return self._WARNING_RE.match(line) is not None
 
   def handle_stdout(self, line):
-    self.stdout_result.append(line)
+    if self.module_line is None:
+      self.module_line = line
+    self._output_file.write(line)
 
   def handle_stderr(self, line):
     if not self._has_warning(line):
@@ -91,21 +107,34 @@ def _extract_symbols_from_one_binary(binary):
     return
 
   logging.info('Extracting symbols from: %s' % binary)
-  dump_syms_tool = build_common.get_build_path_for_executable(
-      'dump_syms', is_host=True)
-  p = concurrent_subprocess.Popen([dump_syms_tool, binary])
-  my_filter = _DumpSymsFilter()
-  p.handle_output(my_filter)
-  syms = ''.join(my_filter.stdout_result)
-  # The first line should look like:
-  # MODULE Linux arm 0222CE01F27D6870B1FA991F84B9E0460 libc.so
-  symhash = syms.splitlines()[0].split()[3]
+  dump_syms_tool = _get_dump_syms_tool()
   base = os.path.basename(binary)
-  sympath = os.path.join(_SYMBOL_OUT_DIR, base, symhash, base + '.sym')
-  file_util.makedirs_safely(os.path.dirname(sympath))
-
-  with open(sympath, 'w') as f:
-    f.write(syms)
+  # Stream the symbols to a temporary file, which is renamed once the
+  # destination is known from the MODULE line, so that an interrupted run
+  # does not leave a truncated symbol file.
+  file_util.makedirs_safely(_SYMBOL_OUT_DIR)
+  temp_path = None
+  try:
+    with tempfile.NamedTemporaryFile(
+        dir=_SYMBOL_OUT_DIR, prefix=base + '.', suffix='.tmp',
+        delete=False) as f:
+      temp_path = f.name
+      p = concurrent_subprocess.Popen([dump_syms_tool, binary])
+      my_filter = _DumpSymsFilter(f)
+      returncode = p.handle_output(my_filter)
+    if returncode:
+      raise subprocess.CalledProcessError(
+          returncode, ' '.join([dump_syms_tool, binary]))
+    # The first line should look like:
+    # MODULE Linux arm 0222CE01F27D6870B1FA991F84B9E0460 libc.so
+    symhash = my_filter.module_line.split()[3]
+    sympath = os.path.join(_SYMBOL_OUT_DIR, base, symhash, base + '.sym')
+    file_util.makedirs_safely(os.path.dirname(sympath))
+    os.rename(temp_path, sympath)
+    temp_path = None
+  finally:
+    if temp_path:
+      file_util.remove_file_force(temp_path)
 
   # Create the marker directory so we will not need to extract symbols
   # in the next time.
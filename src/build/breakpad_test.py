@@ -0,0 +1,105 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import stat
+import subprocess
+import tempfile
+import unittest
+
+import mock
+
+from src.build import breakpad
+
+# Outputs a MODULE line whose id is derived from the content of the binary,
+# as the real dump_syms does with the build-id, and records each run.
+_FAKE_DUMP_SYMS = """#!/bin/sh
+echo run >> "$(dirname "$0")/runs"
+echo "MODULE Linux arm $(md5sum < "$1" | cut -c1-32) $(basename "$1")"
+cat "$1"
+"""
+
+
+class BreakpadTest(unittest.TestCase):
+  def setUp(self):
+    self._tmpdir = tempfile.mkdtemp(prefix='breakpad_test')
+    self._symbol_dir = os.path.join(self._tmpdir, 'symbols')
+    self._tool_dir = os.path.join(self._tmpdir, 'tool')
+    os.mkdir(self._tool_dir)
+    dump_syms = os.path.join(self._tool_dir, 'dump_syms')
+    with open(dump_syms, 'w') as f:
+      f.write(_FAKE_DUMP_SYMS)
+    os.chmod(dump_syms, stat.S_IRWXU)
+
+    patchers = [
+        mock.patch.object(breakpad, '_SYMBOL_OUT_DIR', self._symbol_dir),
+        mock.patch.object(breakpad, '_get_dump_syms_tool',
+                          return_value=dump_syms)]
+    for patcher in patchers:
+      patcher.start()
+      self.addCleanup(patcher.stop)
+
+  def tearDown(self):
+    shutil.rmtree(self._tmpdir)
+
+  def _get_run_count(self):
+    path = os.path.join(self._tool_dir, 'runs')
+    if not os.path.exists(path):
+      return 0
+    with open(path) as f:
+      return len(f.readlines())
+
+  def _build(self, content):
+    binary = os.path.join(self._tmpdir, 'libfoo.so')
+    with open(binary, 'w') as f:
+      f.write(content)
+    return binary
+
+  def _read_symbols(self):
+    """Returns a dict from the module id to the content of the symbol file."""
+    module_dir = os.path.join(self._symbol_dir, 'libfoo.so')
+    result = {}
+    for module_id in os.listdir(module_dir):
+      with open(os.path.join(module_dir, module_id, 'libfoo.so.sym')) as f:
+        result[module_id] = f.read()
+    return result
+
+  def test_unchanged_binary(self):
+    binary = self._build('code\n')
+    breakpad._extract_symbols_from_one_binary(binary)
+    self.assertEquals(1, self._get_run_count())
+    breakpad._extract_symbols_from_one_binary(binary)
+    self.assertEquals(1, self._get_run_count())
+
+  def test_rebuilt_binary(self):
+    binary = self._build('code\n')
+    breakpad._extract_symbols_from_one_binary(binary)
+    old_symbols = self._read_symbols()
+    self.assertEquals(1, len(old_symbols))
+    self.assertTrue(old_symbols.values()[0].endswith('\ncode\n'))
+
+    self._build('new code\n')
+    breakpad._extract_symbols_from_one_binary(binary)
+    self.assertEquals(2, self._get_run_count())
+    new_symbols = self._read_symbols()
+    self.assertEquals(2, len(new_symbols))
+    module_id = (set(new_symbols) - set(old_symbols)).pop()
+    self.assertTrue(new_symbols[module_id].endswith('\nnew code\n'))
+    # No temporary file is left.
+    self.assertEquals(['hash', 'libfoo.so'], sorted(
+        os.listdir(self._symbol_dir)))
+
+  def test_failure(self):
+    binary = self._build('code\n')
+    with open(os.path.join(self._tool_dir, 'dump_syms'), 'a') as f:
+      f.write('exit 1\n')
+    with self.assertRaises(subprocess.CalledProcessError):
+      breakpad._extract_symbols_from_one_binary(binary)
+    # Neither a partial symbol file nor the marker is left.
+    self.assertEquals([], os.listdir(self._symbol_dir))
+
+
+if __name__ == '__main__':
+  unittest.main()
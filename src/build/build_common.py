@@ -18,6 +18,7 @@ import sys
 import time
 import urllib2
 
+from src.build import configure_profiler
 from src.build import dependency_inspection
 from src.build.build_options import OPTIONS
 from src.build.util import platform_util
@@ -137,6 +138,10 @@ def get_staging_root():
   return os.path.join(OUT_DIR, 'staging')
 
 
+def get_staging_manifest_file():
+  return os.path.join(OUT_DIR, 'staging_manifest')
+
+
 def get_data_root_dir():
   return os.path.join(OUT_DIR, 'data_roots')
 
@@ -591,6 +596,14 @@ def get_config_cache_dir():
   return os.path.join(get_build_dir(), 'config_cache')
 
 
+def get_configure_trace_file():
+  return os.path.join(get_build_dir(), 'configure_trace.json')
+
+
+def get_configure_server_socket_file():
+  return os.path.join(get_build_dir(), 'configure_server.sock')
+
+
 def get_integration_test_list_dir():
   return os.path.join(get_target_common_dir(), 'integration_test')
 
@@ -876,11 +889,13 @@ def find_all_files(base_paths, suffixes=None, include_tests=False,
         listing_roots, matcher, root, recursive)
 
   result = []
-  for listing_root in listing_roots:
-    for file_path in _enumerate_files(listing_root, recursive):
-      result_path = _maybe_relpath(file_path, root)
-      if matcher.match(result_path):
-        result.append(result_path)
+  with configure_profiler.span('find_all_files', 'listing',
+                               base_paths=as_list(base_paths)):
+    for listing_root in listing_roots:
+      for file_path in _enumerate_files(listing_root, recursive):
+        result_path = _maybe_relpath(file_path, root)
+        if matcher.match(result_path):
+          result.append(result_path)
   # For debugging/diffing purposes, sort the file list.
   return sorted(result)
 
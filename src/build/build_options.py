@@ -6,12 +6,15 @@
 
 import argparse
 import atexit
+import marshal
 import os
+import re
 import subprocess
 import sys
 import time
 
 from src.build.util import download_package_util_flags
+from src.build.util import file_util
 
 # --target=
 _TARGET_NACL_I686 = 'nacl_i686'
@@ -103,6 +106,13 @@ _ALLOWED_WARNING_LEVEL = ['all',
                           'yes',  # all except -Wunused-*.
                           'no']
 
+# The parsed options are saved next to the options file with this suffix, so
+# that parse_configure_file() does not need to run argparse again.
+_PARSE_SNAPSHOT_SUFFIX = '.snapshot'
+# Bump this when the parsed state of _Options is changed, e.g. when a new
+# instance variable is set in parse().
+_PARSE_SNAPSHOT_VERSION = 1
+
 
 class _Options(object):
 
@@ -360,6 +370,12 @@ class _Options(object):
     parser.add_argument('--enable-binder', action='store_true',
                         help='Enable Binder calls for all services.')
 
+    parser.add_argument('--enable-configure-profiling', action='store_true',
+                        help='Record the time spent in each config.py task, '
+                        'make run, directory listing and config cache access '
+                        'during configure, and write it as a Chrome trace '
+                        'file. A summary is printed at the end.')
+
     parser.add_argument('--enable-jemalloc-debug', action='store_true',
                         help='Enable jemalloc debug mode.  This fills all '
                         'memory returned from malloc() and all memory passed '
@@ -594,6 +610,65 @@ class _Options(object):
     if new_configuration_options != old_configuration_options:
       with open(options_file, 'w') as f:
         f.write(new_configuration_options)
+    self._write_parse_snapshot(options_file)
+
+  @staticmethod
+  def _get_parse_snapshot_file(options_file):
+    return options_file + _PARSE_SNAPSHOT_SUFFIX
+
+  @staticmethod
+  def _get_parser_mtimes():
+    # The snapshot also needs to be invalidated when the parser is updated.
+    return [os.stat(re.sub(r'\.pyc$', '.py', module.__file__)).st_mtime
+            for module in (sys.modules[__name__],
+                           download_package_util_flags)]
+
+  def _write_parse_snapshot(self, options_file):
+    """Saves the parsed options, keyed by the stat of |options_file|."""
+    try:
+      st = os.stat(options_file)
+      snapshot = {
+          'version': _PARSE_SNAPSHOT_VERSION,
+          'size': st.st_size,
+          'mtime': st.st_mtime,
+          'parser_mtimes': _Options._get_parser_mtimes(),
+          'values': self._values,
+          'loggers': self._loggers,
+          'show_warnings': getattr(self, '_show_warnings', None),
+          'system_packages': self._system_packages,
+      }
+      file_util.write_atomically(
+          _Options._get_parse_snapshot_file(options_file),
+          marshal.dumps(snapshot))
+    except (IOError, OSError, ValueError):
+      # The snapshot is just an optimization.
+      pass
+
+  def _load_parse_snapshot(self, options_file):
+    """Loads the parsed options if the snapshot is up to date.
+
+    Returns True on success.
+    """
+    try:
+      with open(_Options._get_parse_snapshot_file(options_file), 'rb') as f:
+        snapshot = marshal.load(f)
+      st = os.stat(options_file)
+      parser_mtimes = _Options._get_parser_mtimes()
+    except (IOError, OSError, EOFError, ValueError, TypeError):
+      return False
+    if (not isinstance(snapshot, dict) or
+        snapshot.get('version') != _PARSE_SNAPSHOT_VERSION or
+        snapshot.get('size') != st.st_size or
+        snapshot.get('mtime') != st.st_mtime or
+        snapshot.get('parser_mtimes') != parser_mtimes):
+      return False
+    self._values = snapshot['values']
+    self._loggers = snapshot['loggers']
+    if snapshot['show_warnings'] is not None:
+      self._show_warnings = snapshot['show_warnings']
+    self._system_packages = snapshot['system_packages']
+    self.parsed = True
+    return True
 
   # Parse the configure.options file.  This is useful for standalone tools that
   # are not run at configure time but rely on configured details (e.g.,
@@ -602,8 +677,11 @@ class _Options(object):
   def parse_configure_file(self, input_file=None):
     options_file = input_file or self.get_configure_options_file()
     if os.path.exists(options_file):
+      if self._load_parse_snapshot(options_file):
+        return
       with open(options_file) as f:
-        self.parse(f.read().split())
+        if self.parse(f.read().split()) == 0:
+          self._write_parse_snapshot(options_file)
     else:
       raise IOError('File ' + options_file + ' does not exist.')
 
@@ -0,0 +1,77 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.build import build_options
+
+
+class ParseSnapshotTest(unittest.TestCase):
+  def setUp(self):
+    self._tmpdir = tempfile.mkdtemp(prefix='build_options_test')
+    self._options_file = os.path.join(self._tmpdir, 'configure.options')
+    self._snapshot_file = self._options_file + '.snapshot'
+
+  def tearDown(self):
+    shutil.rmtree(self._tmpdir)
+
+  def _write_options_file(self, content, mtime):
+    with open(self._options_file, 'w') as f:
+      f.write(content)
+    os.utime(self._options_file, (mtime, mtime))
+
+  def _parse_configure_file(self):
+    options = build_options._Options()
+    options.parse_configure_file(self._options_file)
+    return options
+
+  def test_snapshot(self):
+    self._write_options_file(
+        '-t=ba --logging=make-to-ninja --system-packages=a.apk,b.apk\n', 100)
+    parsed = self._parse_configure_file()
+    self.assertTrue(os.path.exists(self._snapshot_file))
+
+    loaded = build_options._Options()
+    self.assertTrue(loaded._load_parse_snapshot(self._options_file))
+    self.assertTrue(loaded.parsed)
+    self.assertEquals(parsed._values, loaded._values)
+    self.assertEquals('bare_metal_arm', loaded.target())
+    self.assertTrue(loaded.strip_runtime_binaries())
+    self.assertTrue(loaded.is_make_to_ninja_logging())
+    self.assertEquals(['a.apk', 'b.apk'], loaded._system_packages)
+    self.assertEquals('no', loaded._show_warnings)
+
+  def test_stale_snapshot_is_ignored(self):
+    self._write_options_file('-t=ba\n', 100)
+    self.assertEquals('bare_metal_arm', self._parse_configure_file().target())
+
+    # The options file is updated with the same size.
+    self._write_options_file('-t=bi\n', 200)
+    self.assertFalse(
+        build_options._Options()._load_parse_snapshot(self._options_file))
+    self.assertEquals('bare_metal_i686', self._parse_configure_file().target())
+    # The snapshot is updated.
+    self.assertTrue(
+        build_options._Options()._load_parse_snapshot(self._options_file))
+
+  def test_broken_snapshot_is_ignored(self):
+    self._write_options_file('-t=ba\n', 100)
+    with open(self._snapshot_file, 'w') as f:
+      f.write('broken')
+    self.assertEquals('bare_metal_arm', self._parse_configure_file().target())
+
+  def test_write_configure_file(self):
+    options = build_options._Options()
+    options.parse(['-t=ba'])
+    options.write_configure_file(self._options_file)
+    loaded = build_options._Options()
+    self.assertTrue(loaded._load_parse_snapshot(self._options_file))
+    self.assertEquals('bare_metal_arm', loaded.target())
+
+
+if __name__ == '__main__':
+  unittest.main()
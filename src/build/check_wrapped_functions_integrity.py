@@ -6,33 +6,38 @@
 
 """Check consistency between --wrap for the linker and defined symbols."""
 
-import re
-import subprocess
+import contextlib
+import mmap
 import sys
 
-from src.build import toolchain
 from src.build import wrapped_functions
-from src.build.build_options import OPTIONS
+from src.build.util import elf_reader
 
 
-def _get_defined_functions(library):
-  nm = toolchain.get_tool(OPTIONS.target(), 'nm')
-  nm_output = subprocess.check_output([nm, '-D', '--defined-only', library])
+def _is_defined_function(symbol):
+  """Returns True if nm -D --defined-only lists the symbol as T or W."""
+  if (symbol.section_index == elf_reader.SHN_UNDEF or
+      symbol.type == elf_reader.STT_GNU_IFUNC):
+    return False
+  if symbol.binding == elf_reader.STB_WEAK:
+    return symbol.type != elf_reader.STT_OBJECT
+  return (symbol.binding == elf_reader.STB_GLOBAL and
+          bool(symbol.section_flags & elf_reader.SHF_EXECINSTR))
+
 
-  functions = []
-  for line in nm_output.splitlines():
-    matched = re.search(r' [TW] (\w+)', line)
-    if matched:
-      functions.append(matched.group(1))
-  return functions
+def _get_defined_functions(library):
+  """Returns the set of the functions defined in .dynsym of |library|."""
+  with open(library, 'rb') as f:
+    with contextlib.closing(
+        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)) as data:
+      return set(symbol.name for symbol
+                 in elf_reader.ElfReader(data).iter_dynamic_symbols()
+                 if _is_defined_function(symbol))
 
 
-def _check_wrapper_functions_are_defined(functions, libpt_so):
-  libpt_so_funcs = _get_defined_functions(libpt_so)
-  wrapper_funcs = set()
-  for func in libpt_so_funcs:
-    if func.startswith('__wrap_'):
-      wrapper_funcs.add(func.replace('__wrap_', ''))
+def _check_wrapper_functions_are_defined(functions, libpt_so_funcs):
+  wrapper_funcs = set(func[len('__wrap_'):] for func in libpt_so_funcs
+                      if func.startswith('__wrap_'))
 
   ok = True
   for func in sorted(functions - wrapper_funcs):
@@ -57,11 +62,7 @@ def _check_wrapper_functions_are_defined(functions, libpt_so):
   return ok
 
 
-def _check_wrapped_functions_are_defined(functions, libc_libraries):
-  libc_funcs = set()
-  for lib in libc_libraries:
-    libc_funcs |= set(_get_defined_functions(lib))
-
+def _check_wrapped_functions_are_defined(functions, libc_funcs):
   ok = True
   for func in sorted(functions - libc_funcs):
     ok = False
@@ -72,8 +73,6 @@ def _check_wrapped_functions_are_defined(functions, libc_libraries):
 
 
 def main():
-  OPTIONS.parse_configure_file()
-
   if len(sys.argv) < 3:
     print 'Usage: %s libposix_translation.so libc.so...'
     return 1
@@ -82,8 +81,13 @@ def main():
   libc_libraries = sys.argv[2:]
   functions = set(wrapped_functions.get_wrapped_functions())
 
-  ok = _check_wrapper_functions_are_defined(functions, libpt_so)
-  ok = ok & _check_wrapped_functions_are_defined(functions, libc_libraries)
+  libc_funcs = set()
+  for lib in libc_libraries:
+    libc_funcs |= _get_defined_functions(lib)
+
+  ok = _check_wrapper_functions_are_defined(
+      functions, _get_defined_functions(libpt_so))
+  ok = ok & _check_wrapped_functions_are_defined(functions, libc_funcs)
   if not ok:
     print 'FAILED'
     return 1
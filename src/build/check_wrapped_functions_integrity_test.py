@@ -0,0 +1,65 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import unittest
+
+from src.build import check_wrapped_functions_integrity
+from src.build.util import elf_reader
+
+_TEXT_FLAGS = 0x2 | elf_reader.SHF_EXECINSTR
+_DATA_FLAGS = 0x2 | 0x1
+
+
+def _symbol(binding, symbol_type, section_index=1, section_flags=_TEXT_FLAGS):
+  return elf_reader.ElfSymbol('name', binding, symbol_type, section_index,
+                              section_flags)
+
+
+class CheckWrappedFunctionsIntegrityTest(unittest.TestCase):
+  def test_is_defined_function(self):
+    is_defined_function = (
+        check_wrapped_functions_integrity._is_defined_function)
+    # T.
+    self.assertTrue(is_defined_function(
+        _symbol(elf_reader.STB_GLOBAL, elf_reader.STT_FUNC)))
+    # W.
+    self.assertTrue(is_defined_function(
+        _symbol(elf_reader.STB_WEAK, elf_reader.STT_FUNC)))
+    self.assertTrue(is_defined_function(
+        _symbol(elf_reader.STB_WEAK, elf_reader.STT_NOTYPE, 2, _DATA_FLAGS)))
+    # D, V, i and U.
+    self.assertFalse(is_defined_function(
+        _symbol(elf_reader.STB_GLOBAL, elf_reader.STT_OBJECT, 2, _DATA_FLAGS)))
+    self.assertFalse(is_defined_function(
+        _symbol(elf_reader.STB_WEAK, elf_reader.STT_OBJECT, 2, _DATA_FLAGS)))
+    self.assertFalse(is_defined_function(
+        _symbol(elf_reader.STB_GLOBAL, elf_reader.STT_GNU_IFUNC)))
+    self.assertFalse(is_defined_function(
+        _symbol(elf_reader.STB_GLOBAL, elf_reader.STT_FUNC,
+                elf_reader.SHN_UNDEF, 0)))
+    self.assertFalse(is_defined_function(
+        _symbol(elf_reader.STB_WEAK, elf_reader.STT_FUNC,
+                elf_reader.SHN_UNDEF, 0)))
+
+  def test_check_wrapper_functions_are_defined(self):
+    check = (check_wrapped_functions_integrity.
+             _check_wrapper_functions_are_defined)
+    self.assertTrue(check(set(['open', 'stat']),
+                          set(['__wrap_open', '__wrap_stat', '__wrap_read',
+                               'other'])))
+    # A wrapper is missing.
+    self.assertFalse(check(set(['open', 'stat']), set(['__wrap_open'])))
+    # An extra wrapper is defined.
+    self.assertFalse(check(set(['open']),
+                           set(['__wrap_open', '__wrap_stat'])))
+
+  def test_check_wrapped_functions_are_defined(self):
+    check = (check_wrapped_functions_integrity.
+             _check_wrapped_functions_are_defined)
+    self.assertTrue(check(set(['open']), set(['open', 'stat'])))
+    self.assertFalse(check(set(['open', 'stat']), set(['open'])))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -5,35 +5,110 @@
 """Finds and loads config.py files scattered through the source code tree."""
 
 import imp
+import marshal
 import os
 import sys
+import time
 
 from src.build import build_common
+from src.build import configure_profiler
+from src.build import file_list_cache
 from src.build.build_options import OPTIONS
+from src.build.util import file_util
 
+# Bump this when the format of the code cache is changed.
+_CODE_CACHE_VERSION = 1
 
-def _find_config_py(base_path):
-  """Finds config.py files under |base_path| and its descendants.
+# Number of the slowest config.py files reported with --verbose.
+_SLOW_CONFIG_REPORT_COUNT = 10
+
+
+class _ConfigPyMatcher(object):
+  """Matches config.py files.
+
+  This needs to be picklable for file_list_cache.
+  """
+
+  def match(self, path):
+    return os.path.basename(path) == 'config.py'
+
+
+class _ThirdPartyDirMatcher(object):
+  """Matches "third_party" directories, which are out of our focus.
+
+  This needs to be picklable for file_list_cache.
+  """
+
+  def match(self, path):
+    return os.path.basename(path) == 'third_party'
+
+
+def _find_config_py(arc_root, base_paths, cache_path=None):
+  """Finds config.py files under |base_paths| and their descendants.
 
   Args:
-    base_path: The root path for the searching, relative to ARC_ROOT.
+    arc_root: The absolute path of ARC_ROOT.
+    base_paths: The root paths for the searching, relative to |arc_root|.
+    cache_path: The path of the file to keep the result of the directory
+        walk, or None not to use the cache. When the cache is fresh, only the
+        directories in it are stat'ed.
+
+  Returns:
+    A list of paths to the found config.py files, relative to |arc_root|.
+    The paths are sorted for each base path, in the order of |base_paths|.
+  """
+  query = file_list_cache.Query(
+      [os.path.join(arc_root, base_path) for base_path in base_paths],
+      _ConfigPyMatcher(), arc_root, True,
+      excluded_dir_matcher=_ThirdPartyDirMatcher(), follow_links=False)
+  listing = None
+  if cache_path and os.path.exists(cache_path):
+    listing = file_list_cache.load_from_file(cache_path)
+  # Note that Query does not define __ne__.
+  if listing is None or not listing.query == query:
+    listing = file_list_cache.FileListCache(query)
+  listing.refresh_cache()
+  if cache_path:
+    # Save the listing even if the matched files are the same, as the mtimes
+    # of the directories may be updated.
+    file_util.makedirs_safely(os.path.dirname(cache_path))
+    listing.save_to_file(cache_path)
+
+  def sort_key(path):
+    for i, base_path in enumerate(base_paths):
+      if path.startswith(base_path + os.sep):
+        return i, path
+    return len(base_paths), path
+  return sorted((os.path.relpath(path, arc_root)
+                 for path in listing.enumerate_files()), key=sort_key)
+
+
+def _compile_config_py(abs_path, code_cache_path=None):
+  """Returns the code object of the file at |abs_path|.
 
-  Yields:
-    Paths to the found config.py files, relative to ARC_ROOT.
+  The compiled code is kept in |code_cache_path|, keyed by the mtime and size
+  of the source file, so that it is not recompiled on the next run.
   """
-  arc_root = build_common.get_arc_root()
-  base_abs_path = os.path.join(arc_root, base_path)
-  for dirpath, dirnames, filenames in os.walk(base_abs_path):
-    for name in filenames:
-      if name == 'config.py':
-        # Returns the path relative to ARC_ROOT.
-        # Note that, as |base_abs_path| is an absolute path, dirpath is
-        # also an absolute path.
-        yield os.path.relpath(os.path.join(dirpath, name), arc_root)
+  st = os.stat(abs_path)
+  key = (_CODE_CACHE_VERSION, imp.get_magic(), st.st_mtime, st.st_size)
+  if code_cache_path:
+    try:
+      with open(code_cache_path, 'rb') as f:
+        if marshal.load(f) == key:
+          return marshal.load(f)
+    except (IOError, EOFError, ValueError, TypeError):
+      pass
 
-    # "third_party" directories are out of our focus.
-    if 'third_party' in dirnames:
-      dirnames.remove('third_party')
+  with open(abs_path, 'rU') as f:
+    code = compile(f.read(), abs_path, 'exec')
+  if code_cache_path:
+    file_util.makedirs_safely(os.path.dirname(code_cache_path))
+
+    def write_cache(f):
+      marshal.dump(key, f)
+      marshal.dump(code, f)
+    file_util.generate_file_atomically(code_cache_path, write_cache)
+  return code
 
 
 def _import_package(package_path, filepath):
@@ -65,7 +140,7 @@ def _import_package(package_path, filepath):
     return package
 
 
-def _load_internal(path_list):
+def _load_internal(arc_root, path_list, code_cache_dir=None):
   """Loads all files in |path_list|.
 
   The files are loaded as an appropriately named submodule.
@@ -74,30 +149,51 @@ def _load_internal(path_list):
   created.
 
   Args:
+    arc_root: The absolute path of ARC_ROOT.
     path_list: a list of files to be loaded, relative to ARC_ROOT.
+    code_cache_dir: The directory to keep the compiled code of the files, or
+        None not to use the cache.
 
   Returns:
-    A list of loaded modules.
+    A list of loaded modules, and a list of (elapsed time in seconds, path)
+    of each file.
   """
 
   # For safety, acquire the import lock.
   imp.acquire_lock()
   try:
     result = []
+    load_times = []
     for path in path_list:
+      start_time = time.time()
       path = os.path.normpath(path)
-      abs_path = os.path.join(build_common.get_arc_root(), path)
+      abs_path = os.path.join(arc_root, path)
       module_name = os.path.splitext(path)[0].replace(os.sep, '.')
 
-      # Ensure ancestor packages.
-      if '.' in module_name:
-        _import_package(module_name.rsplit('.', 1)[0],
-                        os.path.dirname(abs_path))
+      with configure_profiler.span(path, 'config_loader'):
+        # Ensure ancestor packages.
+        if '.' in module_name:
+          _import_package(module_name.rsplit('.', 1)[0],
+                          os.path.dirname(abs_path))
+
+        code_cache_path = None
+        if code_cache_dir:
+          code_cache_path = os.path.join(code_cache_dir, path + '.code')
+        code = _compile_config_py(abs_path, code_cache_path)
 
-      with open(abs_path, 'rb') as config_file:
-        result.append(imp.load_source(module_name, abs_path, config_file))
+        # Same as imp.load_source(), but with the cached code.
+        module = imp.new_module(module_name)
+        module.__file__ = abs_path
+        sys.modules[module_name] = module
+        try:
+          exec code in module.__dict__
+        except:
+          del sys.modules[module_name]
+          raise
+        result.append(module)
+      load_times.append((time.time() - start_time, path))
 
-    return result
+    return result, load_times
   finally:
     imp.release_lock()
 
@@ -105,6 +201,7 @@ def _load_internal(path_list):
 class ConfigLoader(object):
   def __init__(self):
     self._config_modules = []
+    self._config_file_list = []
 
   def find_config_modules(self, attribute_name):
     """Finds the loaded config modules that have the specified attribute name.
@@ -119,8 +216,15 @@ class ConfigLoader(object):
       if hasattr(module, attribute_name):
         yield module
 
-  def load(self):
-    """Loads all config.py files in the project."""
+  def get_config_files(self):
+    """Returns the paths of the loaded config.py files, relative to ARC_ROOT."""
+    return list(self._config_file_list)
+
+  def is_config_file_list_changed(self):
+    """Returns True if config.py files are added or removed since load()."""
+    return self._find_config_files() != self._config_file_list
+
+  def _find_config_files(self):
     search_root_list = [
         os.path.join('mods', 'android'),
         os.path.join('mods', 'chromium-ppapi'),
@@ -131,8 +235,26 @@ class ConfigLoader(object):
     if OPTIONS.internal_apks_source_is_internal():
       search_root_list.append('internal')
 
-    config_file_list = []
-    for search_root in search_root_list:
-      config_file_list.extend(_find_config_py(search_root))
+    listing_cache_path = None
+    if OPTIONS.enable_config_cache():
+      listing_cache_path = os.path.join(build_common.get_config_cache_dir(),
+                                        'config_py_listing')
+    return _find_config_py(
+        build_common.get_arc_root(), search_root_list, listing_cache_path)
+
+  def load(self):
+    """Loads all config.py files in the project."""
+    code_cache_dir = None
+    if OPTIONS.enable_config_cache():
+      code_cache_dir = os.path.join(build_common.get_config_cache_dir(),
+                                    'config_py_code')
+
+    self._config_file_list = self._find_config_files()
+    self._config_modules, load_times = _load_internal(
+        build_common.get_arc_root(), self._config_file_list, code_cache_dir)
 
-    self._config_modules = _load_internal(config_file_list)
+    if OPTIONS.verbose():
+      print 'Slowest config.py files to load:'
+      for elapsed_time, path in sorted(
+          load_times, reverse=True)[:_SLOW_CONFIG_REPORT_COUNT]:
+        print '  %0.3fs %s' % (elapsed_time, path)
@@ -0,0 +1,118 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from src.build import config_loader
+from src.build import file_list_cache
+from src.build.util import file_util
+
+
+def _write(path, content):
+  file_util.makedirs_safely(os.path.dirname(path))
+  with open(path, 'w') as f:
+    f.write(content)
+
+
+class ConfigLoaderTest(unittest.TestCase):
+  def setUp(self):
+    self._tmpdir = tempfile.mkdtemp(prefix='config_loader_test')
+    self._arc_root = os.path.join(self._tmpdir, 'root')
+    self._cache_dir = os.path.join(self._tmpdir, 'cache')
+    self._listing_cache_path = os.path.join(self._cache_dir, 'listing')
+    self._code_cache_dir = os.path.join(self._cache_dir, 'code')
+    self._saved_modules = set(sys.modules)
+
+  def tearDown(self):
+    for name in set(sys.modules) - self._saved_modules:
+      del sys.modules[name]
+    shutil.rmtree(self._tmpdir)
+
+  def _write_config(self, path, content):
+    _write(os.path.join(self._arc_root, path), content)
+
+  def _find_config_py(self):
+    return config_loader._find_config_py(
+        self._arc_root, ['mods', 'clt_src'], self._listing_cache_path)
+
+  def _load(self, path_list):
+    return config_loader._load_internal(
+        self._arc_root, path_list, self._code_cache_dir)[0]
+
+  def test_find_config_py(self):
+    self._write_config('clt_src/a/config.py', '')
+    self._write_config('clt_src/b/config.py', '')
+    self._write_config('clt_src/b/third_party/c/config.py', '')
+    self._write_config('clt_src/b/other.py', '')
+    self._write_config('mods/d/config.py', '')
+    self._write_config('other/config.py', '')
+    expected = ['mods/d/config.py', 'clt_src/a/config.py',
+                'clt_src/b/config.py']
+    self.assertEquals(expected, self._find_config_py())
+    self.assertTrue(os.path.exists(self._listing_cache_path))
+    # Loaded from the cache.
+    self.assertEquals(expected, self._find_config_py())
+
+    # A new config.py is found, and a removed one is not.
+    self._write_config('clt_src/e/config.py', '')
+    os.remove(os.path.join(self._arc_root, 'clt_src/a/config.py'))
+    self.assertEquals(
+        ['mods/d/config.py', 'clt_src/b/config.py', 'clt_src/e/config.py'],
+        self._find_config_py())
+
+  def test_find_config_py_not_following_links(self):
+    self._write_config('clt_src/a/config.py', '')
+    self._write_config('other/config.py', '')
+    os.symlink(os.path.join(self._arc_root, 'other'),
+               os.path.join(self._arc_root, 'clt_src', 'link'))
+    self.assertEquals(['clt_src/a/config.py'], self._find_config_py())
+
+  def test_listing_cache_saved(self):
+    self._write_config('clt_src/a/config.py', '')
+    dir_path = os.path.join(self._arc_root, 'clt_src', 'a')
+    os.utime(dir_path, (100, 100))
+    self._find_config_py()
+
+    # Adding a non-config file updates the mtime of the directory only. The
+    # listing is saved so that the directory is not walked again next time.
+    self._write_config('clt_src/a/other.py', '')
+    os.utime(dir_path, (200, 200))
+    self.assertEquals(['clt_src/a/config.py'], self._find_config_py())
+    listing = file_list_cache.load_from_file(self._listing_cache_path)
+    self.assertEquals(200, listing.cache_entries[dir_path].mtime)
+
+  def test_load_with_code_cache(self):
+    abs_path = os.path.join(self._arc_root, 'clt_src/a/config.py')
+    self._write_config('clt_src/a/config.py', 'VALUE = 1\n')
+    os.utime(abs_path, (100, 100))
+    module, = self._load(['clt_src/a/config.py'])
+    self.assertEquals('clt_src.a.config', module.__name__)
+    self.assertEquals(abs_path, module.__file__)
+    self.assertEquals(1, module.VALUE)
+    self.assertIs(module, sys.modules['clt_src.a.config'])
+    self.assertTrue(os.path.exists(
+        os.path.join(self._code_cache_dir, 'clt_src/a/config.py.code')))
+
+    # The cached code is used, if the mtime and size are not changed.
+    self._write_config('clt_src/a/config.py', 'VALUE = 3\n')
+    os.utime(abs_path, (100, 100))
+    self.assertEquals(1, self._load(['clt_src/a/config.py'])[0].VALUE)
+
+    # The cached code is ignored, if the source file is changed.
+    self._write_config('clt_src/a/config.py', 'VALUE = 22\n')
+    self.assertEquals(22, self._load(['clt_src/a/config.py'])[0].VALUE)
+
+  def test_load_error(self):
+    self._write_config('clt_src/a/config.py', 'raise ValueError()\n')
+    with self.assertRaises(ValueError):
+      self._load(['clt_src/a/config.py'])
+    self.assertNotIn('clt_src.a.config', sys.modules)
+
+
+if __name__ == '__main__':
+  unittest.main()
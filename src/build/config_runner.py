@@ -12,6 +12,7 @@ import re
 
 from src.build import build_common
 from src.build import config_loader
+from src.build import configure_profiler
 from src.build import dependency_inspection
 from src.build import file_list_cache
 from src.build import make_to_ninja
@@ -224,6 +225,15 @@ def _load_config_cache_from_file(path):
                      serialized_generated_ninjas)
 
 
+def _get_watched_paths(deps):
+  """Returns the files and directories to watch for the CacheDependency."""
+  directories = set()
+  for listing in deps.listings:
+    directories.update(listing.query.base_paths)
+    directories.update(listing.cache_entries)
+  return deps.files.keys(), directories
+
+
 def _config_cache_from_config_result(config_result):
   files = {}
   for path in config_result.get_file_dependency():
@@ -335,7 +345,7 @@ def _list_ninja_generators(config_loader, name):
            getattr(module, name))
 
 
-def _set_up_generate_ninja():
+def _set_up_generate_ninja(live_cache):
   # Create generated_ninja directory if necessary.
   ninja_dir = build_common.get_generated_ninja_dir()
   if not os.path.exists(ninja_dir):
@@ -353,7 +363,8 @@ def _set_up_generate_ninja():
 
   dependency_inspection.start_inspection()
   dependency_inspection.add_files(*_get_build_system_dependencies())
-  make_to_ninja.prepare_make_to_ninja()
+  with configure_profiler.span('prepare_make_to_ninja', 'make'):
+    make_to_ninja.prepare_make_to_ninja()
   depended_files = dependency_inspection.get_files()
   depended_listings = dependency_inspection.get_listings()
   dependency_inspection.stop_inspection()
@@ -363,23 +374,34 @@ def _set_up_generate_ninja():
   if OPTIONS.enable_config_cache():
     needs_clobbering = False
     cache_path = _get_global_deps_file_path()
-    global_deps = _load_global_deps_from_file(cache_path)
-    if global_deps is None:
-      needs_clobbering = True
-      global_deps = CacheDependency()
-    else:
-      if not global_deps.check_freshness():
+    with configure_profiler.span('load_global_deps', 'cache'):
+      global_deps = _load_global_deps_from_file(cache_path)
+      if global_deps is None:
         needs_clobbering = True
-    global_deps.refresh(depended_files, depended_listings)
+        global_deps = CacheDependency()
+      else:
+        if not global_deps.check_freshness():
+          needs_clobbering = True
+      global_deps.refresh(depended_files, depended_listings)
 
     cache_to_save.append((global_deps, cache_path))
 
-  _config_loader.load()
+  with configure_profiler.span('load_config_modules', 'configure'):
+    _config_loader.load()
+
+  if live_cache is not None:
+    # The loaded modules cannot be updated by re-running tasks, so the server
+    # needs to restart when the build system or a config.py is changed.
+    files, directories = _get_watched_paths(global_deps)
+    live_cache.set_global_dependencies(
+        files + [os.path.join(build_common.get_arc_root(), path)
+                 for path in _config_loader.get_config_files()],
+        directories)
 
   return needs_clobbering, cache_to_save
 
 
-def _generate_independent_ninjas(needs_clobbering):
+def _generate_independent_ninjas(needs_clobbering, live_cache):
   timer = build_common.SimpleTimer()
 
   # Invoke an unordered set of ninja-generators distributed across config
@@ -395,19 +417,32 @@ def _generate_independent_ninjas(needs_clobbering):
   task_list = []
   cached_result_list = []
   cache_miss = {}
+  cache_hit = []
 
   for config_context, generator in generator_list:
     cache_path = _get_cache_file_path(config_context.config_name,
                                       config_context.entry_point)
     config_cache = None
-    if OPTIONS.enable_config_cache() and not needs_clobbering:
-      config_cache = _load_config_cache_from_file(cache_path)
-
-    if config_cache is not None and config_cache.check_cache_freshness():
-      cached_result = config_cache.to_config_result()
-      if cached_result is not None:
-        cached_result_list.append(cached_result)
-        continue
+    cached_result = None
+    with configure_profiler.span('load_config_cache', 'cache',
+                                 config_name=config_context.config_name):
+      if live_cache is not None:
+        config_cache = live_cache.get(cache_path)
+        if config_cache is not None and not live_cache.is_dirty(cache_path):
+          # None of the dependencies has changed since the last run.
+          cached_result = config_cache.to_config_result()
+
+      if (config_cache is None and OPTIONS.enable_config_cache() and
+          not needs_clobbering):
+        config_cache = _load_config_cache_from_file(cache_path)
+
+      if (cached_result is None and config_cache is not None and
+          config_cache.check_cache_freshness()):
+        cached_result = config_cache.to_config_result()
+        cache_hit.append((config_cache, cache_path))
+    if cached_result is not None:
+      cached_result_list.append(cached_result)
+      continue
 
     task_list.append(ninja_generator_runner.GeneratorTask(
         config_context, generator))
@@ -441,6 +476,11 @@ def _generate_independent_ninjas(needs_clobbering):
 
       cache_to_save.append((config_cache, cache_path))
 
+  if live_cache is not None:
+    for config_cache, cache_path in cache_hit + cache_to_save:
+      files, directories = _get_watched_paths(config_cache.deps)
+      live_cache.put(cache_path, config_cache, files, directories)
+
   ninja_list.sort(key=lambda ninja: ninja.get_module_name())
   timer.done()
   return ninja_list, cache_to_save
@@ -578,10 +618,38 @@ def _verify_ninja_generator_list(ninja_list):
         archive_ninja_list, shared_ninja_list, exec_ninja_list, test_ninja_list)
 
 
-def generate_ninjas():
-  needs_clobbering, cache_to_save = _set_up_generate_ninja()
+def is_config_file_list_changed():
+  """Returns True if config.py files are added or removed since loaded."""
+  return _config_loader.is_config_file_list_changed()
+
+
+def generate_ninjas(live_cache=None):
+  """Generates the ninja files.
+
+  Args:
+      live_cache: A LiveConfigCache which keeps the config cache in memory
+          across the runs in configure_server.py, or None. The set-up is done
+          only in the first run. Only the config tasks whose entries are dirty
+          re-run, and only the ninja files whose contents are changed are
+          written.
+  """
+  try:
+    _generate_ninjas(live_cache)
+  except Exception:
+    if live_cache is not None:
+      live_cache.discard_dirty_entries()
+    raise
+
+
+def _generate_ninjas(live_cache):
+  if live_cache is not None and live_cache.has_global_dependencies():
+    # The tasks re-run in this process may translate the same modules again.
+    make_to_ninja.MakefileNinjaTranslator.reset_modules()
+    needs_clobbering, cache_to_save = False, []
+  else:
+    needs_clobbering, cache_to_save = _set_up_generate_ninja(live_cache)
   ninja_list, independent_ninja_cache = _generate_independent_ninjas(
-      needs_clobbering)
+      needs_clobbering, live_cache)
   cache_to_save.extend(independent_ninja_cache)
   ninja_list.extend(
       _generate_shared_lib_depending_ninjas(ninja_list))
@@ -596,12 +664,19 @@ def generate_ninjas():
   # Emit each ninja script to a file.
   timer = build_common.SimpleTimer()
   timer.start('Emitting ninja scripts', OPTIONS.verbose())
-  for ninja in ninja_list:
-    ninja.emit()
-  top_level_ninja.emit_depfile()
-  top_level_ninja.cleanup_out_directories(ninja_list)
+  with configure_profiler.span('emit_ninjas', 'emit'):
+    for ninja in ninja_list:
+      if live_cache is None or live_cache.needs_emit(
+          ninja.get_ninja_path(), ninja.output.getvalue()):
+        ninja.emit()
+    top_level_ninja.emit_depfile()
+    top_level_ninja.cleanup_out_directories(ninja_list)
   timer.done()
 
   if OPTIONS.enable_config_cache():
-    for cache_object, cache_path in cache_to_save:
-      cache_object.save_to_file(cache_path)
+    with configure_profiler.span('save_config_cache', 'cache'):
+      for cache_object, cache_path in cache_to_save:
+        cache_object.save_to_file(cache_path)
+
+  if live_cache is not None:
+    live_cache.update_watches()
@@ -0,0 +1,138 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import types
+import unittest
+
+import mock
+
+from src.build import build_common
+from src.build import config_runner
+from src.build import live_config_cache
+from src.build import make_to_ninja
+from src.build import ninja_generator
+from src.build.build_options import OPTIONS
+from src.build.util import file_watcher
+
+
+def _generate_ninjas():
+  """Translates a module, as the generators using make_to_ninja do."""
+  vars = mock.Mock()
+  vars.get_module_name.return_value = 'libfoo'
+  vars.is_host.return_value = False
+  translator = make_to_ninja.MakefileNinjaTranslator('mods/foo')
+  translator._modules = [vars]
+  translator._generate_modules()
+
+
+def _generate_ninjas_from_sources():
+  """Generates a ninja file from the listed sources, failing on bad.c."""
+  sources = build_common.find_all_files(['mods/foo/src'], use_staging=False)
+  if 'mods/foo/src/bad.c' in sources:
+    raise ValueError('bad.c is found')
+  ninja_generator.NinjaGenerator('foo')
+
+
+class _FakeConfigLoader(object):
+  def __init__(self, config_path, generate_ninjas):
+    self._module = types.ModuleType('mods.foo.config')
+    self._module.__file__ = config_path
+    self._module.generate_ninjas = generate_ninjas
+
+  def find_config_modules(self, attribute_name):
+    if hasattr(self._module, attribute_name):
+      yield self._module
+
+
+class GenerateNinjasTest(unittest.TestCase):
+  def setUp(self):
+    OPTIONS.parse(['--configure-jobs=0'])
+    self._tmpdir = tempfile.mkdtemp(prefix='config_runner_test')
+    self._saved_cwd = os.getcwd()
+    # The ninja files and the config cache are written relative to the
+    # current directory.
+    os.chdir(self._tmpdir)
+    self._config_path = os.path.join(
+        self._tmpdir, 'mods', 'foo', 'config.py')
+    os.makedirs(os.path.dirname(self._config_path))
+    open(self._config_path, 'w').close()
+
+    def set_up_generate_ninja(live_cache):
+      os.makedirs(build_common.get_generated_ninja_dir())
+      live_cache.set_global_dependencies([self._config_path], [])
+      return True, []
+
+    self._patchers = [
+        mock.patch.object(config_runner, '_set_up_generate_ninja',
+                          side_effect=set_up_generate_ninja),
+        # The common rules in build.ninja need the toolchain.
+        mock.patch.object(ninja_generator.TopLevelNinjaGenerator,
+                          '_emit_common_rules'),
+    ]
+    for patcher in self._patchers:
+      patcher.start()
+    generate_module_patcher = mock.patch.object(
+        make_to_ninja.MakefileNinjaTranslator, '_generate_module')
+    self._generate_module = generate_module_patcher.start()
+    self._patchers.append(generate_module_patcher)
+
+  def tearDown(self):
+    for patcher in self._patchers:
+      patcher.stop()
+    make_to_ninja.MakefileNinjaTranslator.reset_modules()
+    os.chdir(self._saved_cwd)
+    shutil.rmtree(self._tmpdir)
+
+  def _set_generator(self, generate_ninjas):
+    patcher = mock.patch.object(
+        config_runner, '_config_loader',
+        _FakeConfigLoader(self._config_path, generate_ninjas))
+    patcher.start()
+    self._patchers.append(patcher)
+
+  def test_generate_ninjas_twice_with_live_cache(self):
+    self._set_generator(_generate_ninjas)
+    live_cache = live_config_cache.LiveConfigCache(
+        file_watcher.PollingWatcher())
+    try:
+      config_runner.generate_ninjas(live_cache)
+      self.assertTrue(os.path.exists('build.ninja'))
+      # The task producing no ninja file is not cached, so it re-runs and
+      # translates the same module in the same process.
+      config_runner.generate_ninjas(live_cache)
+      self.assertEquals(2, self._generate_module.call_count)
+    finally:
+      live_cache.close()
+
+  def test_failed_task_stays_dirty(self):
+    self._set_generator(_generate_ninjas_from_sources)
+    os.makedirs('mods/foo/src')
+    open('mods/foo/src/good.c', 'w').close()
+    live_cache = live_config_cache.LiveConfigCache(
+        file_watcher.PollingWatcher())
+    try:
+      config_runner.generate_ninjas(live_cache)
+
+      # Checking the freshness of the dirty entry sees the new file, and the
+      # re-run task fails.
+      open('mods/foo/src/bad.c', 'w').close()
+      mtime = os.stat('mods/foo/src').st_mtime + 1
+      os.utime('mods/foo/src', (mtime, mtime))
+      live_cache.find_changes()
+      with self.assertRaises(ValueError):
+        config_runner.generate_ninjas(live_cache)
+
+      # The entry is not taken as fresh, so the task runs and fails again.
+      live_cache.find_changes()
+      with self.assertRaises(ValueError):
+        config_runner.generate_ninjas(live_cache)
+    finally:
+      live_cache.close()
+
+
+if __name__ == '__main__':
+  unittest.main()
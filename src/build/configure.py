@@ -15,6 +15,7 @@ import sys
 
 from src.build import build_common
 from src.build import config_runner
+from src.build import configure_profiler
 from src.build import download_arc_welder_deps
 from src.build import download_cts_files
 from src.build import download_sdk_and_ndk
@@ -322,6 +323,14 @@ def _set_up_internal_repo():
     file_util.create_link(symlink_location, test_dir, overwrite=True)
 
 
+def _write_configure_profile():
+  trace_file = build_common.get_configure_trace_file()
+  configure_profiler.write_trace(trace_file)
+  print configure_profiler.format_summary()
+  print 'Configure trace is written to', trace_file
+  print 'Open it in chrome://tracing, or process it with filter_trace.py.'
+
+
 def main():
   # Disable line buffering
   sys.stdout = os.fdopen(sys.stdout.fileno(), 'w', 0)
@@ -329,6 +338,9 @@ def main():
   if not _configure_build_options():
     return -1
 
+  if OPTIONS.enable_configure_profiling():
+    configure_profiler.enable()
+
   _update_arc_version_file()
 
   _ensure_downloads_up_to_date()
@@ -352,9 +364,14 @@ def main():
 
   # Make sure the staging directory is up to date whenever configure
   # runs to make it easy to generate rules by scanning directories.
-  staging.create_staging()
+  with configure_profiler.span('create_staging', 'staging'):
+    staging.create_staging()
+
+  with configure_profiler.span('generate_ninjas', 'configure'):
+    config_runner.generate_ninjas()
 
-  config_runner.generate_ninjas()
+  if configure_profiler.is_enabled():
+    _write_configure_profile()
 
   return 0
 
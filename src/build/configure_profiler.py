@@ -0,0 +1,145 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Records where the time goes while configure runs.
+
+When enabled by --enable-configure-profiling, spans such as running a config.py
+generator, running make for make_to_ninja, walking directories in
+find_all_files, loading and saving the config cache, and emitting ninja files
+are recorded as Chrome trace "complete" events. Each worker process of
+ninja_generator_runner records its own events, and passes them back to the
+parent process with the result of each task.
+
+The merged events are written as a Chrome trace JSON file, which can be loaded
+in chrome://tracing, or processed by filter_trace.py.
+
+When profiling is not enabled, span() does nothing.
+"""
+
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+
+_enabled = False
+
+# Events which are not yet taken by take_events(). A worker process inherits
+# the events recorded in the parent process before it is forked, too.
+_events = []
+
+# Number of rows in the summary table by default.
+_DEFAULT_SUMMARY_ROWS = 20
+
+
+def enable():
+  """Enables profiling.
+
+  This must be called before the worker processes are forked, so that they
+  inherit the state.
+  """
+  global _enabled
+  _enabled = True
+
+
+def is_enabled():
+  return _enabled
+
+
+def _get_timestamp_us():
+  # filter_trace.py requires integer timestamps.
+  return int(time.time() * 1000000)
+
+
+@contextlib.contextmanager
+def span(name, category, **kwargs):
+  """Records the time spent in the with-block as a span.
+
+  Args:
+      name: The name of the span. The summary aggregates spans by name.
+      category: The category of the span, e.g. 'make' or 'cache'.
+      kwargs: Extra arguments shown in the trace viewer. The values must be
+          JSON serializable.
+  """
+  if not _enabled:
+    yield
+    return
+  start = _get_timestamp_us()
+  try:
+    yield
+  finally:
+    event = {
+        'name': name,
+        'cat': category,
+        'ph': 'X',
+        'ts': start,
+        'dur': _get_timestamp_us() - start,
+        'pid': os.getpid(),
+        'tid': threading.current_thread().ident,
+    }
+    if kwargs:
+      event['args'] = kwargs
+    _events.append(event)
+
+
+def take_events():
+  """Returns the events recorded in this process, and forgets them.
+
+  The events inherited from the parent process are forgotten without being
+  returned, so that a worker process does not pass them back to the parent
+  process, which already has them.
+  """
+  pid = os.getpid()
+  events = [event for event in _events if event['pid'] == pid]
+  del _events[:]
+  return events
+
+
+def add_events(events):
+  """Adds events recorded in another process, e.g. a worker process."""
+  _events.extend(events)
+
+
+def _get_metadata_events(events):
+  main_pid = os.getpid()
+  pids = sorted(set(event['pid'] for event in events) | {main_pid})
+  metadata_events = []
+  for pid in pids:
+    if pid == main_pid:
+      process_name = 'configure'
+    else:
+      process_name = 'configure worker %d' % pid
+    metadata_events.append({
+        'name': 'process_name', 'ph': 'M', 'ts': 0, 'pid': pid, 'tid': 0,
+        'args': {'name': process_name}})
+  return metadata_events
+
+
+def write_trace(path):
+  """Writes the events recorded so far to |path| as Chrome trace JSON."""
+  with open(path, 'w') as f:
+    json.dump({'traceEvents': _get_metadata_events(_events) + _events}, f)
+
+
+def format_summary(max_rows=_DEFAULT_SUMMARY_ROWS):
+  """Returns a table of the spans which took the longest in total.
+
+  Spans are aggregated by category and name. Nested spans are counted in both
+  the inner and the outer ones.
+  """
+  stats = collections.defaultdict(lambda: [0, 0, 0])
+  for event in _events:
+    stat = stats[(event['cat'], event['name'])]
+    stat[0] += 1
+    stat[1] += event['dur']
+    stat[2] = max(stat[2], event['dur'])
+  rows = sorted(stats.iteritems(), key=lambda item: (-item[1][1], item[0]))
+
+  lines = ['%10s %10s %6s  %-10s %s' % (
+      'total(s)', 'max(s)', 'count', 'category', 'name')]
+  for (category, name), (count, total_us, max_us) in rows[:max_rows]:
+    lines.append('%10.3f %10.3f %6d  %-10s %s' % (
+        total_us / 1e6, max_us / 1e6, count, category, name))
+  return '\n'.join(lines)
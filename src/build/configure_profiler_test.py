@@ -0,0 +1,116 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.build import configure_profiler
+from src.build import filter_trace
+from src.build.util import concurrent
+
+
+def _record_span_in_worker():
+  with configure_profiler.span('work', 'task'):
+    pass
+  return configure_profiler.take_events()
+
+
+class ConfigureProfilerTest(unittest.TestCase):
+  def setUp(self):
+    self._tmpdir = tempfile.mkdtemp(prefix='configure_profiler_test')
+    configure_profiler.take_events()
+
+  def tearDown(self):
+    configure_profiler._enabled = False
+    configure_profiler.take_events()
+    shutil.rmtree(self._tmpdir)
+
+  def test_disabled(self):
+    with configure_profiler.span('make', 'make'):
+      pass
+    self.assertEquals([], configure_profiler.take_events())
+
+  def test_span(self):
+    configure_profiler.enable()
+    with configure_profiler.span('outer', 'task'):
+      with configure_profiler.span('inner', 'make', in_file='Android.mk'):
+        pass
+    with self.assertRaises(ValueError):
+      with configure_profiler.span('failing', 'task'):
+        raise ValueError()
+
+    inner, outer, failing = configure_profiler.take_events()
+    self.assertEquals('inner', inner['name'])
+    self.assertEquals('make', inner['cat'])
+    self.assertEquals('X', inner['ph'])
+    self.assertEquals({'in_file': 'Android.mk'}, inner['args'])
+    self.assertEquals(os.getpid(), inner['pid'])
+    self.assertLessEqual(outer['ts'], inner['ts'])
+    self.assertLessEqual(inner['ts'] + inner['dur'],
+                         outer['ts'] + outer['dur'])
+    self.assertEquals('failing', failing['name'])
+    self.assertEquals([], configure_profiler.take_events())
+
+  def test_take_events_in_worker(self):
+    configure_profiler.enable()
+    with configure_profiler.span('pre_fork', 'task'):
+      pass
+    with concurrent.ProcessPoolExecutor(max_workers=2) as executor:
+      futures = [executor.submit(_record_span_in_worker) for _ in xrange(4)]
+      worker_events = sum((future.result() for future in futures), [])
+    # The worker processes do not pass back the events recorded before they
+    # are forked.
+    self.assertEquals(['work'] * 4,
+                      [event['name'] for event in worker_events])
+    self.assertNotIn(os.getpid(), [event['pid'] for event in worker_events])
+    self.assertEquals(['pre_fork'], [
+        event['name'] for event in configure_profiler.take_events()])
+
+  def test_write_trace(self):
+    configure_profiler.enable()
+    with configure_profiler.span('local', 'task'):
+      pass
+    # Events recorded in a worker process.
+    configure_profiler.add_events([{
+        'name': 'remote', 'cat': 'task', 'ph': 'X', 'ts': 10, 'dur': 5,
+        'pid': 1234, 'tid': 1}])
+    trace_file = os.path.join(self._tmpdir, 'trace.json')
+    configure_profiler.write_trace(trace_file)
+
+    with open(trace_file) as f:
+      events = json.load(f)['traceEvents']
+    process_names = dict((event['pid'], event['args']['name'])
+                         for event in events if event['ph'] == 'M')
+    self.assertEquals({os.getpid(): 'configure',
+                       1234: 'configure worker 1234'}, process_names)
+    self.assertEquals(['local', 'remote'], sorted(
+        event['name'] for event in events if event['ph'] == 'X'))
+
+    # The trace can be processed by filter_trace.py.
+    with open(trace_file) as f:
+      traces = filter_trace.Traces(f)
+    traces.filter(lambda event: event['name'] == 'remote')
+    self.assertEquals(3, len(traces._events))
+
+  def test_format_summary(self):
+    configure_profiler.add_events([
+        {'name': 'a', 'cat': 'task', 'ph': 'X', 'ts': 0, 'dur': 1000000,
+         'pid': 1, 'tid': 1},
+        {'name': 'b', 'cat': 'make', 'ph': 'X', 'ts': 0, 'dur': 3000000,
+         'pid': 1, 'tid': 1},
+        {'name': 'a', 'cat': 'task', 'ph': 'X', 'ts': 0, 'dur': 2500000,
+         'pid': 2, 'tid': 1},
+        {'name': 'c', 'cat': 'task', 'ph': 'X', 'ts': 0, 'dur': 10,
+         'pid': 2, 'tid': 1}])
+    lines = configure_profiler.format_summary(max_rows=2).splitlines()
+    self.assertEquals(3, len(lines))
+    self.assertEquals(['3.500', '2.500', '2', 'task', 'a'], lines[1].split())
+    self.assertEquals(['3.000', '3.000', '1', 'make', 'b'], lines[2].split())
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,194 @@
+#!src/build/run_python
+
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Keeps configure running to regenerate ninja files quickly.
+
+Each configure run loads all config.py files, and checks the config cache of
+every config task again. This server keeps the loaded config modules and the
+config cache in memory instead, and watches the dependencies recorded for each
+task. On each request, only the tasks owning a changed dependency re-run, and
+only the ninja files whose contents are changed are written.
+
+Usage:
+  $ ./configure --enable-config-cache <other options>
+  $ src/build/configure_server.py start &
+  (edit files)
+  $ src/build/configure_server.py regenerate
+  $ src/build/configure_server.py stop
+
+The server uses the options of the last configure run. When the build system
+scripts, the configure options, or the set of config.py files are changed, the
+server restarts itself on the next request. Run configure instead when the
+staging directory or the downloaded dependencies need to be updated.
+"""
+
+import argparse
+import contextlib
+import errno
+import os
+import socket
+import sys
+import time
+import traceback
+
+from src.build import build_common
+from src.build import config_runner
+from src.build import live_config_cache
+from src.build.build_options import OPTIONS
+from src.build.util import logging_util
+
+_REGENERATE = 'regenerate'
+_STOP = 'stop'
+
+_REPLY_OK = 'ok'
+_REPLY_ERROR = 'error'
+_REPLY_RESTART = 'restart'
+
+# How long the client waits for the server to (re)start.
+_CONNECT_TIMEOUT = 60
+
+
+def _send_reply(connection, reply, message=''):
+  connection.sendall('%s %s\n' % (reply, message.replace('\n', '\\n')))
+
+
+def _regenerate(live_cache):
+  """Handles a regenerate request.
+
+  Returns:
+      A tuple of the reply and the message.
+  """
+  if live_cache.has_global_dependencies():
+    dirty_keys = live_cache.find_changes()
+    if (live_cache.needs_restart() or
+        config_runner.is_config_file_list_changed()):
+      return _REPLY_RESTART, 'The build system is changed.'
+    if OPTIONS.verbose():
+      for key in sorted(dirty_keys):
+        print 'Dirty:', key
+
+  timer = build_common.SimpleTimer()
+  timer.start('Regenerating ninja files', True)
+  try:
+    config_runner.generate_ninjas(live_cache)
+  except Exception:
+    traceback.print_exc()
+    return _REPLY_ERROR, traceback.format_exc()
+  finally:
+    timer.done()
+  return _REPLY_OK, ''
+
+
+def _serve(server_socket):
+  """Serves requests until stopped.
+
+  Returns:
+      True if the server needs to restart.
+  """
+  live_cache = live_config_cache.LiveConfigCache()
+  try:
+    while True:
+      connection, _ = server_socket.accept()
+      with contextlib.closing(connection):
+        command = connection.makefile().readline().strip()
+        if command == _STOP:
+          _send_reply(connection, _REPLY_OK)
+          return False
+        if command != _REGENERATE:
+          _send_reply(connection, _REPLY_ERROR,
+                      'Unknown command: %s' % command)
+          continue
+        reply, message = _regenerate(live_cache)
+        _send_reply(connection, reply, message)
+        if reply == _REPLY_RESTART:
+          return True
+  finally:
+    live_cache.close()
+
+
+def _start():
+  if not OPTIONS.enable_config_cache():
+    print 'configure_server.py requires configure --enable-config-cache.'
+    return 1
+
+  socket_path = build_common.get_configure_server_socket_file()
+  server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  try:
+    os.remove(socket_path)
+  except OSError as e:
+    if e.errno != errno.ENOENT:
+      raise
+  server_socket.bind(socket_path)
+  server_socket.listen(1)
+  print 'Configure server is listening on', socket_path
+  try:
+    needs_restart = _serve(server_socket)
+  finally:
+    server_socket.close()
+    os.remove(socket_path)
+
+  if needs_restart:
+    print 'Restarting the configure server...'
+    os.execv(sys.executable, [sys.executable] + sys.argv)
+  return 0
+
+
+def _connect(socket_path):
+  deadline = time.time() + _CONNECT_TIMEOUT
+  while True:
+    client_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+      client_socket.connect(socket_path)
+      return client_socket
+    except socket.error as e:
+      client_socket.close()
+      if (e.errno not in (errno.ENOENT, errno.ECONNREFUSED) or
+          time.time() > deadline):
+        raise
+    time.sleep(0.1)
+
+
+def _send_command(command):
+  socket_path = build_common.get_configure_server_socket_file()
+  while True:
+    try:
+      client_socket = _connect(socket_path)
+    except socket.error as e:
+      print 'Failed to connect to the configure server:', e
+      return 1
+    with contextlib.closing(client_socket):
+      client_socket.sendall(command + '\n')
+      reply, _, message = client_socket.makefile().readline().partition(' ')
+    message = message.rstrip('\n').replace('\\n', '\n')
+    if reply != _REPLY_RESTART:
+      break
+    # The server restarts, and then the request is retried.
+    print message, 'Waiting for the configure server to restart...'
+
+  if message:
+    print message
+  return 0 if reply == _REPLY_OK else 1
+
+
+def _parse_args():
+  parser = argparse.ArgumentParser(
+      description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+  parser.add_argument('command', choices=('start', _REGENERATE, _STOP))
+  return parser.parse_args()
+
+
+def main():
+  args = _parse_args()
+  logging_util.setup()
+  OPTIONS.parse_configure_file()
+  os.chdir(build_common.get_arc_root())
+  if args.command == 'start':
+    return _start()
+  return _send_command(args.command)
+
+
+if __name__ == '__main__':
+  sys.exit(main())
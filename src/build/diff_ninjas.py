@@ -5,6 +5,7 @@
 # found in the LICENSE file.
 
 import argparse
+import collections
 import os
 import shutil
 import subprocess
@@ -64,6 +65,250 @@ def _handle_meld(extra_args=None):
   return 0
 
 
+# A build statement, normalized so that the order of the paths and the
+# variables, and the whitespace do not matter. All fields but |rule| are
+# sorted tuples. |variables| is a tuple of (name, value).
+_Edge = collections.namedtuple(
+    '_Edge', ['rule', 'outputs', 'implicit_outputs', 'inputs',
+              'implicit_inputs', 'order_only_inputs', 'variables'])
+
+
+class _NinjaTree(object):
+  """Build statements, rules and variables parsed from a tree of ninja files.
+
+  Build statements are keyed by their outputs, rules by their names, and
+  variables defined at the top level of a file by the relative path of the
+  file and their names, as files are not parsed across include and subninja.
+  """
+
+  def __init__(self):
+    self.edges = {}
+    self.rules = collections.defaultdict(set)
+    self.variables = {}
+
+  def get_stats(self):
+    """Returns the number of edges and rules, and the largest fan-in/out.
+
+    The fan-in of an edge is the number of its inputs, and the fan-out of a
+    path is the number of edges that use it as an input. The largest ones are
+    (count, edge key or path), or None if there is no edge.
+    """
+    fan_out = collections.defaultdict(int)
+    max_fan_in = None
+    for key, edge in self.edges.iteritems():
+      all_inputs = (edge.inputs + edge.implicit_inputs +
+                    edge.order_only_inputs)
+      max_fan_in = max(max_fan_in, (len(all_inputs), key))
+      for path in all_inputs:
+        fan_out[path] += 1
+    max_fan_out = None
+    if fan_out:
+      max_fan_out = max((count, path) for path, count in fan_out.iteritems())
+    return len(self.edges), len(self.rules), max_fan_in, max_fan_out
+
+
+def _read_logical_lines(f):
+  """Yields (is_indented, line) joining the lines continued by '$'."""
+  pending = None
+  for line in f:
+    line = line.rstrip('\r\n')
+    if pending is not None:
+      line = pending + line.lstrip(' ')
+      pending = None
+    elif not line.strip() or line.lstrip(' ').startswith('#'):
+      continue
+    trailing_dollars = len(line) - len(line.rstrip('$'))
+    if trailing_dollars % 2:
+      pending = line[:-1]
+      continue
+    yield line.startswith(' '), line.strip(' ')
+  if pending is not None:
+    yield pending.startswith(' '), pending.strip(' ')
+
+
+def _split_unescaped(text, separator):
+  """Splits |text| at |separator| which is not escaped by '$'.
+
+  Escape sequences are kept as is. If |separator| is ' ', empty tokens are
+  dropped.
+  """
+  tokens = []
+  current = []
+  i = 0
+  while i < len(text):
+    if text[i] == '$':
+      current.append(text[i:i + 2])
+      i += 2
+      continue
+    if text[i] == separator:
+      tokens.append(''.join(current))
+      current = []
+    else:
+      current.append(text[i])
+    i += 1
+  tokens.append(''.join(current))
+  if separator == ' ':
+    tokens = [token for token in tokens if token]
+  return tokens
+
+
+def _parse_variable(line):
+  name, _, value = line.partition('=')
+  return name.strip(), ' '.join(value.split())
+
+
+def _parse_build(line, variables):
+  # A colon in a path is escaped as '$:'.
+  tokens = _split_unescaped(line[len('build '):], ':')
+  outputs_text, inputs_text = tokens[0], ':'.join(tokens[1:])
+  outputs = _split_unescaped(outputs_text, ' ')
+  inputs = _split_unescaped(inputs_text, ' ')
+  # |inputs| starts with the rule name.
+  groups = {'': [], '|': [], '||': []}
+  separator = ''
+  for token in inputs[1:]:
+    if token in groups:
+      separator = token
+    else:
+      groups[separator].append(token)
+  implicit_outputs = []
+  if '|' in outputs:
+    implicit_outputs = outputs[outputs.index('|') + 1:]
+    outputs = outputs[:outputs.index('|')]
+  return _Edge(rule=inputs[0] if inputs else '',
+               outputs=tuple(sorted(outputs)),
+               implicit_outputs=tuple(sorted(implicit_outputs)),
+               inputs=tuple(sorted(groups[''])),
+               implicit_inputs=tuple(sorted(groups['|'])),
+               order_only_inputs=tuple(sorted(groups['||'])),
+               variables=tuple(sorted(variables)))
+
+
+def _parse_ninja_file(path, relative_path, tree):
+  with open(path) as f:
+    lines = list(_read_logical_lines(f))
+  i = 0
+  while i < len(lines):
+    _, line = lines[i]
+    i += 1
+    bindings = []
+    while i < len(lines) and lines[i][0]:
+      bindings.append(_parse_variable(lines[i][1]))
+      i += 1
+    keyword = line.split(' ', 1)[0]
+    if keyword == 'build':
+      edge = _parse_build(line, bindings)
+      tree.edges[' '.join(edge.outputs + edge.implicit_outputs)] = edge
+    elif keyword == 'rule':
+      tree.rules[line.split(None, 1)[1]].add(tuple(sorted(bindings)))
+    elif keyword not in ('pool', 'default', 'include', 'subninja'):
+      name, value = _parse_variable(line)
+      tree.variables[(relative_path, name)] = value
+
+
+def _parse_ninja_tree(directory):
+  tree = _NinjaTree()
+  for root, _, files in os.walk(directory):
+    for name in files:
+      if name.endswith('.ninja'):
+        path = os.path.join(root, name)
+        _parse_ninja_file(path, os.path.relpath(path, directory), tree)
+  return tree
+
+
+def _describe_edge_change(old_edge, new_edge):
+  changes = []
+  if old_edge.rule != new_edge.rule:
+    changes.append('rule: %s -> %s' % (old_edge.rule, new_edge.rule))
+  for field in ('inputs', 'implicit_inputs', 'order_only_inputs',
+                'outputs', 'implicit_outputs'):
+    old_paths = set(getattr(old_edge, field))
+    new_paths = set(getattr(new_edge, field))
+    if old_paths != new_paths:
+      changes.append('%s: %s' % (field, ' '.join(
+          ['-' + path for path in sorted(old_paths - new_paths)] +
+          ['+' + path for path in sorted(new_paths - old_paths)])))
+  old_variables = dict(old_edge.variables)
+  new_variables = dict(new_edge.variables)
+  for name in sorted(set(old_variables) | set(new_variables)):
+    if old_variables.get(name) != new_variables.get(name):
+      changes.append('$%s: %r -> %r' % (
+          name, old_variables.get(name), new_variables.get(name)))
+  return changes
+
+
+def _diff_dicts(old, new):
+  """Returns the sorted keys removed, added and changed from |old| to |new|."""
+  removed = sorted(set(old) - set(new))
+  added = sorted(set(new) - set(old))
+  changed = sorted(key for key in set(old) & set(new)
+                   if old[key] != new[key])
+  return removed, added, changed
+
+
+def _diff_ninja_trees(old_tree, new_tree, out=sys.stdout):
+  """Prints the semantic differences from |old_tree| to |new_tree|.
+
+  Returns:
+      The number of the differences.
+  """
+  for label, tree in (('Old', old_tree), ('New', new_tree)):
+    edge_count, rule_count, max_fan_in, max_fan_out = tree.get_stats()
+    out.write('%s: %d edges, %d rules' % (label, edge_count, rule_count))
+    if max_fan_in:
+      out.write(', largest fan-in %d (%s)' % max_fan_in)
+    if max_fan_out:
+      out.write(', largest fan-out %d (%s)' % max_fan_out)
+    out.write('\n')
+
+  removed, added, changed = _diff_dicts(old_tree.edges, new_tree.edges)
+  counts_per_rule = collections.defaultdict(lambda: [0, 0, 0])
+  for key in removed:
+    counts_per_rule[old_tree.edges[key].rule][0] += 1
+  for key in added:
+    counts_per_rule[new_tree.edges[key].rule][1] += 1
+  for key in changed:
+    counts_per_rule[new_tree.edges[key].rule][2] += 1
+  if counts_per_rule:
+    out.write('\n%-40s %8s %8s %8s\n' % ('rule', 'removed', 'added',
+                                         'changed'))
+    for rule, counts in sorted(counts_per_rule.iteritems()):
+      out.write('%-40s %8d %8d %8d\n' % tuple([rule] + counts))
+
+  differences = []
+  for key in removed:
+    differences.append('- build %s (%s)' % (key, old_tree.edges[key].rule))
+  for key in added:
+    differences.append('+ build %s (%s)' % (key, new_tree.edges[key].rule))
+  for key in changed:
+    differences.append('~ build %s: %s' % (key, '; '.join(
+        _describe_edge_change(old_tree.edges[key], new_tree.edges[key]))))
+  for marker, keys in zip('-+~', _diff_dicts(old_tree.rules, new_tree.rules)):
+    differences.extend('%s rule %s' % (marker, key) for key in keys)
+  removed, added, changed = _diff_dicts(old_tree.variables,
+                                        new_tree.variables)
+  for key in removed:
+    differences.append('- %s: $%s' % key)
+  for key in added:
+    differences.append('+ %s: $%s = %r' % (key + (new_tree.variables[key],)))
+  for key in changed:
+    differences.append('~ %s: $%s: %r -> %r' % (
+        key + (old_tree.variables[key], new_tree.variables[key])))
+
+  if differences:
+    out.write('\n' + '\n'.join(differences) + '\n')
+  out.write('\n%d semantic differences\n' % len(differences))
+  return len(differences)
+
+
+def _handle_semantic(extra_args=None):
+  _handle_diff_common_setup()
+  if _diff_ninja_trees(_parse_ninja_tree(_STASH_DIR),
+                       _parse_ninja_tree(_CURRENT_DIR)):
+    return 1
+  return 0
+
+
 def main():
   description = """
 Helper script for viewing differences in the ninja build scripts that may be
@@ -85,18 +330,24 @@ Typical usage:
 
 If you have meld installed, you can also use it for a nicer interactive diff:
 
-  $ %(prog)s meld"""
+  $ %(prog)s meld
+
+To see only the differences that matter to ninja, ignoring the order of the
+lines, paths and variables, and whitespace, with the counts per rule:
+
+  $ %(prog)s semantic"""
 
   parser = argparse.ArgumentParser(
       description=description,
       epilog=epilog,
       formatter_class=argparse.RawDescriptionHelpFormatter)
-  parser.add_argument('command', choices=['stash', 'diff', 'meld'])
+  parser.add_argument('command', choices=['stash', 'diff', 'meld', 'semantic'])
   args, extra_args = parser.parse_known_args()
 
   return dict(stash=_handle_stash,
               diff=_handle_diff,
-              meld=_handle_meld)[args.command](extra_args)
+              meld=_handle_meld,
+              semantic=_handle_semantic)[args.command](extra_args)
 
 if __name__ == '__main__':
   sys.exit(main())
@@ -0,0 +1,128 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import StringIO
+import tempfile
+import textwrap
+import unittest
+
+from src.build import diff_ninjas
+from src.build.util import file_util
+
+_FOO_NINJA = """\
+# Generated by foo.
+cflags = -O2 -g
+rule cc
+  command = gcc $cflags -c $in -o $out
+  description = CC $out
+build out/foo.o: cc src/foo.c | src/foo.h src/common.h || out/gen.stamp
+  cflags = $cflags -DFOO
+  extra = a
+build out/bar.o: cc src/bar.c | src/common.h
+build out/foo.so | out/foo.so.TOC: ld out/foo.o out/bar.o
+"""
+
+# The same as _FOO_NINJA, but the lines, paths and variables are reordered,
+# and the whitespace and line breaks are changed.
+_REORDERED_FOO_NINJA = """\
+rule cc
+  description = CC $out
+  command = gcc  $cflags -c $in -o $out
+build out/bar.o: cc src/bar.c | src/common.h
+
+build out/foo.so | out/foo.so.TOC: ld out/bar.o $
+    out/foo.o
+cflags = -O2   -g
+build out/foo.o: cc src/foo.c | src/common.h src/foo.h || out/gen.stamp
+  extra = a
+  cflags = $cflags -DFOO
+"""
+
+_BUILD_NINJA = """\
+rule ld
+  command = ld $in -o $out
+subninja out/generated_ninja/foo.ninja
+default out/foo.so
+"""
+
+
+class DiffNinjasTest(unittest.TestCase):
+  def setUp(self):
+    self._tmpdir = tempfile.mkdtemp(prefix='diff_ninjas_test')
+
+  def tearDown(self):
+    shutil.rmtree(self._tmpdir)
+
+  def _parse(self, name, foo_ninja):
+    directory = os.path.join(self._tmpdir, name)
+    file_util.makedirs_safely(directory)
+    for filename, content in (('foo.ninja', foo_ninja),
+                              ('build.ninja', _BUILD_NINJA)):
+      with open(os.path.join(directory, filename), 'w') as f:
+        f.write(content)
+    return diff_ninjas._parse_ninja_tree(directory)
+
+  def _diff(self, old_foo_ninja, new_foo_ninja):
+    out = StringIO.StringIO()
+    count = diff_ninjas._diff_ninja_trees(
+        self._parse('old', old_foo_ninja), self._parse('new', new_foo_ninja),
+        out)
+    return count, out.getvalue()
+
+  def test_parse(self):
+    tree = self._parse('foo', _FOO_NINJA)
+    edge = tree.edges['out/foo.o']
+    self.assertEquals('cc', edge.rule)
+    self.assertEquals(('src/foo.c',), edge.inputs)
+    self.assertEquals(('src/common.h', 'src/foo.h'), edge.implicit_inputs)
+    self.assertEquals(('out/gen.stamp',), edge.order_only_inputs)
+    self.assertEquals((('cflags', '$cflags -DFOO'), ('extra', 'a')),
+                      edge.variables)
+    edge = tree.edges['out/foo.so out/foo.so.TOC']
+    self.assertEquals(('out/foo.so.TOC',), edge.implicit_outputs)
+    self.assertEquals(('out/bar.o', 'out/foo.o'), edge.inputs)
+    self.assertEquals('-O2 -g', tree.variables[('foo.ninja', 'cflags')])
+    self.assertEquals({'cc', 'ld'}, set(tree.rules))
+
+    # 3 edges and 2 rules. src/common.h is used by 2 edges.
+    self.assertEquals(
+        (3, 2, (4, 'out/foo.o'), (2, 'src/common.h')), tree.get_stats())
+
+  def test_parse_escaped_colon(self):
+    edge = diff_ninjas._parse_build('build out/a$:b: cc in.c', [])
+    self.assertEquals('cc', edge.rule)
+    self.assertEquals(('out/a$:b',), edge.outputs)
+    self.assertEquals(('in.c',), edge.inputs)
+
+  def test_no_semantic_difference(self):
+    count, output = self._diff(_FOO_NINJA, _REORDERED_FOO_NINJA)
+    self.assertEquals(0, count)
+    self.assertIn('0 semantic differences', output)
+
+  def test_semantic_difference(self):
+    new_foo_ninja = (
+        _FOO_NINJA.replace('src/foo.h ', '')
+        .replace('extra = a', 'extra = b')
+        .replace('build out/bar.o: cc src/bar.c | src/common.h\n', '') +
+        textwrap.dedent("""\
+            build out/baz.o: cc src/baz.c
+            build out/qux.o: cc src/qux.c
+            """))
+    count, output = self._diff(_FOO_NINJA, new_foo_ninja)
+    self.assertEquals(4, count)
+    lines = output.splitlines()
+    self.assertIn('- build out/bar.o (cc)', lines)
+    self.assertIn('+ build out/baz.o (cc)', lines)
+    self.assertIn(
+        "~ build out/foo.o: implicit_inputs: -src/foo.h; $extra: 'a' -> 'b'",
+        lines)
+    # Counts of removed, added and changed edges.
+    self.assertEquals(['cc', '1', '2', '1'], [
+        line for line in lines if line.startswith('cc ')][0].split())
+
+
+if __name__ == '__main__':
+  unittest.main()
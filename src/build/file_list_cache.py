@@ -11,7 +11,7 @@ import pickle
 import stat
 
 
-_CACHE_FILE_VERSION = 0
+_CACHE_FILE_VERSION = 1
 
 
 # Splits given |cache_entries| into |cache_hit|, |cache_miss| and removed
@@ -42,16 +42,39 @@ def _check_cache_freshness(cache_entries):
   return cache_hit, cache_miss
 
 
-def _calculate_dir_contents_hash(dirs, files):
-  return hashlib.sha1('\0'.join(dirs + [''] + files)).hexdigest()
+def _calculate_dir_contents_hash(files):
+  return hashlib.sha1('\0'.join(files)).hexdigest()
+
+
+# Returns the digest of the matched files in |cache_entries|.
+# Directories without matched files do not contribute, so that adding or
+# removing a directory, or a file which does not match the query, keeps the
+# digest.
+def _calculate_listing_digest(cache_entries):
+  digest = hashlib.sha1()
+  for path, cache in sorted(cache_entries.iteritems()):
+    if cache.contents:
+      digest.update('%s\0%s\0' % (path, cache.content_hash))
+  return digest.hexdigest()
 
 
 class Query:
-  def __init__(self, base_paths, matcher, root, include_subdirectories):
+  # |excluded_dir_matcher| is matched against the paths of the directories
+  # the same way as |matcher|, and the matched directories are not walked.
+  # Symbolic links to directories are walked only if |follow_links| is True.
+  def __init__(self, base_paths, matcher, root, include_subdirectories,
+               excluded_dir_matcher=None, follow_links=True):
     self.base_paths = sorted(base_paths)
     self.matcher = matcher
     self.root = root
     self.include_subdirectories = include_subdirectories
+    self.excluded_dir_matcher = excluded_dir_matcher
+    self.follow_links = follow_links
+
+  def get_match_path(self, path):
+    if self.root is None:
+      return path
+    return os.path.relpath(path, self.root)
 
   def __eq__(self, other):
     return pickle.dumps(self) == pickle.dumps(other)
@@ -69,11 +92,14 @@ class CacheEntry:
 
 
 class FileListCache:
-  def __init__(self, query, entries=None):
+  def __init__(self, query, entries=None, digest=None):
     self.query = query
     self.cache_entries = {} if entries is None else entries
+    # The digest of the matched files, or None if not listed yet.
+    self.digest = digest
 
   # Searches cached entries and refreshes them if needed.
+  # Returns True if the matched files are the same as the previous listing.
   def refresh_cache(self):
     cache_hit, cache_miss = _check_cache_freshness(self.cache_entries)
 
@@ -81,11 +107,15 @@ class FileListCache:
       if base_path not in cache_hit and base_path not in cache_miss:
         cache_miss[base_path] = None
 
+    if not cache_miss and len(cache_hit) == len(self.cache_entries):
+      # No directory is updated or removed.
+      return self.digest is not None
+
     new_cache_entries = cache_hit
-    cache_is_fresh = True
 
     for path in cache_miss:
-      for root, dirs, files in os.walk(path, followlinks=True):
+      for root, dirs, files in os.walk(
+          path, followlinks=self.query.follow_links):
         matched_files = []
         for file in files:
           file_path = os.path.join(root, file)
@@ -93,18 +123,19 @@ class FileListCache:
             matched_files.append(file_path)
             continue
 
-          if self.query.root is None:
-            match_path = file_path
-          else:
-            match_path = os.path.relpath(file_path, self.query.root)
-          if self.query.matcher.match(match_path):
+          if self.query.matcher.match(self.query.get_match_path(file_path)):
             matched_files.append(file_path)
         matched_files = sorted(matched_files)
 
         if not self.query.include_subdirectories:
           dirs[:] = []
+        elif self.query.excluded_dir_matcher:
+          dirs[:] = [
+              subdir_name for subdir_name in dirs
+              if not self.query.excluded_dir_matcher.match(
+                  self.query.get_match_path(os.path.join(root, subdir_name)))]
 
-        content_hash = _calculate_dir_contents_hash(sorted(dirs), matched_files)
+        content_hash = _calculate_dir_contents_hash(matched_files)
         recurse = []
         # Recurse into new directories only.
         for subdir_name in dirs:
@@ -116,19 +147,18 @@ class FileListCache:
         # Populate cache for |root|.
         cache = cache_miss.get(root)
         if cache:
-          if cache.content_hash != content_hash:
-            cache_is_fresh = False
           cache.content_hash = content_hash
           cache.contents = matched_files
           new_cache_entries[root] = cache
         else:
           cache = CacheEntry(os.stat(root).st_mtime,
                              content_hash, matched_files)
-          cache_is_fresh = False
           new_cache_entries[root] = cache
 
-      self.cache_entries = new_cache_entries
-
+    self.cache_entries = new_cache_entries
+    digest = _calculate_listing_digest(new_cache_entries)
+    cache_is_fresh = digest == self.digest
+    self.digest = digest
     return cache_is_fresh
 
   def enumerate_files(self):
@@ -145,6 +175,7 @@ class FileListCache:
         'version': _CACHE_FILE_VERSION,
         'query': pickle.dumps(self.query),
         'cache_entries': list(self._enumerate_entries()),
+        'digest': self.digest,
     }
 
   def save_to_file(self, file_path):
@@ -167,7 +198,7 @@ def file_list_cache_from_dict(data):
     return None
 
   entries = dict(_entries_from_list(data['cache_entries']))
-  return FileListCache(query, entries)
+  return FileListCache(query, entries, data['digest'])
 
 
 def load_from_file(file_path):
@@ -73,7 +73,32 @@ class FileListCacheUnittest(unittest.TestCase):
     os.remove('foo/o/o/o.h')
     self.assertTrue(cache.refresh_cache())
 
+    # Removing a directory without matched files should not affect the
+    # freshness.
     os.rmdir('foo/o/o')
+    self.assertTrue(cache.refresh_cache())
+
+  def testUnmatchedAddition(self):
+    query = file_list_cache.Query(
+        ['foo'], re.compile('.*\.cc$'), None, True)
+    cache = file_list_cache.FileListCache(query)
+    self.assertFalse(cache.refresh_cache())
+
+    # Unmatched files in new directories should not affect the freshness.
+    os.makedirs('foo/bar/docs')
+    _touch('foo/bar/docs/README')
+    _touch('foo/bar/baz/hoge.cc.orig')
+    self.assertTrue(cache.refresh_cache())
+    os.makedirs('foo/empty')
+    self.assertTrue(cache.refresh_cache())
+
+    # A matched file in a new directory should make the cache dirty.
+    _touch('foo/bar/docs/example.cc')
+    self.assertFalse(cache.refresh_cache())
+    self.assertTrue(cache.refresh_cache())
+
+    # Moving a matched file to another directory should make the cache dirty.
+    os.rename('foo/bar/docs/example.cc', 'foo/empty/example.cc')
     self.assertFalse(cache.refresh_cache())
 
   def testListingFiles(self):
@@ -98,6 +123,33 @@ class FileListCacheUnittest(unittest.TestCase):
                                   'foo/bar', True),
                       [])
 
+  def testExcludedDirectories(self):
+    os.makedirs('foo/qux')
+    _touch('foo/qux/qux.cc')
+    self.assertEquals(sorted(_list_files(['foo'], re.compile('.*\.cc'), None,
+                                         True, re.compile('foo/bar$'))),
+                      ['foo/qux/qux.cc'])
+
+    # The excluded directories are matched on the relative path to the root.
+    self.assertEquals(sorted(_list_files(['foo'], re.compile('.*\.cc'), 'foo',
+                                         True, re.compile('qux$'))),
+                      ['foo/bar/baz/hoge.cc'])
+
+  def testFollowLinks(self):
+    os.makedirs('oof')
+    _touch('oof/link.cc')
+    os.symlink('../oof', 'foo/dirlink')
+    os.symlink('../oof/link.cc', 'foo/filelink.cc')
+    self.assertEquals(sorted(_list_files(['foo'], re.compile('.*\.cc'), None,
+                                         True)),
+                      ['foo/bar/baz/hoge.cc', 'foo/dirlink/link.cc',
+                       'foo/filelink.cc'])
+
+    # Symbolic links to files are still listed without following links.
+    self.assertEquals(sorted(_list_files(['foo'], re.compile('.*\.cc'), None,
+                                         True, None, False)),
+                      ['foo/bar/baz/hoge.cc', 'foo/filelink.cc'])
+
   def testQueryEquality(self):
     query = file_list_cache.Query(['foo'], re.compile('.*\.cc'), None, True)
     query2 = file_list_cache.Query(['foo'], re.compile('.*\.h'), None, True)
@@ -121,6 +173,14 @@ class FileListCacheUnittest(unittest.TestCase):
 
     self.assertEquals(query, cache2.query)
     self.assertTrue(cache.refresh_cache())
+    self.assertTrue(cache2.refresh_cache())
+
+    # The digest of the matched files is kept in the file.
+    os.makedirs('foo/docs')
+    _touch('foo/docs/README')
+    self.assertTrue(cache2.refresh_cache())
+    _touch('foo/docs/piyo.cc')
+    self.assertFalse(cache2.refresh_cache())
 
 if __name__ == '__main__':
   unittest.main()
@@ -4,23 +4,181 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 
+"""Generates out/TAGS for the C, C++ and Java sources.
+
+The definitions are extracted with regular expressions, and the section of
+each file in TAGS is kept in a cache. On later runs, only the files changed
+since the last run are read again.
+"""
+
+import errno
+import marshal
 import os
+import re
+import sys
 
 from src.build import build_common
+from src.build import file_list_cache
+from src.build.util import file_util
+
+_TAG_FILE = os.path.join(build_common.OUT_DIR, 'TAGS')
+_CACHE_FILE = os.path.join(build_common.OUT_DIR, 'TAGS.cache')
+_CACHE_VERSION = 1
+
+# The paths not to index, relative to the ARC root.
+_EXCLUDED_PATHS = [os.path.join(build_common.OUT_DIR, 'staging')]
+
+_SOURCE_FILE_PATTERN = re.compile(r'.*\.(c|cc|cpp|h|java)$')
+
+_C_DEFINITION_PATTERNS = [
+    re.compile(r'^\s*#\s*define\s+(\w+)'),
+    # Classes, structs, unions and enums, but not forward declarations.
+    re.compile(r'^\s*(?:template\s*<[^>]*>\s*)?(?:typedef\s+)?'
+               r'(?:class|struct|union|enum)\s+(?:\w+\s+)*?(\w+)\s*(?:[:{]|$)'),
+    re.compile(r'^\s*typedef\s.*?\(\s*\*\s*(\w+)\s*\)'),
+    re.compile(r'^\s*typedef\s.*?(\w+)\s*(?:\[[^\]]*\]\s*)?;'),
+    # Functions defined at the top level, which start at the beginning of the
+    # line with their return type.
+    re.compile(r'^(?!(?:return|else|if|for|while|switch|do|case|goto|delete|'
+               r'new|using|namespace)\b)[A-Za-z_][\w:<>,*&~ \t]*?'
+               r'\b(~?[A-Za-z_]\w*(?:::~?\w+)*)\s*\([^;]*$'),
+]
+
+# Names which the patterns above match in declarations like
+# "static int (*function_pointer)(int);", but which are not definitions.
+_C_KEYWORDS = frozenset([
+    'bool', 'char', 'const', 'double', 'float', 'int', 'long', 'short',
+    'signed', 'sizeof', 'unsigned', 'void', 'volatile'])
+
+_JAVA_MODIFIERS = (r'(?:(?:public|protected|private|static|final|abstract|'
+                   r'synchronized|native|strictfp)\s+)')
+_JAVA_DEFINITION_PATTERNS = [
+    re.compile(r'^\s*' + _JAVA_MODIFIERS + r'*(?:class|interface|enum|'
+               r'@interface)\s+(\w+)'),
+    # Methods with modifiers, including constructors.
+    re.compile(r'^\s*' + _JAVA_MODIFIERS + r'+(?:<[^>]*>\s*)?'
+               r'(?:[\w.<>\[\],?]+\s+)?(\w+)\s*\('),
+]
+
+
+def _get_definition_patterns(path):
+  if path.endswith('.java'):
+    return _JAVA_DEFINITION_PATTERNS
+  return _C_DEFINITION_PATTERNS
+
+
+def _make_section(path, tag_path):
+  """Returns the section of TAGS for a file.
+
+  Args:
+      path: The path to read the file from.
+      tag_path: The path to the file written to TAGS.
+  """
+  patterns = _get_definition_patterns(path)
+  tags = []
+  offset = 0
+  with open(path, 'rb') as f:
+    for index, line in enumerate(f):
+      for pattern in patterns:
+        match = pattern.search(line)
+        if match and match.group(1) not in _C_KEYWORDS:
+          # The tag contains the line up to the name, then the name, the line
+          # number and the offset of the line.
+          tags.append('%s\x7f%s\x01%d,%d\n' % (
+              line[:match.end(1)], match.group(1), index + 1, offset))
+          break
+      offset += len(line)
+  tags = ''.join(tags)
+  return '\x0c\n%s,%d\n%s' % (tag_path, len(tags), tags)
+
+
+def _load_cache(cache_file, query):
+  """Returns the file listing and the sections of TAGS of the last run."""
+  try:
+    with open(cache_file, 'rb') as f:
+      data = marshal.load(f)
+  except (IOError, EOFError, ValueError, TypeError):
+    data = None
+  if data and data.get('version') == _CACHE_VERSION:
+    listing = file_list_cache.file_list_cache_from_dict(data['listing'])
+    if listing and listing.query == query:
+      return listing, data['sections']
+  return file_list_cache.FileListCache(query), {}
+
+
+class _ExcludedPathMatcher(object):
+  """Matches the excluded directories.
+
+  This needs to be picklable for file_list_cache.
+  """
+
+  def __init__(self, excluded_paths):
+    self._excluded_paths = tuple(sorted(
+        os.path.normpath(path) for path in excluded_paths))
+
+  def match(self, path):
+    return os.path.normpath(path) in self._excluded_paths
+
+
+def generate_tags(tag_file, cache_file, root, excluded_paths):
+  """Generates the TAGS file for the source files under |root|.
+
+  As find does by default, symbolic links to directories are not followed.
+
+  Args:
+      tag_file: The path of TAGS to write.
+      cache_file: The path of the cache to keep the sections of TAGS in.
+      root: The directory to index.
+      excluded_paths: The directories not to index, relative to |root|.
+
+  Returns:
+      The number of the files read for the definitions.
+  """
+  query = file_list_cache.Query(
+      [root], _SOURCE_FILE_PATTERN, root, True,
+      excluded_dir_matcher=_ExcludedPathMatcher(excluded_paths),
+      follow_links=False)
+  listing, cached_sections = _load_cache(cache_file, query)
+  listing.refresh_cache()
+
+  tag_dir = os.path.dirname(os.path.abspath(tag_file))
+  sections = {}
+  read_count = 0
+  for path in sorted(listing.enumerate_files()):
+    try:
+      st = os.stat(path)
+    except OSError as e:
+      # Broken symbolic links are not indexed.
+      if e.errno == errno.ENOENT:
+        continue
+      raise
+    entry = cached_sections.get(path)
+    if not entry or entry[0] != st.st_mtime or entry[1] != st.st_size:
+      entry = (st.st_mtime, st.st_size,
+               _make_section(path, os.path.relpath(path, tag_dir)))
+      read_count += 1
+    sections[path] = entry
+
+  file_util.makedirs_safely(tag_dir)
+  file_util.write_atomically(
+      tag_file, ''.join(sections[path][2] for path in sorted(sections)))
+  file_util.makedirs_safely(os.path.dirname(os.path.abspath(cache_file)))
+  file_util.generate_file_atomically(
+      cache_file, lambda f: marshal.dump({
+          'version': _CACHE_VERSION,
+          'listing': listing.to_dict(),
+          'sections': sections,
+      }, f))
+  return read_count
+
+
+def main():
+  os.chdir(build_common.get_arc_root())
+  read_count = generate_tags(_TAG_FILE, _CACHE_FILE, os.curdir,
+                             _EXCLUDED_PATHS)
+  print 'Generated %s, reading %d files.' % (_TAG_FILE, read_count)
+  return 0
+
 
-os.chdir(build_common.get_arc_root())
-if not os.path.exists(build_common.OUT_DIR):
-    os.mkdir(build_common.OUT_DIR)
-tag_file = os.path.join(build_common.OUT_DIR, 'TAGS')
-if os.path.exists(tag_file):
-    os.unlink(tag_file)
-os.system('find . \\( '
-          '-name \\*.cc -or '
-          '-name \\*.cpp -or '
-          '-name \\*.c -or '
-          '-name \\*.java -or '
-          '-name \\*.h \\) '
-          '-and \\! -wholename ./out/staging/\\* '  # ignore out/staging
-          '-and \\! -xtype l '  # ignore broken symlinks
-          '-print0 '  # support filenames with spaces, with xargs -0
-          '| xargs -0 etags --append --output=' + tag_file)
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,157 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.build import generate_etags
+
+_FILES = {
+    'src/foo.cc': '\n'.join([
+        '#include "foo.h"',
+        '',
+        'namespace arc {',
+        '',
+        'static int (*g_function_pointer)(int);',
+        '',
+        'int Foo::Bar(int x) {',
+        '  return Baz(x);',
+        '}',
+        '',
+        '}  // namespace arc',
+        '']),
+    'src/foo.h': '\n'.join([
+        '#define FOO_H_',
+        'class Foo;',
+        'class ARC_EXPORT Foo : public Base {',
+        ' public:',
+        '  typedef std::vector<int> IntVector;',
+        '  int Bar(int x);',
+        '};',
+        'struct Point {',
+        '  int x;',
+        '};',
+        '']),
+    'src/Foo.java': '\n'.join([
+        'public final class Foo {',
+        '    private static int sCount;',
+        '    public Foo(int count) {',
+        '    }',
+        '    protected static void update(String name) {',
+        '        sCount = count(name);',
+        '    }',
+        '}',
+        '']),
+    'src/notes.txt': 'int NotIndexed(int x) {\n',
+    'top.c': 'int Top(void) {\n',
+    'out/staging/bar.cc': 'int NotIndexed(int x) {\n',
+    'out/target/gen.c': 'void Generated(void) {\n',
+    'out/direct.c': 'void Direct(void) {\n',
+    'cache/downloaded.c': 'int NotIndexed(int x) {\n',
+}
+
+
+class GenerateEtagsTest(unittest.TestCase):
+  def setUp(self):
+    self._tmpdir = tempfile.mkdtemp(prefix='generate_etags_test')
+    self._root = os.path.join(self._tmpdir, 'root')
+    for path, content in _FILES.iteritems():
+      self._write(path, content, 100)
+    # Symbolic links to directories are not followed, as find does not.
+    os.symlink(os.path.join(self._root, 'cache'),
+               os.path.join(self._root, 'src', 'downloaded'))
+    os.symlink(os.pardir, os.path.join(self._root, 'src', 'cycle'))
+    # Let the file listing find the directories changed later in the tests.
+    for root, dirs, _ in os.walk(self._root):
+      for name in dirs:
+        os.utime(os.path.join(root, name), (0, 0))
+    self._tag_file = os.path.join(self._root, 'out', 'TAGS')
+    self._cache_file = os.path.join(self._root, 'out', 'TAGS.cache')
+
+  def tearDown(self):
+    shutil.rmtree(self._tmpdir)
+
+  def _write(self, path, content, mtime):
+    path = os.path.join(self._root, path)
+    if not os.path.isdir(os.path.dirname(path)):
+      os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as f:
+      f.write(content)
+    os.utime(path, (mtime, mtime))
+
+  def _generate(self):
+    """Generates TAGS.
+
+    Returns:
+        A dict from the path in each section to its tag lines, and the number
+        of the files read.
+    """
+    read_count = generate_etags.generate_tags(
+        self._tag_file, self._cache_file, self._root,
+        generate_etags._EXCLUDED_PATHS + ['cache'])
+    with open(self._tag_file) as f:
+      content = f.read()
+    sections = {}
+    for section in content.split('\x0c\n')[1:]:
+      header, tags = section.split('\n', 1)
+      path, size = header.rsplit(',', 1)
+      self.assertEquals(int(size), len(tags))
+      sections[path] = tags.splitlines()
+    return sections, read_count
+
+  def test_generate(self):
+    sections, read_count = self._generate()
+    self.assertEquals(6, read_count)
+    self.assertEquals(
+        ['../src/Foo.java', '../src/foo.cc', '../src/foo.h', '../top.c',
+         'direct.c', 'target/gen.c'], sorted(sections))
+    self.assertEquals(['int Top\x7fTop\x011,0'], sections['../top.c'])
+    self.assertEquals(['int Foo::Bar\x7fFoo::Bar\x017,75'],
+                      sections['../src/foo.cc'])
+    self.assertEquals(
+        ['#define FOO_H_\x7fFOO_H_\x011,0',
+         'class ARC_EXPORT Foo\x7fFoo\x013,26',
+         '  typedef std::vector<int> IntVector\x7fIntVector\x015,72',
+         'struct Point\x7fPoint\x018,131'],
+        sections['../src/foo.h'])
+    self.assertEquals(
+        ['public final class Foo\x7fFoo\x011,0',
+         '    public Foo\x7fFoo\x013,56',
+         '    protected static void update\x7fupdate\x015,90'],
+        sections['../src/Foo.java'])
+
+  def test_incremental(self):
+    sections, _ = self._generate()
+
+    # Nothing is read if no file is changed.
+    new_sections, read_count = self._generate()
+    self.assertEquals(0, read_count)
+    self.assertEquals(sections, new_sections)
+
+    # Only the section of the updated file is changed.
+    self._write('src/foo.cc', 'void Qux() {\n' + _FILES['src/foo.cc'], 200)
+    new_sections, read_count = self._generate()
+    self.assertEquals(1, read_count)
+    self.assertEquals(['void Qux\x7fQux\x011,0',
+                       'int Foo::Bar\x7fFoo::Bar\x018,88'],
+                      new_sections.pop('../src/foo.cc'))
+    sections.pop('../src/foo.cc')
+    self.assertEquals(sections, new_sections)
+
+    # Added and removed files are found through the file listing.
+    self._write('src/sub/new.c', 'int New(void) {\n', 300)
+    os.remove(os.path.join(self._root, 'out', 'target', 'gen.c'))
+    new_sections, read_count = self._generate()
+    self.assertEquals(1, read_count)
+    self.assertEquals(['int New\x7fNew\x011,0'],
+                      new_sections.pop('../src/sub/new.c'))
+    sections.pop('target/gen.c')
+    new_sections.pop('../src/foo.cc')
+    self.assertEquals(sections, new_sections)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -6,16 +6,19 @@
 
 import argparse
 import hashlib
+import multiprocessing
 import os
 import re
 import shutil
 import subprocess
 import sys
 import tempfile
+import threading
 
 from src.build import build_common
 from src.build import toolchain
 from src.build.build_options import OPTIONS
+from src.build.util import concurrent
 from src.build.util import file_util
 
 _SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -24,6 +27,8 @@ _ARC_ROOT = os.path.dirname(os.path.dirname(_SCRIPT_DIR))
 _SUBAPK_PATH = 'assets/chimera-modules'
 _SUBAPK_PATTERN = os.path.join(_SUBAPK_PATH, '*.apk')
 
+_HASH_CHUNK_SIZE = 64 * 1024
+
 
 def _get_apk_install_location(sha1sum, filename):
   pattern = ('/data/data/com.google.android.gms/app_chimera/' +
@@ -38,12 +43,143 @@ def _calc_sha1(path):
   is expanded during runtime.
   """
   calc = hashlib.sha1()
-  with open(path, 'r') as f:
-    calc.update(f.read())
+  with open(path, 'rb') as f:
+    for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), ''):
+      calc.update(chunk)
   return calc.hexdigest()
 
 
-def _preoptimize_subapk(src_apk, dest_apk, work_dir):
+def _get_odex_cache_dir():
+  return os.path.join(build_common.get_build_dir(), 'gms_core_odex_cache')
+
+
+def _get_dex2oat_dependencies():
+  """Returns files, other than the inputs, which dex2oat output depends on."""
+  boot_image_dir = os.path.join(build_common.get_android_fs_root(),
+                                'system/framework', build_common.get_art_isa())
+  return [toolchain.get_tool('java', 'dex2oat'),
+          os.path.join(boot_image_dir, 'boot.art'),
+          os.path.join(boot_image_dir, 'boot.oat')]
+
+
+def _get_dex2oat_cmd(apk_path, install_path, odex_path):
+  return [
+      'src/build/filter_dex2oat_warnings.py',
+      toolchain.get_tool('java', 'dex2oat')
+  ] + build_common.get_dex2oat_for_apk_flags(
+      apk_path=apk_path,
+      apk_install_path=install_path,
+      output_odex_path=odex_path)
+
+
+class _OdexCache(object):
+  """Keeps odex files keyed by the input apk and the dex2oat command line.
+
+  Most inner apks are not changed when GmsCore is updated, so the odex files
+  from the previous run can be reused for them.
+  """
+
+  def __init__(self, cache_dir, dependencies):
+    """Constructor.
+
+    Args:
+        cache_dir: The directory to store the odex files.
+        dependencies: A list of files which the output of dex2oat depends on,
+            such as dex2oat itself and the boot image. If any of them is
+            updated, all cache entries are invalidated.
+    """
+    self._cache_dir = cache_dir
+    self._dependency_stamp = ' '.join(
+        '%s:%d:%f' % (path, os.stat(path).st_size, os.stat(path).st_mtime)
+        for path in dependencies)
+    self._used_keys = set()
+    self._lock = threading.Lock()
+
+  def get_key(self, apk_sha1, dex2oat_cmd, work_dir):
+    """Returns the cache key for running |dex2oat_cmd| on an apk.
+
+    |work_dir| is a temporary directory which differs on each run, so it is
+    excluded from the key.
+    """
+    calc = hashlib.sha1()
+    calc.update(apk_sha1)
+    calc.update(self._dependency_stamp)
+    for arg in dex2oat_cmd:
+      calc.update('\0' + arg.replace(work_dir, '$WORK_DIR'))
+    return calc.hexdigest()
+
+  def _get_path(self, key):
+    return os.path.join(self._cache_dir, key + '.odex')
+
+  def restore(self, key, odex_path):
+    """Copies the cached odex to |odex_path|. Returns False on cache miss."""
+    with self._lock:
+      self._used_keys.add(key)
+    cache_path = self._get_path(key)
+    if not os.path.exists(cache_path):
+      return False
+    shutil.copyfile(cache_path, odex_path)
+    return True
+
+  def store(self, key, odex_path):
+    cache_path = self._get_path(key)
+    file_util.makedirs_safely(self._cache_dir)
+    # Copy to a temporary file first, not to leave a broken odex in the cache
+    # when interrupted.
+    temp_path = '%s.%d.tmp' % (cache_path, threading.current_thread().ident)
+    shutil.copyfile(odex_path, temp_path)
+    os.rename(temp_path, cache_path)
+
+  def remove_unused_entries(self):
+    """Removes the odex files not used since this instance is created."""
+    if not os.path.isdir(self._cache_dir):
+      return
+    for filename in os.listdir(self._cache_dir):
+      if os.path.splitext(filename)[0] not in self._used_keys:
+        file_util.remove_file_force(os.path.join(self._cache_dir, filename))
+
+
+def _optimize_inner_apk(apk_path, odex_path, work_dir, get_dex2oat_cmd,
+                        odex_cache):
+  apk_sha1 = _calc_sha1(apk_path)
+  install_path = _get_apk_install_location(apk_sha1, os.path.basename(apk_path))
+  dex2oat_cmd = get_dex2oat_cmd(apk_path, install_path, odex_path)
+  key = odex_cache.get_key(apk_sha1, dex2oat_cmd, work_dir)
+  if odex_cache.restore(key, odex_path):
+    return True
+  if subprocess.call(dex2oat_cmd, cwd=_ARC_ROOT) != 0:
+    print 'ERROR: preoptimize failed for %s.' % apk_path
+    return False
+  odex_cache.store(key, odex_path)
+  return True
+
+
+def _optimize_inner_apks(inner_apk_list, work_dir, get_dex2oat_cmd,
+                         odex_cache, jobs):
+  """Runs dex2oat on each apk in parallel, and places the odex next to it.
+
+  Returns:
+      A list of the odex paths relative to |work_dir|, or None on failure.
+  """
+  odex_files = []
+  with concurrent.ThreadPoolExecutor(jobs, daemon=True) as executor:
+    futures = []
+    for apk_path in inner_apk_list:
+      apk_name = os.path.basename(apk_path)
+      odex_name = re.sub(r'\.apk$', '.odex', apk_name)
+      odex_path_in_apk = os.path.join(_SUBAPK_PATH, odex_name)
+      odex_path = os.path.join(work_dir, odex_path_in_apk)
+      odex_files.append(odex_path_in_apk)
+      futures.append(executor.submit(
+          _optimize_inner_apk, apk_path, odex_path, work_dir,
+          get_dex2oat_cmd, odex_cache))
+    if not all([future.result() for future in futures]):
+      return None
+  odex_cache.remove_unused_entries()
+  return odex_files
+
+
+def _preoptimize_subapk(src_apk, dest_apk, work_dir, jobs):
   # Extract inner apks from |src_apk|.
   # Note that we cannot use Python zipfile module for handling apk.
   # See: https://bugs.python.org/issue14315.
@@ -51,25 +187,11 @@ def _preoptimize_subapk(src_apk, dest_apk, work_dir):
   inner_apk_list = file_util.glob(os.path.join(work_dir, _SUBAPK_PATTERN))
 
   # Optimize each apk and place the output odex next to the apk.
-  odex_files = []
-  for apk_path in inner_apk_list:
-    apk_name = os.path.basename(apk_path)
-    odex_name = re.sub(r'\.apk$', '.odex', apk_name)
-    odex_path_in_apk = os.path.join(_SUBAPK_PATH, odex_name)
-    odex_path = os.path.join(work_dir, odex_path_in_apk)
-    odex_files.append(odex_path_in_apk)
-    install_path = _get_apk_install_location(_calc_sha1(apk_path), apk_name)
-
-    dex2oat_cmd = [
-        'src/build/filter_dex2oat_warnings.py',
-        toolchain.get_tool('java', 'dex2oat')
-    ] + build_common.get_dex2oat_for_apk_flags(
-        apk_path=apk_path,
-        apk_install_path=install_path,
-        output_odex_path=odex_path)
-    if subprocess.call(dex2oat_cmd, cwd=_ARC_ROOT) != 0:
-      print 'ERROR: preoptimize failed for %s.' % apk_path
-      return False
+  odex_cache = _OdexCache(_get_odex_cache_dir(), _get_dex2oat_dependencies())
+  odex_files = _optimize_inner_apks(
+      inner_apk_list, work_dir, _get_dex2oat_cmd, odex_cache, jobs)
+  if odex_files is None:
+    return False
 
   # Prepare |dest_apk|.
   shutil.copyfile(src_apk, dest_apk)
@@ -93,11 +215,15 @@ def main():
       description='Apply dex2oat to sub apks contained as assets in GmsCore.')
   parser.add_argument('--input', required=True, help='input apk')
   parser.add_argument('--output', required=True, help='output apk')
+  parser.add_argument('--jobs', '-j', type=int,
+                      default=multiprocessing.cpu_count(),
+                      help='Number of dex2oat processes to run in parallel.')
   args = parser.parse_args()
 
   work_dir = tempfile.mkdtemp()
   try:
-    return 0 if _preoptimize_subapk(args.input, args.output, work_dir) else 1
+    return 0 if _preoptimize_subapk(args.input, args.output, work_dir,
+                                    args.jobs) else 1
   finally:
     file_util.rmtree(work_dir)
 
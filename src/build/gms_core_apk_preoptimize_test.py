@@ -0,0 +1,111 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from src.build import gms_core_apk_preoptimize
+from src.build.util import file_util
+
+# Stands in for dex2oat. Writes a deterministic odex, and records each call.
+_STUB_DEX2OAT = """
+import sys
+args = dict(arg.split('=', 1) for arg in sys.argv[1:])
+with open(args['--dex-file']) as f:
+  content = f.read()
+with open(args['--oat-file'], 'w') as f:
+  f.write('odex:' + content)
+with open(args['--log-file'], 'a') as f:
+  f.write(args['--dex-file'] + '\\n')
+"""
+
+
+def _write(path, content):
+  file_util.makedirs_safely(os.path.dirname(path))
+  with open(path, 'w') as f:
+    f.write(content)
+
+
+def _read(path):
+  with open(path) as f:
+    return f.read()
+
+
+class GmsCoreApkPreoptimizeTest(unittest.TestCase):
+  def setUp(self):
+    self._tmpdir = tempfile.mkdtemp(prefix='gms_core_apk_preoptimize_test')
+    self._stub_path = os.path.join(self._tmpdir, 'dex2oat.py')
+    self._log_path = os.path.join(self._tmpdir, 'dex2oat.log')
+    self._cache_dir = os.path.join(self._tmpdir, 'cache')
+    _write(self._stub_path, _STUB_DEX2OAT)
+    _write(self._log_path, '')
+
+  def tearDown(self):
+    shutil.rmtree(self._tmpdir)
+
+  def _get_dex2oat_cmd(self, apk_path, install_path, odex_path):
+    return [sys.executable, self._stub_path,
+            '--dex-file=' + apk_path,
+            '--dex-location=' + install_path,
+            '--oat-file=' + odex_path,
+            '--log-file=' + self._log_path]
+
+  def _run(self, apks):
+    """Runs the optimization on |apks|, and returns the dex2oat call count."""
+    work_dir = tempfile.mkdtemp(dir=self._tmpdir)
+    apk_dir = os.path.join(work_dir, gms_core_apk_preoptimize._SUBAPK_PATH)
+    apk_paths = []
+    for name, content in sorted(apks.iteritems()):
+      apk_paths.append(os.path.join(apk_dir, name))
+      _write(apk_paths[-1], content)
+    odex_cache = gms_core_apk_preoptimize._OdexCache(
+        self._cache_dir, [self._stub_path])
+
+    odex_files = gms_core_apk_preoptimize._optimize_inner_apks(
+        apk_paths, work_dir, self._get_dex2oat_cmd, odex_cache, 2)
+
+    self.assertEquals(
+        [os.path.join(gms_core_apk_preoptimize._SUBAPK_PATH,
+                      name.replace('.apk', '.odex'))
+         for name in sorted(apks)], odex_files)
+    for name, content in apks.iteritems():
+      self.assertEquals('odex:' + content, _read(os.path.join(
+          apk_dir, name.replace('.apk', '.odex'))))
+    call_count = len(_read(self._log_path).splitlines())
+    _write(self._log_path, '')
+    return call_count
+
+  def test_odex_cache(self):
+    self.assertEquals(3, self._run({'a.apk': 'a', 'b.apk': 'b', 'c.apk': 'c'}))
+    # Nothing is changed.
+    self.assertEquals(0, self._run({'a.apk': 'a', 'b.apk': 'b', 'c.apk': 'c'}))
+    # Only the changed apk is optimized.
+    self.assertEquals(1, self._run({'a.apk': 'a', 'b.apk': 'b2'}))
+    # The entries not used in the last run are removed.
+    self.assertEquals(2, len(os.listdir(self._cache_dir)))
+    self.assertEquals(1, self._run({'a.apk': 'a', 'b.apk': 'b'}))
+
+  def test_dependency_update_invalidates_cache(self):
+    self.assertEquals(1, self._run({'a.apk': 'a'}))
+    # dex2oat is updated.
+    _write(self._stub_path, _STUB_DEX2OAT + '\n')
+    self.assertEquals(1, self._run({'a.apk': 'a'}))
+
+  def test_failure(self):
+    work_dir = tempfile.mkdtemp(dir=self._tmpdir)
+    apk_path = os.path.join(work_dir, gms_core_apk_preoptimize._SUBAPK_PATH,
+                            'a.apk')
+    _write(apk_path, 'a')
+    odex_cache = gms_core_apk_preoptimize._OdexCache(
+        self._cache_dir, [self._stub_path])
+    self.assertIsNone(gms_core_apk_preoptimize._optimize_inner_apks(
+        [apk_path], work_dir, lambda *args: ['false'], odex_cache, 2))
+    self.assertFalse(os.path.exists(self._cache_dir))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -23,6 +23,13 @@ from src.build.util import concurrent_subprocess
 from src.build.util import logging_util
 from src.build.util import statistics
 
+try:
+  import numpy
+except ImportError:
+  # numpy is optional. Without it, Bootstrap resampling falls back to pure
+  # Python, which is slower but gives the same estimation.
+  numpy = None
+
 # Prefixes for stash directories.
 _STASH_DIR_PREFIX = '.stash'
 
@@ -34,6 +41,14 @@ _TEST_SSH_KEY = (
 # %h: host name, and %p: port). See man ssh_config for the detail.
 _SSH_CONTROL_PATH = '/tmp/perftest-ssh-%r@%h:%p'
 
+# Number of Bootstrap resamples to estimate a confidence interval.
+_BOOTSTRAP_ITERATIONS = 1000
+
+# Metrics checked to decide whether to stop the comparison early, when
+# --ci-width-threshold is given.
+_SEQUENTIAL_TEST_METRICS = (
+    'boot_time_ms', 'plugin_load_time_ms', 'app_res_mem', 'app_pdirt_mem')
+
 
 def get_abs_arc_root():
   return os.path.abspath(build_common.get_arc_root())
@@ -104,10 +119,20 @@ Typical usage:
       parents=[base_parser])
   compare_parser.add_argument(
       '--iterations', type=int, metavar='<N>', default=60,
-      help='Number of perftest iterations.')
+      help=('Number of perftest iterations. With --ci-width-threshold, this '
+            'is the maximum number of iterations.'))
   compare_parser.add_argument(
       '--confidence-level', type=int, metavar='<%>', default=90,
       help='Confidence level of confidence intervals.')
+  compare_parser.add_argument(
+      '--ci-width-threshold', type=float, metavar='<%>',
+      help=('Stop iterating as soon as, for each of %s, the confidence '
+            'interval of the difference is narrower than this percentage of '
+            'the control median.' % ', '.join(_SEQUENTIAL_TEST_METRICS)))
+  compare_parser.add_argument(
+      '--min-iterations', type=int, metavar='<N>', default=10,
+      help=('Minimum number of perftest iterations before stopping by '
+            '--ci-width-threshold.'))
   compare_parser.add_argument(
       '--launch-chrome-opt', action='append',
       default=['--enable-nacl-list-mappings'], metavar='OPTIONS',
@@ -404,10 +429,41 @@ def bootstrap_sample(sample):
   return [random.choice(sample) for _ in sample]
 
 
+def _get_vectorized_statistic(statistic):
+  """Returns the numpy version of |statistic|, or None if not available.
+
+  The returned function takes a 2-D array, and computes the statistic for each
+  row.
+  """
+  if numpy is None:
+    return None
+  if statistic is statistics.compute_median:
+    return lambda samples: numpy.median(samples, axis=1)
+  if statistic is statistics.compute_average:
+    return lambda samples: numpy.mean(samples, axis=1)
+  return None
+
+
+def _bootstrap_distribution(sample, statistic):
+  """Returns the statistic of each Bootstrap resample of |sample|."""
+  vectorized_statistic = _get_vectorized_statistic(statistic)
+  if vectorized_statistic is None:
+    return [statistic(bootstrap_sample(sample))
+            for _ in xrange(_BOOTSTRAP_ITERATIONS)]
+  # Draw all the resamples at once, as a matrix with one resample per row.
+  sample = numpy.asarray(sample, dtype=float)
+  indices = numpy.random.randint(
+      len(sample), size=(_BOOTSTRAP_ITERATIONS, len(sample)))
+  return vectorized_statistic(sample[indices])
+
+
 def bootstrap_estimation(
     ctrl_sample, expt_sample, statistic, confidence_level):
   """Estimates confidence interval of difference of a statistic by Bootstrap.
 
+  If numpy is available and |statistic| is statistics.compute_median or
+  statistics.compute_average, the resampling is vectorized.
+
   Args:
     ctrl_sample: A control sample as a list of numbers.
     expt_sample: An experiment sample as a list of numbers.
@@ -418,15 +474,45 @@ def bootstrap_estimation(
   Returns:
     Estimated range as a number tuple.
   """
-  bootstrap_distribution = []
-  for _ in xrange(1000):
-    bootstrap_distribution.append(
-        statistic(bootstrap_sample(expt_sample)) -
-        statistic(bootstrap_sample(ctrl_sample)))
+  bootstrap_distribution = [
+      expt - ctrl for expt, ctrl in zip(
+          _bootstrap_distribution(expt_sample, statistic),
+          _bootstrap_distribution(ctrl_sample, statistic))]
   return statistics.compute_percentiles(
       bootstrap_distribution, (100 - confidence_level, confidence_level))
 
 
+def is_estimation_converged(
+    ctrl_sample, expt_sample, confidence_level, ci_width_threshold):
+  """Returns True if more iterations are unlikely to change the conclusion.
+
+  This is checked after every iteration. Stopping as soon as the confidence
+  interval excludes zero would give many chances to stop on a difference
+  which is not real, making it far more likely than the confidence level
+  suggests. So only the width of the interval, which does not depend on the
+  difference itself, is used to stop.
+
+  Args:
+    ctrl_sample: A control sample as a list of numbers.
+    expt_sample: An experiment sample as a list of numbers.
+    confidence_level: An integer that specifies requested confidence level
+        in percentage, e.g. 90, 95, 99.
+    ci_width_threshold: The percentage of the control median. If the
+        confidence interval of the difference of medians is narrower than
+        this, it is considered as converged.
+
+  Returns:
+    True if the confidence interval is narrow enough.
+  """
+  if not ctrl_sample or not expt_sample:
+    # The metric is not reported.
+    return True
+  lower, upper = bootstrap_estimation(
+      ctrl_sample, expt_sample, statistics.compute_median, confidence_level)
+  ctrl_median = statistics.compute_median(ctrl_sample)
+  return upper - lower <= abs(ctrl_median) * ci_width_threshold / 100.0
+
+
 def handle_stash(parsed_args):
   """The entry point for stash command.
 
@@ -530,6 +616,8 @@ def handle_compare(parsed_args):
   expt_options = load_configure_options(expt_root)
 
   logging.info('iterations: %d', parsed_args.iterations)
+  if parsed_args.ci_width_threshold is not None:
+    logging.info('ci_width_threshold: %g%%', parsed_args.ci_width_threshold)
   logging.info('ctrl_options: %s', ctrl_options)
   logging.info('expt_options: %s', expt_options)
 
@@ -565,19 +653,32 @@ def handle_compare(parsed_args):
     def do_expt():
       merge_perfs(expt_perfs, expt_runner.run())
 
-    for iteration in xrange(parsed_args.iterations):
+    def is_converged():
+      return all(
+          is_estimation_converged(
+              ctrl_perfs.get(key), expt_perfs.get(key),
+              parsed_args.confidence_level, parsed_args.ci_width_threshold)
+          for key in _SEQUENTIAL_TEST_METRICS)
+
+    iterations = 0
+    while iterations < parsed_args.iterations:
+      iterations += 1
       print
       print '=================================== iteration %d/%d' % (
-          iteration + 1, parsed_args.iterations)
+          iterations, parsed_args.iterations)
       for do in random.sample((do_ctrl, do_expt), 2):
         do()
+      if (parsed_args.ci_width_threshold is not None and
+          iterations >= parsed_args.min_iterations and is_converged()):
+        logging.info('All the confidence intervals converged after %d '
+                     'iterations.', iterations)
+        break
 
   print
   print 'VRAWPERF_CTRL=%r' % dict(ctrl_perfs)  # Convert from defaultdict.
   print 'VRAWPERF_EXPT=%r' % dict(expt_perfs)  # Convert from defaultdict.
   print
-  print 'PERF=runs=%d CI=%d%%' % (
-      parsed_args.iterations, parsed_args.confidence_level)
+  print 'PERF=runs=%d CI=%d%%' % (iterations, parsed_args.confidence_level)
   if expt_options == ctrl_options:
     print '     configure_opts=%s' % expt_options
   else:
@@ -0,0 +1,66 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import random
+import unittest
+
+from src.build import interleaved_perftest
+from src.build.util import statistics
+
+
+class InterleavedPerfTestTest(unittest.TestCase):
+  def setUp(self):
+    random.seed(0)
+
+  def test_bootstrap_estimation(self):
+    # Without variance, the confidence interval is just the difference.
+    self.assertEquals(
+        (5, 5),
+        interleaved_perftest.bootstrap_estimation(
+            [10] * 20, [15] * 20, statistics.compute_median, 90))
+
+    ctrl_sample = [random.gauss(100, 5) for _ in xrange(50)]
+    expt_sample = [random.gauss(120, 5) for _ in xrange(50)]
+    for statistic in (statistics.compute_median, statistics.compute_average):
+      lower, upper = interleaved_perftest.bootstrap_estimation(
+          ctrl_sample, expt_sample, statistic, 90)
+      self.assertLess(lower, 20)
+      self.assertGreater(upper, 20)
+      self.assertLess(upper - lower, 10)
+
+  def test_bootstrap_estimation_without_numpy(self):
+    original_numpy = interleaved_perftest.numpy
+    interleaved_perftest.numpy = None
+    try:
+      self.assertEquals(
+          (-5, -5),
+          interleaved_perftest.bootstrap_estimation(
+              [15] * 20, [10] * 20, statistics.compute_median, 90))
+    finally:
+      interleaved_perftest.numpy = original_numpy
+
+  def test_is_estimation_converged(self):
+    # A metric which is not reported does not block stopping.
+    self.assertTrue(
+        interleaved_perftest.is_estimation_converged(None, None, 90, 1))
+
+    # A significant difference does not stop by itself. Converged only if the
+    # threshold is wide enough.
+    ctrl_sample = [100, 101, 99, 100]
+    expt_sample = [200, 201, 199, 200]
+    self.assertFalse(interleaved_perftest.is_estimation_converged(
+        ctrl_sample, expt_sample, 90, 0))
+    self.assertTrue(interleaved_perftest.is_estimation_converged(
+        ctrl_sample, expt_sample, 90, 5))
+
+    ctrl_sample = [90, 110] * 10
+    expt_sample = [91, 109] * 10
+    self.assertFalse(interleaved_perftest.is_estimation_converged(
+        ctrl_sample, expt_sample, 90, 1))
+    self.assertTrue(interleaved_perftest.is_estimation_converged(
+        ctrl_sample, expt_sample, 90, 50))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -29,6 +29,7 @@ from src.build.util import logging_util
 from src.build.util import minidump_filter
 from src.build.util import output_handler
 from src.build.util import platform_util
+from src.build.util import process_sampler
 from src.build.util import remote_executor
 from src.build.util import signal_util
 from src.build.util import startup_stats
@@ -164,6 +165,7 @@ def _run_chrome_iterations(parsed_args):
       sys.stdout.flush()
       stat_list.append(stats)
 
+    _maybe_write_process_samples(parsed_args, stat_list)
     startup_stats.print_aggregated_stats(stat_list)
     sys.stdout.flush()
 
@@ -566,6 +568,26 @@ def _terminate_chrome(chrome):
   chrome.wait(_CHROME_KILL_TIMEOUT)
 
 
+def _maybe_start_process_sampler(parsed_args, chrome):
+  if (not parsed_args.process_sample_interval or
+      not platform_util.is_running_on_linux()):
+    return None
+  sampler = process_sampler.ProcessSampler(
+      chrome.pid, parsed_args.process_sample_interval)
+  sampler.start()
+  return sampler
+
+
+def _maybe_write_process_samples(parsed_args, stat_list):
+  samples_list = [stats.process_samples for stats in stat_list
+                  if stats.process_samples]
+  if not samples_list:
+    return
+  process_sampler.write_samples_list(
+      parsed_args.process_sample_output, samples_list)
+  print 'VPROCSAMPLES=%s' % parsed_args.process_sample_output
+
+
 def _run_chrome(parsed_args, **kwargs):
   if parsed_args.logcat is not None:
     # adb process will be terminated in the atexit handler, registered
@@ -599,12 +621,18 @@ def _run_chrome(parsed_args, **kwargs):
     stats = startup_stats.StartupStats()
     handler = _select_output_handler(parsed_args, stats, p, **kwargs)
 
+    sampler = _maybe_start_process_sampler(parsed_args, p)
+
     # Wait for the process to finish or us to be interrupted.
     try:
       returncode = p.handle_output(handler)
     except output_handler.ChromeFlakinessError:
       # Chrome is terminated due to its flakiness. Retry.
       continue
+    finally:
+      if sampler:
+        sampler.stop()
+        stats.process_samples = sampler.get_samples()
 
     if returncode:
       sys.exit(returncode)
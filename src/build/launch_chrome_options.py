@@ -86,6 +86,8 @@ def _validate_perftest_settings(parser, args):
       parser.error("--iterations only valid in 'perftest' mode")
     if args.iteration_lock_file:
       parser.error("--iteration-lock-file only valid in 'perftest' mode")
+    if args.process_sample_interval:
+      parser.error("--process-sample-interval only valid in 'perftest' mode")
 
 
 def _validate_system_settings(parser, args):
@@ -463,6 +465,18 @@ Native Client Debugging
                       help='Launch with perf and collect data for the first '
                       '<N> seconds. Plugin will be killed after this timeout.')
 
+  parser.add_argument('--process-sample-interval', type=float,
+                      metavar='<T>',
+                      help='Works with perftest command on Linux only. '
+                      'Samples memory and CPU usage of Chrome and its '
+                      'descendant processes every <T> seconds during each '
+                      'iteration, and reports their peak and AUC.')
+
+  parser.add_argument('--process-sample-output', metavar='<path>',
+                      default='perf_process_samples.json',
+                      help='Output file of the time series recorded by '
+                      '--process-sample-interval.')
+
   parser.add_argument('--lang', help='Set language for the Chrome')
 
   # TODO(crbug.com/254164): Get rid of the fake ATF test concept used
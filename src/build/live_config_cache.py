@@ -0,0 +1,163 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Keeps the config cache in memory, and tracks which entries are stale.
+
+This is used by configure_server.py. Instead of checking the mtime of every
+recorded dependency on each run as the on-disk config cache does, the
+dependencies of each entry are watched with file_watcher, and only the entries
+owning a changed file or directory are marked dirty. A config task needs to
+re-run only when its entry is dirty.
+
+Changes of the global dependencies, e.g. the build system scripts, the
+configure options and config.py files, cannot be handled by re-running some of
+the tasks, as the loaded modules are stale. They are reported by
+needs_restart() instead.
+"""
+
+import collections
+import errno
+import hashlib
+import logging
+import os
+
+from src.build.util import file_watcher
+
+
+class LiveConfigCache(object):
+  def __init__(self, watcher=None):
+    """Constructor.
+
+    Args:
+        watcher: The watcher to find changes. A watcher returned by
+            file_watcher.create_watcher() is used if None.
+    """
+    self._watcher = watcher or file_watcher.create_watcher()
+    self._entries = {}
+    # Maps a key to the (files, directories) that the entry depends on.
+    self._dependencies = {}
+    # Maps a file or a directory to the keys of the entries depending on it.
+    self._file_owners = collections.defaultdict(set)
+    self._directory_owners = collections.defaultdict(set)
+    self._dirty_keys = set()
+    self._global_files = frozenset()
+    self._global_directories = frozenset()
+    self._global_dependencies_set = False
+    self._needs_restart = False
+    # Maps a ninja file path to the SHA1 of the content emitted last time.
+    self._emitted_ninja_digests = {}
+
+  def has_global_dependencies(self):
+    return self._global_dependencies_set
+
+  def set_global_dependencies(self, files, directories):
+    """Sets the files and directories that all of the entries depend on."""
+    self._global_files = frozenset(os.path.abspath(path) for path in files)
+    self._global_directories = frozenset(
+        os.path.abspath(path) for path in directories)
+    self._global_dependencies_set = True
+
+  def needs_restart(self):
+    """Returns True if a global dependency has changed."""
+    return self._needs_restart
+
+  def get(self, key):
+    """Returns the entry for |key|, or None if there is none."""
+    return self._entries.get(key)
+
+  def is_dirty(self, key):
+    """Returns True if a dependency of the entry may have changed."""
+    return key in self._dirty_keys or key not in self._entries
+
+  def put(self, key, value, files, directories):
+    """Stores a fresh entry, and records its dependencies.
+
+    The dependencies are not watched until update_watches() is called.
+    """
+    self._remove_dependencies(key)
+    files = frozenset(os.path.abspath(path) for path in files)
+    directories = frozenset(os.path.abspath(path) for path in directories)
+    self._entries[key] = value
+    self._dependencies[key] = (files, directories)
+    for path in files:
+      self._file_owners[path].add(key)
+    for path in directories:
+      self._directory_owners[path].add(key)
+    self._dirty_keys.discard(key)
+
+  def _remove_dependencies(self, key):
+    files, directories = self._dependencies.pop(key, ((), ()))
+    for owners, paths in ((self._file_owners, files),
+                          (self._directory_owners, directories)):
+      for path in paths:
+        owners[path].discard(key)
+        if not owners[path]:
+          del owners[path]
+
+  def discard_dirty_entries(self):
+    """Drops the dirty entries, e.g. when the run re-checking them failed.
+
+    Checking the freshness of an entry updates it with the current listing of
+    the files, even when the entry turns out to be stale. If the task of a
+    stale entry then fails, the entry would look fresh on the next run.
+    Dropping it makes the next run load the config cache from the file again.
+    """
+    for key in self._dirty_keys:
+      self._entries.pop(key, None)
+      self._remove_dependencies(key)
+
+  def update_watches(self):
+    """Starts watching the dependencies of the entries stored so far."""
+    files = set(self._file_owners).union(self._global_files)
+    directories = set(self._directory_owners).union(self._global_directories)
+    try:
+      self._watcher.set_paths(files, directories)
+    except OSError as e:
+      if e.errno != errno.ENOSPC:
+        raise
+      logging.warning('Too many paths to watch with inotify. Consider '
+                      'raising /proc/sys/fs/inotify/max_user_watches. '
+                      'Falling back to polling.')
+      self._watcher.close()
+      self._watcher = file_watcher.PollingWatcher()
+      self._watcher.set_paths(files, directories)
+
+  def find_changes(self):
+    """Marks the entries depending on changed paths dirty.
+
+    Returns:
+        The set of keys newly marked dirty.
+    """
+    changes = self._watcher.get_changes()
+    if changes is None:
+      # Events are lost. Anything may have changed.
+      self._needs_restart = True
+      newly_dirty = set(self._entries).difference(self._dirty_keys)
+      self._dirty_keys.update(newly_dirty)
+      return newly_dirty
+
+    newly_dirty = set()
+    for path in changes:
+      if path in self._global_files or path in self._global_directories:
+        self._needs_restart = True
+      newly_dirty.update(self._file_owners.get(path, ()))
+      newly_dirty.update(self._directory_owners.get(path, ()))
+    newly_dirty.difference_update(self._dirty_keys)
+    self._dirty_keys.update(newly_dirty)
+    return newly_dirty
+
+  def needs_emit(self, ninja_path, content):
+    """Returns True if |content| differs from the content emitted last time.
+
+    The content is remembered as emitted when True is returned.
+    """
+    digest = hashlib.sha1(content).digest()
+    if (self._emitted_ninja_digests.get(ninja_path) == digest and
+        os.path.exists(ninja_path)):
+      return False
+    self._emitted_ninja_digests[ninja_path] = digest
+    return True
+
+  def close(self):
+    self._watcher.close()
@@ -0,0 +1,128 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.build import live_config_cache
+from src.build.util import file_util
+from src.build.util import file_watcher
+
+
+class LiveConfigCacheTest(unittest.TestCase):
+  def setUp(self):
+    self._tmpdir = tempfile.mkdtemp(prefix='live_config_cache_test')
+    # Config tasks in a small synthetic tree, and their dependencies.
+    self._tasks = {
+        'a': ([self._path('a', 'Android.mk'), self._path('a', 'config.py')],
+              []),
+        'b': ([self._path('b', 'config.py')], [self._path('b', 'src')]),
+        'c': ([self._path('c', 'config.py'), self._path('shared.h')], []),
+    }
+    for files, directories in self._tasks.itervalues():
+      for path in files:
+        self._touch(path, 100)
+      for path in directories:
+        file_util.makedirs_safely(path)
+    self._run_count = dict.fromkeys(self._tasks, 0)
+
+  def tearDown(self):
+    shutil.rmtree(self._tmpdir)
+
+  def _path(self, *components):
+    return os.path.join(self._tmpdir, *components)
+
+  def _touch(self, path, mtime):
+    file_util.makedirs_safely(os.path.dirname(path))
+    with open(path, 'a'):
+      pass
+    os.utime(path, (mtime, mtime))
+
+  def _regenerate(self, live_cache):
+    """Re-runs the dirty tasks as config_runner does."""
+    for key, (files, directories) in sorted(self._tasks.iteritems()):
+      if live_cache.get(key) is not None and not live_cache.is_dirty(key):
+        continue
+      self._run_count[key] += 1
+      live_cache.put(key, 'result of %s' % key, files, directories)
+    live_cache.update_watches()
+
+  def _take_run_tasks(self):
+    run_tasks = sorted(key for key, count in self._run_count.iteritems()
+                       if count)
+    self._run_count = dict.fromkeys(self._tasks, 0)
+    return run_tasks
+
+  def _test_regenerate(self, live_cache):
+    self._regenerate(live_cache)
+    self.assertEquals(['a', 'b', 'c'], self._take_run_tasks())
+    self.assertEquals('result of a', live_cache.get('a'))
+
+    # Nothing is changed.
+    self.assertEquals(set(), live_cache.find_changes())
+    self._regenerate(live_cache)
+    self.assertEquals([], self._take_run_tasks())
+
+    # Only the task owning the touched file re-runs.
+    self._touch(self._path('a', 'Android.mk'), 200)
+    self.assertEquals({'a'}, live_cache.find_changes())
+    self._regenerate(live_cache)
+    self.assertEquals(['a'], self._take_run_tasks())
+
+    # A file added in a listed directory.
+    self._touch(self._path('b', 'src', 'new.c'), 200)
+    os.utime(self._path('b', 'src'), (200, 200))
+    self.assertEquals({'b'}, live_cache.find_changes())
+    self._regenerate(live_cache)
+    self.assertEquals(['b'], self._take_run_tasks())
+
+    # A file which no task depends on.
+    self._touch(self._path('unrelated.txt'), 200)
+    self.assertEquals(set(), live_cache.find_changes())
+    self._regenerate(live_cache)
+    self.assertEquals([], self._take_run_tasks())
+    self.assertFalse(live_cache.needs_restart())
+
+  def test_regenerate_with_polling(self):
+    live_cache = live_config_cache.LiveConfigCache(
+        file_watcher.PollingWatcher())
+    self._test_regenerate(live_cache)
+    live_cache.close()
+
+  def test_regenerate(self):
+    live_cache = live_config_cache.LiveConfigCache()
+    self._test_regenerate(live_cache)
+    live_cache.close()
+
+  def test_global_dependencies(self):
+    live_cache = live_config_cache.LiveConfigCache(
+        file_watcher.PollingWatcher())
+    self.assertFalse(live_cache.has_global_dependencies())
+    self._touch(self._path('build_options.py'), 100)
+    live_cache.set_global_dependencies([self._path('build_options.py')], [])
+    self.assertTrue(live_cache.has_global_dependencies())
+    self._regenerate(live_cache)
+
+    self._touch(self._path('build_options.py'), 200)
+    live_cache.find_changes()
+    self.assertTrue(live_cache.needs_restart())
+
+  def test_needs_emit(self):
+    live_cache = live_config_cache.LiveConfigCache(
+        file_watcher.PollingWatcher())
+    ninja_path = self._path('a.ninja')
+    self.assertTrue(live_cache.needs_emit(ninja_path, 'rule a'))
+    with open(ninja_path, 'w') as f:
+      f.write('rule a')
+    self.assertFalse(live_cache.needs_emit(ninja_path, 'rule a'))
+    self.assertTrue(live_cache.needs_emit(ninja_path, 'rule b'))
+    # The file is removed, e.g. by clobbering.
+    os.remove(ninja_path)
+    self.assertTrue(live_cache.needs_emit(ninja_path, 'rule b'))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -16,6 +16,7 @@ import subprocess
 import tarfile
 
 from src.build import build_common
+from src.build import configure_profiler
 from src.build import dependency_inspection
 from src.build import ninja_generator
 from src.build import staging
@@ -860,11 +861,13 @@ def _run_make(workdir, in_file, extra_env_vars):
             ' '.join(make_cmd)))
 
   # Run make command, and process its output.
-  p = subprocess.Popen(
-      make_cmd, cwd=_MAKE_TO_NINJA_DIR, env=env,
-      stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-  return _filter_make_output(workdir, *p.communicate(main_makefile),
-                             in_file=in_file)
+  with configure_profiler.span('make', 'make', workdir=workdir,
+                               in_file=in_file):
+    p = subprocess.Popen(
+        make_cmd, cwd=_MAKE_TO_NINJA_DIR, env=env,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    output = p.communicate(main_makefile)
+  return _filter_make_output(workdir, *output, in_file=in_file)
 
 
 def _filter_var_name(name):
@@ -2584,6 +2587,15 @@ class MakefileNinjaTranslator:
     """Adds a global filter that would run before any module's filter."""
     MakefileNinjaTranslator._global_filters.append(filter)
 
+  @staticmethod
+  def reset_modules():
+    """Forgets the modules and the translators of the previous run.
+
+    This is needed to generate ninja files again in the same process.
+    """
+    MakefileNinjaTranslator._all_modules.clear()
+    del MakefileNinjaTranslator._all_translators[:]
+
   @staticmethod
   def get_intermediate_headers_dir():
     return _INTERMEDIATE_HEADERS_DIR
@@ -15,7 +15,6 @@ import multiprocessing
 import os
 import pipes
 import re
-import StringIO
 import traceback
 
 import ninja_syntax
@@ -23,6 +22,7 @@ import ninja_syntax
 from src.build import analyze_diffs
 from src.build import build_common
 from src.build import ninja_generator_runner
+from src.build import ninja_writer
 from src.build import notices
 from src.build import open_source
 from src.build import staging
@@ -95,6 +95,7 @@ def get_configuration_dependencies():
       'src/build/gms_core_ninja_generator.py',
       'src/build/make_to_ninja.py',
       'src/build/ninja_generator.py',
+      'src/build/ninja_writer.py',
       'src/build/sync_adb.py',
       'src/build/sync_chrome_deps.py',
       'src/build/sync_gdb_multiarch.py',
@@ -277,7 +278,7 @@ class _BootclasspathComputer(object):
     return _BootclasspathComputer._classes
 
 
-class NinjaGenerator(ninja_syntax.Writer):
+class NinjaGenerator(ninja_writer.BufferedWriter):
   """Encapsulate ninja file generation.
 
   Simplify ninja file generation by naming, creating, and tracking
@@ -321,7 +322,7 @@ class NinjaGenerator(ninja_syntax.Writer):
                                                             self._is_host)
     else:
       ninja_path = ninja_name
-    super(NinjaGenerator, self).__init__(StringIO.StringIO())
+    super(NinjaGenerator, self).__init__()
     ninja_generator_runner.register_ninja(self)
     self._ninja_path = ninja_path
     self._base_path = base_path
@@ -7,6 +7,7 @@ import multiprocessing
 import time
 import traceback
 
+from src.build import configure_profiler
 from src.build.util import concurrent
 
 
@@ -88,13 +89,16 @@ def _run_task(generator_task):
     context = generator_task.context
     function = generator_task.function
     args = generator_task.args
-    context.set_up()
-    function(*args)
-    context.tear_down()
+    task_name = '%s.%s' % (function.__module__, function.__name__)
+    with configure_profiler.span('set_up', 'task', task=task_name):
+      context.set_up()
+    with configure_profiler.span(task_name, 'generator'):
+      function(*args)
+    with configure_profiler.span('tear_down', 'task', task=task_name):
+      context.tear_down()
     elapsed_time = time.time() - start_time
     if elapsed_time > 1:
-      logging.info('Slow task: %s.%s %0.3fs',
-                   function.__module__, function.__name__, elapsed_time)
+      logging.info('Slow task: %s %0.3fs', task_name, elapsed_time)
 
     # Extract the result from global variables.
     task_list = [GeneratorTask(context, requested_task)
@@ -105,7 +109,9 @@ def _run_task(generator_task):
     # 2) to request to run ninja generators back to the parent process, at the
     # same time.
     assert (not result or not task_list)
-    return (result, task_list)
+    # The events recorded in a worker process are passed back to the parent
+    # process, too.
+    return (result, task_list, configure_profiler.take_events())
   except BaseException:
     if multiprocessing.current_process().name == 'MainProcess':
       # Just raise the exception up the single process, single thread
@@ -159,7 +165,8 @@ def run_in_parallel(task_list, maximum_jobs):
             raise completed_future.exception()
 
           # The task is completed successfully. Process the result.
-          result, request_task_list = completed_future.result()
+          result, request_task_list, events = completed_future.result()
+          configure_profiler.add_events(events)
           if request_task_list:
             # If sub tasks are requested, submit them.
             assert not result
@@ -0,0 +1,80 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""A ninja_syntax.Writer which buffers its output in memory.
+
+The largest generators emit tens of thousands of build statements, and the
+same paths, e.g. the default implicit dependencies, appear in many of them.
+BufferedWriter escapes each distinct path once per process, and keeps the
+written lines in a list, which is joined once when the content is needed,
+e.g. at emit time. The output is byte-for-byte the same as
+ninja_syntax.Writer.
+"""
+
+import ninja_syntax
+
+# A cache from a path to the escaped path, shared by all writers.
+_escaped_paths = {}
+
+
+def _escape_path(path):
+  escaped = _escaped_paths.get(path)
+  if escaped is None:
+    escaped = ninja_syntax.escape_path(path)
+    _escaped_paths[path] = escaped
+  return escaped
+
+
+def _as_list(value):
+  if value is None:
+    return []
+  if isinstance(value, list):
+    return value
+  return [value]
+
+
+class OutputBuffer(object):
+  """A write-only file-like object, which keeps the written strings."""
+
+  def __init__(self):
+    self._chunks = []
+
+  def write(self, text):
+    self._chunks.append(text)
+
+  def getvalue(self):
+    if len(self._chunks) > 1:
+      self._chunks[:] = [''.join(self._chunks)]
+    return self._chunks[0] if self._chunks else ''
+
+
+class BufferedWriter(ninja_syntax.Writer):
+  def __init__(self, **kwargs):
+    super(BufferedWriter, self).__init__(OutputBuffer(), **kwargs)
+
+  def build(self, outputs, rule, inputs=None, implicit=None, order_only=None,
+            variables=None):
+    """Writes a build statement, as ninja_syntax.Writer.build() does."""
+    outputs = _as_list(outputs)
+    all_inputs = [_escape_path(path) for path in _as_list(inputs)]
+    if implicit:
+      all_inputs.append('|')
+      all_inputs.extend(_escape_path(path) for path in _as_list(implicit))
+    if order_only:
+      all_inputs.append('||')
+      all_inputs.extend(_escape_path(path) for path in _as_list(order_only))
+
+    self._line('build %s: %s' % (
+        ' '.join([_escape_path(path) for path in outputs]),
+        ' '.join([rule] + all_inputs)))
+
+    if variables:
+      if isinstance(variables, dict):
+        iterator = variables.iteritems()
+      else:
+        iterator = iter(variables)
+      for key, value in iterator:
+        self.variable(key, value, indent=1)
+
+    return outputs
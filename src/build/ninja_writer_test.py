@@ -0,0 +1,70 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import cPickle
+import StringIO
+import unittest
+
+import ninja_syntax
+
+from src.build import ninja_writer
+
+
+def _generate(writer, edge_count):
+  """Writes a large synthetic ninja file, like a big generator does."""
+  writer.comment('A synthetic generator. ' * 10)
+  writer.variable('cflags', ['-O2', '', '-g'])
+  writer.rule('cc', 'gcc $cflags -c $in -o $out', description='CC $out',
+              depfile='$out.d', deps='gcc')
+  writer.newline()
+  default_implicit = ['out/target/toolchain/gcc', 'out/staging/src/deps.h']
+  for i in xrange(edge_count):
+    base = 'out/staging/android/bionic/libc/dir%d/file %d' % (i % 50, i)
+    inputs = [base + '.c']
+    if i % 7 == 0:
+      # A long list of inputs, which is wrapped.
+      inputs.extend('out/staging/android/bionic/libc/include/h%d:$x.h' % j
+                    for j in xrange(i % 30))
+    variables = {'cflags': '$cflags -DFILE=%d' % i, 'in_real_path': base}
+    if i % 3 == 0:
+      variables = [('cflags', ['-DA', '-DB']), ('empty', None)]
+    writer.build('out/target/obj/file%d.o' % i, 'cc',
+                 inputs=inputs if i % 11 else base + '.c',
+                 implicit=default_implicit if i % 5 else None,
+                 order_only='out/gen.stamp' if i % 2 else None,
+                 variables=variables if i % 13 else None)
+  writer.build('out/libc.a', 'ar', inputs=[
+      'out/target/obj/file%d.o' % i for i in xrange(edge_count)])
+  writer.default('out/libc.a')
+
+
+class NinjaWriterTest(unittest.TestCase):
+  def test_same_output(self):
+    expected = ninja_syntax.Writer(StringIO.StringIO())
+    _generate(expected, 20000)
+    writer = ninja_writer.BufferedWriter()
+    _generate(writer, 20000)
+    self.assertEquals(expected.output.getvalue(), writer.output.getvalue())
+
+  def test_width(self):
+    expected = ninja_syntax.Writer(StringIO.StringIO(), width=40)
+    _generate(expected, 100)
+    writer = ninja_writer.BufferedWriter(width=40)
+    _generate(writer, 100)
+    self.assertEquals(expected.output.getvalue(), writer.output.getvalue())
+
+  def test_output_buffer(self):
+    output = ninja_writer.OutputBuffer()
+    self.assertEquals('', output.getvalue())
+    output.write('a')
+    output.write('b')
+    self.assertEquals('ab', output.getvalue())
+    output.write('c')
+    self.assertEquals('abc', output.getvalue())
+    # NinjaGenerator is pickled into the config cache.
+    self.assertEquals('abc', cPickle.loads(cPickle.dumps(output)).getvalue())
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -6,6 +6,7 @@
 
 import fnmatch
 import os
+import re
 
 from src.build.util import file_util
 
@@ -13,6 +14,11 @@ METADATA_FILE = 'OPEN_SOURCE'
 
 _cached_is_open_source_repo = None
 _cached_is_open_sourced = {}
+# Map from a directory to its OpenSourceRules, or None if the directory has no
+# METADATA_FILE.
+_cached_directory_rules = {}
+# Map from a tuple of rules to OpenSourceRules.
+_cached_compiled_rules = {}
 
 
 def is_open_source_repo():
@@ -24,13 +30,52 @@ def is_open_source_repo():
   return _cached_is_open_source_repo
 
 
+def _compile_patterns(patterns):
+  if not patterns:
+    return None
+  return re.compile('|'.join(
+      '(?:%s)' % fnmatch.translate(pattern) for pattern in patterns))
+
+
+class OpenSourceRules(object):
+  """Rules read from a METADATA_FILE, compiled for matching basenames.
+
+  A basename is open sourced if it matches any of the patterns, and none of
+  the patterns prefixed with '!'.
+  """
+
+  def __init__(self, rules):
+    self.open_sources_everything = rules == ['*']
+    self._include_re = _compile_patterns(
+        [l for l in rules if not l.startswith('!')])
+    self._exclude_re = _compile_patterns(
+        [l[1:] for l in rules if l.startswith('!')])
+
+  def match(self, basename):
+    # Note that fnmatch.fnmatch() is case sensitive on POSIX, as re is.
+    return bool(self._include_re and self._include_re.match(basename) and
+                not (self._exclude_re and self._exclude_re.match(basename)))
+
+
 def is_basename_open_sourced(basename, open_source_rules):
-  if any([fnmatch.fnmatch(basename, l)
-         for l in open_source_rules if not l.startswith('!')]):
-    if all([not fnmatch.fnmatch(basename, l[1:])
-            for l in open_source_rules if l.startswith('!')]):
-      return True
-  return False
+  key = tuple(open_source_rules)
+  compiled_rules = _cached_compiled_rules.get(key)
+  if compiled_rules is None:
+    compiled_rules = OpenSourceRules(open_source_rules)
+    _cached_compiled_rules[key] = compiled_rules
+  return compiled_rules.match(basename)
+
+
+def _get_directory_rules(directory):
+  """Returns OpenSourceRules of the directory, or None if it has no rules."""
+  if directory in _cached_directory_rules:
+    return _cached_directory_rules[directory]
+  metadata_file = os.path.join(directory, METADATA_FILE)
+  rules = None
+  if os.path.exists(metadata_file):
+    rules = OpenSourceRules(file_util.read_metadata_file(metadata_file))
+  _cached_directory_rules[directory] = rules
+  return rules
 
 
 def _cache_open_sourced(path, result):
@@ -49,22 +94,19 @@ def is_open_sourced(path, skip_directory_contents_check=False):
   global _cache_open_sourced
   if path in _cached_is_open_sourced:
     return _cached_is_open_sourced[path]
-  paths_metadata_file = os.path.join(path, METADATA_FILE)
-  if not skip_directory_contents_check and os.path.exists(paths_metadata_file):
+  if not skip_directory_contents_check:
     # Check if this is the first call and is a directory.  If so, we consider
     # the whole directory open sourced if either it is listed in the parent
     # (what is checked later) or if it has an OPEN_SOURCE file with only '*' in
     # it.
-    rules = file_util.read_metadata_file(paths_metadata_file)
-    if len(rules) == 1 and rules[0] == '*':
+    rules = _get_directory_rules(path)
+    if rules and rules.open_sources_everything:
       return _cache_open_sourced(path, True)
   parent = os.path.dirname(path)
-  parent_metadata_file = os.path.join(parent, METADATA_FILE)
-  if os.path.exists(parent_metadata_file):
-    open_source_rules = file_util.read_metadata_file(parent_metadata_file)
+  parent_rules = _get_directory_rules(parent)
+  if parent_rules:
     return _cache_open_sourced(path,
-                               is_basename_open_sourced(os.path.basename(path),
-                                                        open_source_rules))
+                               parent_rules.match(os.path.basename(path)))
   return _cache_open_sourced(
       path,
       is_open_sourced(parent, skip_directory_contents_check=True))
@@ -4,14 +4,47 @@
 
 """Tests covering open_source management"""
 
+import fnmatch
+import itertools
 import os
+import shutil
+import tempfile
 import unittest
 
 from src.build import open_source
+from src.build.util import file_util
 
 _PATH_PREFIX = 'src/build/tests/open_source'
 
 
+def _reference_is_basename_open_sourced(basename, open_source_rules):
+  # The original implementation, which runs fnmatch over each rule.
+  if any([fnmatch.fnmatch(basename, l)
+         for l in open_source_rules if not l.startswith('!')]):
+    if all([not fnmatch.fnmatch(basename, l[1:])
+            for l in open_source_rules if l.startswith('!')]):
+      return True
+  return False
+
+
+def _reference_is_open_sourced(path, skip_directory_contents_check=False):
+  # The original implementation without any cache.
+  if path in ['', '.']:
+    return False
+  paths_metadata_file = os.path.join(path, open_source.METADATA_FILE)
+  if not skip_directory_contents_check and os.path.exists(paths_metadata_file):
+    rules = file_util.read_metadata_file(paths_metadata_file)
+    if len(rules) == 1 and rules[0] == '*':
+      return True
+  parent = os.path.dirname(path)
+  parent_metadata_file = os.path.join(parent, open_source.METADATA_FILE)
+  if os.path.exists(parent_metadata_file):
+    return _reference_is_basename_open_sourced(
+        os.path.basename(path),
+        file_util.read_metadata_file(parent_metadata_file))
+  return _reference_is_open_sourced(parent, skip_directory_contents_check=True)
+
+
 class TestOpenSource(unittest.TestCase):
   RULES = ['foobar.c*', 'subdir']
 
@@ -63,6 +96,69 @@ class TestOpenSource(unittest.TestCase):
     for p in ['third_party/android']:
       self.assertTrue(open_source.is_open_sourced(p))
 
+  def test_is_basename_open_sourced_matches_fnmatch(self):
+    patterns = ['*', 'foo', 'foo*', '*.c', 'f?o', '[fb]oo', '[!f]oo', 'a.b',
+                '!', 'foo.c*', '*o*']
+    basenames = ['', 'foo', 'boo', 'zoo', 'foo.c', 'foo.cc', 'a.b', 'axb',
+                 'fo', 'f.o', '!foo', 'foo\n', '[fb]oo']
+    for size in xrange(3):
+      for rules in itertools.product(patterns + ['!' + p for p in patterns],
+                                     repeat=size):
+        rules = list(rules)
+        for basename in basenames:
+          self.assertEquals(
+              _reference_is_basename_open_sourced(basename, rules),
+              open_source.is_basename_open_sourced(basename, rules),
+              '%r %r' % (basename, rules))
+
+
+class TestOpenSourceTree(unittest.TestCase):
+  def setUp(self):
+    self._original_cwd = os.getcwd()
+    self._saved_caches = (open_source._cached_is_open_source_repo,
+                          open_source._cached_is_open_sourced,
+                          open_source._cached_directory_rules)
+    open_source._cached_is_open_source_repo = False
+    open_source._cached_is_open_sourced = {}
+    open_source._cached_directory_rules = {}
+    self._tmpdir = tempfile.mkdtemp(prefix='open_source_test')
+    os.chdir(self._tmpdir)
+
+  def tearDown(self):
+    os.chdir(self._original_cwd)
+    shutil.rmtree(self._tmpdir)
+    (open_source._cached_is_open_source_repo,
+     open_source._cached_is_open_sourced,
+     open_source._cached_directory_rules) = self._saved_caches
+
+  def test_matches_reference_implementation(self):
+    metadata = {
+        'a': ['*'],
+        'a/b': ['x*', '!x2*'],
+        'c': ['d', 'e.c*', '# comment'],
+        'c/d': ['*'],
+        'c/e.cc': [],
+        'f/g': ['*.py', '!*_test.py'],
+    }
+    for directory, rules in metadata.iteritems():
+      file_util.makedirs_safely(directory)
+      with open(os.path.join(directory, open_source.METADATA_FILE), 'w') as f:
+        f.write('\n'.join(rules))
+    paths = []
+    for top in ['a', 'c', 'f', 'h']:
+      for sub in ['b', 'd', 'e.cc', 'g', 'x1', 'x2']:
+        for name in ['x1', 'x2.c', 'e.c', 'y.py', 'y_test.py']:
+          path = os.path.join(top, sub, name)
+          file_util.makedirs_safely(os.path.dirname(path))
+          open(path, 'w').close()
+          paths.extend([path, os.path.dirname(path)])
+    paths.extend(metadata)
+    paths.extend(['a', 'c', 'f', 'h'])
+
+    for path in paths:
+      self.assertEquals(_reference_is_open_sourced(path),
+                        open_source.is_open_sourced(path), path)
+
 
 if __name__ == '__main__':
   unittest.main()
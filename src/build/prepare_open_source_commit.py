@@ -158,10 +158,11 @@ def _find_sync_set(src, src_submodules_paths):
                               lambda x, y: all_included,
                               None, sync_set)
     else:
-      new_open_source_rules = file_util.read_metadata_file(
-          os.path.join(src_dir, open_source.METADATA_FILE))
+      new_open_source_rules = open_source.OpenSourceRules(
+          file_util.read_metadata_file(
+              os.path.join(src_dir, open_source.METADATA_FILE)))
       _add_directory_sync_set(src, rel_src_dir, basenames,
-                              open_source.is_basename_open_sourced,
+                              lambda x, y: y.match(x),
                               new_open_source_rules,
                               sync_set)
 
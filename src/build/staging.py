@@ -14,6 +14,8 @@ Code to create out/staging of properly overlaid files.  All files are created
 as symlinks.
 """
 
+import errno
+import marshal
 import os
 import subprocess
 import sys
@@ -33,12 +35,195 @@ TESTS_BASE_PATH = 'src/build/tests/analyze_diffs'
 TESTS_MODS_PATH = os.path.join(TESTS_BASE_PATH, 'mods')
 TESTS_THIRD_PARTY_PATH = os.path.join(TESTS_BASE_PATH, 'third_party')
 
+# Bump this when the format of the staging manifest is changed.
+_MANIFEST_VERSION = 3
+
+# The manifest of the staging directory. Loaded on the first lookup.
+_manifest = None
+_manifest_loaded = False
+
+
+class _StagingManifest(object):
+  """Answers staging lookups mostly without touching the file system.
+
+  The manifest is written by create_staging(), which knows where each staged
+  path comes from. Under the directories linked from the staging directory as
+  a whole, symbolic links are not recorded, as finding them would walk the
+  largest trees on every configure. The paths under them are resolved on the
+  file system instead, checking each path component only once per process,
+  so that the answers are the same as os.path.realpath.
+  """
+
+  def __init__(self, links, linked_dirs, top_level_names, real_staging_root):
+    """Constructor.
+
+    Args:
+        links: A dict from a path relative to the staging root of a symbolic
+            link created in the staging directory, to the real path of its
+            target relative to ARC_ROOT.
+        linked_dirs: The paths in |links| which are directories.
+        top_level_names: Names of the top level directories in staging.
+        real_staging_root: The real path of the staging root relative to
+            ARC_ROOT.
+    """
+    self._links = links
+    self._linked_dirs = frozenset(linked_dirs)
+    self._top_level_names = frozenset(top_level_names)
+    self._real_staging_root = real_staging_root
+    # Caches the real paths of the paths under the linked directories.
+    self._resolved_paths = {}
+
+  def is_in_staging(self, input_path):
+    return input_path.split(os.path.sep)[0] in self._top_level_names
+
+  def as_real_path(self, input_path):
+    """Returns the real path of |input_path| in the staging directory.
+
+    The link with the longest prefix of |input_path| is looked up. Returns
+    None if |input_path| cannot be answered from the manifest.
+    """
+    if os.path.isabs(input_path):
+      return None
+    path = os.path.normpath(input_path)
+    if path.split(os.path.sep)[0] == os.pardir:
+      return None
+    if path == os.curdir:
+      return self._real_staging_root
+    prefix = path
+    while prefix:
+      real_path = self._links.get(prefix)
+      if real_path is not None:
+        if prefix != path and prefix in self._linked_dirs:
+          return self._resolve_in_linked_dir(path, prefix)
+        return real_path + path[len(prefix):]
+      prefix = os.path.dirname(prefix)
+    # No symbolic link is in the path.
+    return os.path.join(self._real_staging_root, path)
+
+  def _resolve_in_linked_dir(self, path, linked_dir):
+    """Returns the real path of |path| under the directory |linked_dir|.
+
+    The current directory must be ARC_ROOT.
+    """
+    real_path = self._resolved_paths.get(path)
+    if real_path is None:
+      parent, name = os.path.split(path)
+      if parent == linked_dir:
+        real_parent = self._links[linked_dir]
+      else:
+        real_parent = self._resolve_in_linked_dir(parent, linked_dir)
+      real_path = os.path.join(real_parent, name)
+      if os.path.islink(real_path):
+        real_path = os.path.relpath(os.path.realpath(real_path))
+      self._resolved_paths[path] = real_path
+    return real_path
+
+  def to_dict(self):
+    return {
+        'version': _MANIFEST_VERSION,
+        'links': self._links,
+        'linked_dirs': sorted(self._linked_dirs),
+        'top_level_names': sorted(self._top_level_names),
+        'real_staging_root': self._real_staging_root,
+    }
+
+
+class _StagingManifestBuilder(object):
+  """Records the symbolic links created in the staging directory."""
+
+  def __init__(self, arc_root, staging_root):
+    self._arc_root = arc_root
+    self._staging_root = staging_root
+    self._links = {}
+    self._linked_dirs = []
+    # Caches of the real path of a source directory, and the path relative to
+    # the staging root of a destination directory.
+    self._real_dirs = {}
+    self._staged_dirs = {}
+
+  def _get_real_path(self, path):
+    return os.path.relpath(os.path.realpath(path), self._arc_root)
+
+  def add_link(self, src_path, dest_dir):
+    src_dir, name = os.path.split(src_path)
+    if os.path.islink(src_path):
+      real_path = self._get_real_path(src_path)
+    else:
+      real_dir = self._real_dirs.get(src_dir)
+      if real_dir is None:
+        real_dir = self._get_real_path(src_dir)
+        self._real_dirs[src_dir] = real_dir
+      real_path = os.path.join(real_dir, name)
+    staged_dir = self._staged_dirs.get(dest_dir)
+    if staged_dir is None:
+      staged_dir = os.path.relpath(dest_dir, self._staging_root)
+      self._staged_dirs[dest_dir] = staged_dir
+    staged_path = os.path.normpath(os.path.join(staged_dir, name))
+    self._links[staged_path] = real_path
+    if os.path.isdir(src_path):
+      self._linked_dirs.append(staged_path)
+
+  def build(self, top_level_names):
+    return _StagingManifest(self._links, self._linked_dirs, top_level_names,
+                            self._get_real_path(self._staging_root))
+
+
+def _get_top_level_names():
+  """Returns the names that is_in_staging() accepts as the top level."""
+  # os.path.exists(os.path.join(_THIRD_PARTY_DIR, name)) is true for these.
+  names = {_SRC_DIR, '', os.curdir, os.pardir}
+  names.update(os.listdir(_THIRD_PARTY_DIR))
+  names.update(os.listdir(_MODS_DIR))
+  return names
+
+
+def _save_manifest(manifest, path):
+  file_util.makedirs_safely(os.path.dirname(path))
+  file_util.generate_file_atomically(
+      path, lambda f: marshal.dump(manifest.to_dict(), f))
+
+
+def _load_manifest(path):
+  try:
+    with open(path) as f:
+      data = marshal.load(f)
+  except (EOFError, ValueError, TypeError):
+    return None
+  except IOError as e:
+    if e.errno == errno.ENOENT:
+      return None
+    raise
+  if data.get('version') != _MANIFEST_VERSION:
+    return None
+  return _StagingManifest(data['links'], data['linked_dirs'],
+                          data['top_level_names'], data['real_staging_root'])
+
+
+def _get_manifest():
+  """Returns the manifest of the staging directory, or None if not found."""
+  global _manifest
+  global _manifest_loaded
+  if not _manifest_loaded:
+    _manifest = _load_manifest(build_common.get_staging_manifest_file())
+    _manifest_loaded = True
+  return _manifest
+
+
+def _set_manifest(manifest):
+  global _manifest
+  global _manifest_loaded
+  _manifest = manifest
+  _manifest_loaded = True
+
 
 def is_in_staging(input_path):
   """Does this input path look like one that should come from staging.
 
   Examples are src/*, android/*, libyuv/*, chromium-ppapi/*.
   """
+  manifest = _get_manifest()
+  if manifest is not None:
+    return manifest.is_in_staging(input_path)
   top_level = input_path.split(os.path.sep)[0]
   return (top_level == 'src' or
           os.path.exists(os.path.join('third_party', top_level)) or
@@ -93,6 +278,11 @@ def as_real_path(input_path):
   example input:   android/frameworks/base/...
   example real path: mods/android/frameworks/base/...
   """
+  manifest = _get_manifest()
+  if manifest is not None and manifest.is_in_staging(input_path):
+    real_path = manifest.as_real_path(input_path)
+    if real_path is not None:
+      return real_path
   path = os.path.realpath(as_staging(input_path))
   return os.path.relpath(path, build_common.get_arc_root())
 
@@ -116,13 +306,15 @@ def third_party_to_staging(path):
   return path
 
 
-def _create_symlink(src_path, dest_dir):
+def _create_symlink(src_path, dest_dir, manifest_builder):
   """Creates a symlink pointing to src_path in dest_dir with the same name."""
   os.symlink(os.path.relpath(src_path, dest_dir),
              os.path.join(dest_dir, os.path.basename(src_path)))
+  if manifest_builder:
+    manifest_builder.add_link(src_path, dest_dir)
 
 
-def _create_overlay_base(base_dir, overlays, dest_dir):
+def _create_overlay_base(base_dir, overlays, dest_dir, manifest_builder):
   """Creates symlinks to files and directories in base_dir.
 
   This is a helper of _create_symlink_tree(). it creates symlinks to files and
@@ -160,10 +352,11 @@ def _create_overlay_base(base_dir, overlays, dest_dir):
       continue
     if name == _GIT_DIR or name in overlays:
       continue
-    _create_symlink(os.path.join(base_dir, name), dest_dir)
+    _create_symlink(os.path.join(base_dir, name), dest_dir, manifest_builder)
 
 
-def _create_symlink_tree(mods_root, third_party_root, staging_root):
+def _create_symlink_tree(mods_root, third_party_root, staging_root,
+                         manifest_builder=None):
   """Creates a symlink tree of mods_root overlaid on third_party_root.
 
   This method creates the symlink tree of mods_root directory (working as
@@ -177,6 +370,8 @@ def _create_symlink_tree(mods_root, third_party_root, staging_root):
   staging_root is "out/staging/", then the symlink tree of mods/android/...
   will be created at out/staging/android/..., with overlaying
   third_party/android/...
+
+  The created symlinks are recorded to manifest_builder unless it is None.
   """
   staging_root_parent = os.path.dirname(staging_root)
   file_util.makedirs_safely(staging_root_parent)
@@ -200,11 +395,12 @@ def _create_symlink_tree(mods_root, third_party_root, staging_root):
 
     # Create symlinks for files.
     for name in fnames:
-      _create_symlink(os.path.join(dirpath, name), dest_dir)
+      _create_symlink(os.path.join(dirpath, name), dest_dir, manifest_builder)
 
     if third_party_root:
       _create_overlay_base(
-          os.path.join(third_party_root, relpath), dirs + fnames, dest_dir)
+          os.path.join(third_party_root, relpath), dirs + fnames, dest_dir,
+          manifest_builder)
 
 
 def _get_link_targets(root):
@@ -230,11 +426,19 @@ def create_staging():
 
   if os.path.lexists(staging_root):
     file_util.rmtree(staging_root)
+  manifest_file = build_common.get_staging_manifest_file()
+  file_util.remove_file_force(manifest_file)
 
-  _create_symlink_tree(_MODS_DIR, _THIRD_PARTY_DIR, staging_root)
+  manifest_builder = _StagingManifestBuilder(build_common.get_arc_root(),
+                                             staging_root)
+  _create_symlink_tree(_MODS_DIR, _THIRD_PARTY_DIR, staging_root,
+                       manifest_builder)
 
   # internal/ is an optional checkout
   if build_options.OPTIONS.internal_apks_source_is_internal():
+    # fix_staging.py below modifies the staging directory, so the manifest
+    # cannot be used. The lookups fall back to the file system.
+    manifest_builder = None
     assert build_common.has_internal_checkout()
     for name in os.listdir(_INTERNAL_THIRD_PARTY_PATH):
       if os.path.exists(os.path.join(_THIRD_PARTY_DIR, name)):
@@ -245,7 +449,15 @@ def create_staging():
     subprocess.check_call('internal/build/fix_staging.py')
 
   # src/ is not overlaid on any directory.
-  _create_symlink_tree(_SRC_DIR, None, os.path.join(staging_root, 'src'))
+  _create_symlink_tree(_SRC_DIR, None, os.path.join(staging_root, 'src'),
+                       manifest_builder)
+
+  if manifest_builder:
+    manifest = manifest_builder.build(_get_top_level_names())
+    _save_manifest(manifest, manifest_file)
+    _set_manifest(manifest)
+  else:
+    _set_manifest(None)
 
   # Update modification time for files that do not point to the same location
   # that they pointed to in the previous tree to make sure they are built.
@@ -4,9 +4,13 @@
 
 """Tests for staging."""
 
+import os
+import shutil
+import tempfile
 import unittest
 
 from src.build import staging
+from src.build.util import file_util
 
 
 class StagingTest(unittest.TestCase):
@@ -67,5 +71,109 @@ class StagingTest(unittest.TestCase):
     self.assertEquals('mods/foo/bar', mods)
 
 
+class StagingManifestTest(unittest.TestCase):
+  def setUp(self):
+    self._original_cwd = os.getcwd()
+    self._tmpdir = os.path.realpath(tempfile.mkdtemp(prefix='staging_test'))
+    os.chdir(self._tmpdir)
+    for path in ['mods/android/NOTICE',
+                 'mods/android/frameworks/base/core.java',
+                 'mods/chromium-ppapi/ppapi/foo.h',
+                 'third_party/android/NOTICE',
+                 'third_party/android/frameworks/base/core.java',
+                 'third_party/android/frameworks/base/other.java',
+                 'third_party/android/external/lib/a.c',
+                 'third_party/android/external/real/a.h',
+                 'third_party/android/external/real/deep/b.h',
+                 'third_party/chromium-ppapi/ppapi/LICENSE',
+                 'third_party/chromium-ppapi/base/x.h',
+                 'third_party/libyuv/yuv.c',
+                 'src/common/a.cc']:
+      file_util.makedirs_safely(os.path.dirname(path))
+      with open(path, 'w'):
+        pass
+    # A symbolic link in third_party is resolved as realpath does.
+    os.symlink('libyuv', 'third_party/libyuv_link')
+    # So are the symbolic links inside the directories linked as a whole, and
+    # inside the directories they point to.
+    os.symlink('real', 'third_party/android/external/alias')
+    os.symlink('../lib/a.c', 'third_party/android/external/real/a_link.c')
+    os.symlink('deep', 'third_party/android/external/real/deep_link')
+
+    self._staging_root = os.path.join('out', 'staging')
+    builder = staging._StagingManifestBuilder(self._tmpdir, self._staging_root)
+    staging._create_symlink_tree('mods', 'third_party', self._staging_root,
+                                 builder)
+    staging._create_symlink_tree(
+        'src', None, os.path.join(self._staging_root, 'src'), builder)
+    self._manifest = builder.build(staging._get_top_level_names())
+
+  def tearDown(self):
+    os.chdir(self._original_cwd)
+    shutil.rmtree(self._tmpdir)
+
+  def _get_real_path(self, input_path):
+    return os.path.relpath(
+        os.path.realpath(os.path.join(self._staging_root, input_path)),
+        self._tmpdir)
+
+  def _assert_same_as_realpath(self, manifest):
+    input_paths = ['android/frameworks/base/missing.java', 'libyuv/missing',
+                   'chromium-ppapi/base/x.h', 'android/./NOTICE']
+    for root, dirs, files in os.walk(self._staging_root, followlinks=True):
+      for name in dirs + files:
+        input_paths.append(os.path.relpath(os.path.join(root, name),
+                                           self._staging_root))
+    self.assertIn('android/external/lib/a.c', input_paths)
+    self.assertIn('android/external/alias/a.h', input_paths)
+    self.assertIn('android/external/alias/deep_link/b.h', input_paths)
+    for input_path in input_paths:
+      self.assertEquals(self._get_real_path(input_path),
+                        manifest.as_real_path(input_path), input_path)
+
+  def test_as_real_path(self):
+    self.assertEquals('mods/android/NOTICE',
+                      self._manifest.as_real_path('android/NOTICE'))
+    self.assertEquals('third_party/libyuv/yuv.c',
+                      self._manifest.as_real_path('libyuv_link/yuv.c'))
+    self.assertEquals('out/staging/android/frameworks',
+                      self._manifest.as_real_path('android/frameworks'))
+    self._assert_same_as_realpath(self._manifest)
+    self.assertEquals('third_party/android/external/real/a.h',
+                      self._manifest.as_real_path('android/external/alias/a.h'))
+    self.assertIsNone(self._manifest.as_real_path('/android'))
+    self.assertIsNone(self._manifest.as_real_path('../android'))
+
+  def test_as_real_path_with_cycle(self):
+    os.symlink('..', 'third_party/android/external/real/parent')
+    for input_path in ['android/external/real/parent/lib/a.c',
+                       'android/external/alias/parent/alias/parent/lib/a.c']:
+      self.assertEquals('third_party/android/external/lib/a.c',
+                        self._manifest.as_real_path(input_path))
+
+  def test_as_real_path_cached(self):
+    self.assertEquals('third_party/android/external/real/a.h',
+                      self._manifest.as_real_path('android/external/alias/a.h'))
+    # The paths under the linked directories are resolved once.
+    os.remove('third_party/android/external/alias')
+    self.assertEquals('third_party/android/external/real/a.h',
+                      self._manifest.as_real_path('android/external/alias/a.h'))
+
+  def test_is_in_staging(self):
+    for input_path in ['src/common', 'android/NOTICE', 'libyuv',
+                       'chromium-ppapi/base']:
+      self.assertTrue(self._manifest.is_in_staging(input_path))
+    self.assertFalse(self._manifest.is_in_staging('canned'))
+    self.assertFalse(self._manifest.is_in_staging('out/staging'))
+
+  def test_save_and_load(self):
+    path = os.path.join('out', 'staging_manifest')
+    staging._save_manifest(self._manifest, path)
+    manifest = staging._load_manifest(path)
+    self._assert_same_as_realpath(manifest)
+    self.assertTrue(manifest.is_in_staging('android'))
+    self.assertIsNone(staging._load_manifest(path + '.missing'))
+
+
 if __name__ == '__main__':
   unittest.main()
@@ -0,0 +1,247 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Pushes files to a remote directory, sending only what has changed.
+
+rsync compares the whole sending tree with the remote tree on every run. This
+module instead keeps a local manifest of (path, size, mtime, sha1) of the files
+last pushed to each remote directory, and sends only the changed files as one
+tar stream. Paths which are in the manifest but are no longer sent are deleted
+from the remote directory. Files created on the remote host (e.g. .pyc files
+or downloaded Chrome binaries) are never touched.
+
+A random stamp is written both to the manifest and to the remote directory on
+each push. If they do not match (e.g. the remote /tmp was cleared on reboot,
+someone else synced the same directory, or the last push failed in the
+middle), the manifest cannot be trusted and the caller needs to fall back to a
+full sync, then call DeltaPusher.record().
+"""
+
+import cStringIO
+import hashlib
+import json
+import os
+import pipes
+import subprocess
+import tarfile
+import uuid
+
+from src.build import build_common
+from src.build.util import file_util
+
+# Name of the file containing the stamp in the remote directory.
+STAMP_FILE = '.arc_delta_sync_stamp'
+
+# Name of the file in the tar stream which lists the paths to be deleted.
+_DELETE_LIST_FILE = '.arc_delta_sync_delete'
+
+_HASH_CHUNK_SIZE = 64 * 1024
+
+_MANIFEST_VERSION = 1
+
+
+def compute_sha1(path):
+  """Returns the sha1 of the file content, reading it in fixed-size chunks."""
+  sha1 = hashlib.sha1()
+  with open(path, 'rb') as f:
+    for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), ''):
+      sha1.update(chunk)
+  return sha1.hexdigest()
+
+
+def _is_ignored(name):
+  # Same as the files RemoteExecutor.rsync() never sends.
+  return (name.endswith('.pyc') or
+          bool(build_common.COMMON_EDITOR_TMP_FILE_REG.match(name)))
+
+
+def collect_files(source_paths, exclude_paths=None, get_stripped_path=None):
+  """Lists the files to be sent.
+
+  Args:
+      source_paths: a list of paths to be sent. If the path is a directory,
+          all files under the directory are sent. Symbolic links are followed.
+      exclude_paths: an optional list of files or directories to be excluded.
+      get_stripped_path: an optional function which takes a path and returns
+          the path of the corresponding stripped binary, or None. If it
+          returns a path, the stripped binary is sent instead.
+
+  Returns:
+      A dict from a path relative to the destination directory to the local
+      path of the file to be sent.
+  """
+  exclude_paths = set(os.path.normpath(path) for path in exclude_paths or [])
+  result = {}
+
+  def add(path):
+    if _is_ignored(os.path.basename(path)) or path in exclude_paths:
+      return
+    local_path = get_stripped_path(path) if get_stripped_path else None
+    result[path] = local_path or path
+
+  for source_path in source_paths:
+    source_path = os.path.normpath(source_path)
+    if any(path in exclude_paths
+           for path in file_util.walk_ancestor(source_path)):
+      continue
+    if not os.path.isdir(source_path):
+      if os.path.isfile(source_path):
+        add(source_path)
+      continue
+    for dirpath, dirnames, filenames in os.walk(source_path, followlinks=True):
+      dirnames[:] = [
+          name for name in dirnames
+          if not _is_ignored(name) and
+          os.path.join(dirpath, name) not in exclude_paths]
+      for name in filenames:
+        add(os.path.join(dirpath, name))
+  return result
+
+
+class DeltaPusher(object):
+  def __init__(self, manifest_path, popen_remote):
+    """Constructor.
+
+    Args:
+        manifest_path: the local path of the manifest for the remote
+            directory.
+        popen_remote: a function which takes a shell command line, runs it on
+            the remote host, and returns a subprocess.Popen-like object whose
+            stdin and stdout are pipes.
+    """
+    self._manifest_path = manifest_path
+    self._popen_remote = popen_remote
+
+  def push(self, files, remote_dest_root):
+    """Sends the files changed since the last push.
+
+    Args:
+        files: the dict returned by collect_files().
+        remote_dest_root: the destination directory on the remote host.
+
+    Returns:
+        A sorted list of the sent paths, or None if the manifest is not valid
+        for the remote directory. In that case nothing is sent, and the caller
+        needs to do a full sync.
+    """
+    manifest = self._load_manifest()
+    if (manifest is None or
+        manifest['stamp'] != self._read_remote_stamp(remote_dest_root)):
+      return None
+
+    old_entries = manifest['files']
+    new_entries = {}
+    sent_paths = []
+    for path, local_path in sorted(files.iteritems()):
+      st = os.stat(local_path)
+      entry = old_entries.get(path)
+      if entry and entry[0] == st.st_size and entry[1] == st.st_mtime:
+        new_entries[path] = entry
+        continue
+      sha1 = compute_sha1(local_path)
+      new_entries[path] = [st.st_size, st.st_mtime, sha1]
+      if entry and entry[2] == sha1:
+        # Touched, but the content is not changed.
+        continue
+      sent_paths.append(path)
+    deleted_paths = sorted(set(old_entries) - set(files))
+
+    stamp = manifest['stamp']
+    if sent_paths or deleted_paths:
+      stamp = uuid.uuid4().hex
+      self._send(remote_dest_root, files, sent_paths, deleted_paths, stamp)
+    self._save_manifest(stamp, new_entries)
+    return sent_paths
+
+  def record(self, files, remote_dest_root):
+    """Records |files| as the content of the remote directory.
+
+    This needs to be called after a full sync of |files|, so that the
+    following push() can send only the delta.
+    """
+    stamp = uuid.uuid4().hex
+    self._run_remote('mkdir -p %s && echo %s > %s' % (
+        pipes.quote(remote_dest_root), stamp,
+        pipes.quote(os.path.join(remote_dest_root, STAMP_FILE))))
+    # The sha1 is computed lazily on the next push, only for the files whose
+    # size or mtime are changed.
+    entries = {}
+    for path, local_path in files.iteritems():
+      st = os.stat(local_path)
+      entries[path] = [st.st_size, st.st_mtime, None]
+    self._save_manifest(stamp, entries)
+
+  def _send(self, remote_dest_root, files, sent_paths, deleted_paths, stamp):
+    # The remote stamp is removed first, so that a failure in the middle
+    # invalidates the manifest.
+    command = (
+        'mkdir -p {root} && cd {root} && rm -f {stamp_file} && tar -xzf - && '
+        '(test ! -f {delete_list} || '
+        '(xargs -0 rm -f < {delete_list} && rm -f {delete_list})) && '
+        'echo {stamp} > {stamp_file}').format(
+            root=pipes.quote(remote_dest_root), stamp_file=STAMP_FILE,
+            delete_list=_DELETE_LIST_FILE, stamp=stamp)
+    process = self._popen_remote(command)
+    try:
+      with tarfile.open(fileobj=process.stdin, mode='w|gz') as archive:
+        # Add the parent directories first, so that they are accessible by
+        # any user as rsync --chmod=a=rwx does.
+        dirpaths = set()
+        for path in sent_paths:
+          dirpaths.update(
+              file_util.walk_ancestor(os.path.dirname(path) or '.'))
+        dirpaths.discard('.')
+        for dirpath in sorted(dirpaths):
+          info = tarfile.TarInfo(dirpath)
+          info.type = tarfile.DIRTYPE
+          info.mode = 0777
+          archive.addfile(info)
+        for path in sent_paths:
+          with open(files[path], 'rb') as f:
+            st = os.fstat(f.fileno())
+            info = tarfile.TarInfo(path)
+            info.size = st.st_size
+            info.mtime = st.st_mtime
+            info.mode = 0777
+            archive.addfile(info, f)
+        if deleted_paths:
+          content = '\0'.join(deleted_paths)
+          info = tarfile.TarInfo(_DELETE_LIST_FILE)
+          info.size = len(content)
+          archive.addfile(info, cStringIO.StringIO(content))
+    finally:
+      process.stdin.close()
+    process.stdout.read()
+    process.wait()
+    if process.returncode:
+      raise subprocess.CalledProcessError(process.returncode, command)
+
+  def _read_remote_stamp(self, remote_dest_root):
+    return self._run_remote('cat %s 2>/dev/null || true' % pipes.quote(
+        os.path.join(remote_dest_root, STAMP_FILE))).strip()
+
+  def _run_remote(self, command):
+    process = self._popen_remote(command)
+    output = process.communicate('')[0]
+    if process.returncode:
+      raise subprocess.CalledProcessError(process.returncode, command)
+    return output
+
+  def _load_manifest(self):
+    try:
+      with open(self._manifest_path) as f:
+        manifest = json.load(f)
+    except (IOError, ValueError):
+      return None
+    if manifest.get('version') != _MANIFEST_VERSION:
+      return None
+    return manifest
+
+  def _save_manifest(self, stamp, entries):
+    file_util.makedirs_safely(os.path.dirname(self._manifest_path))
+    file_util.write_atomically(self._manifest_path, json.dumps({
+        'version': _MANIFEST_VERSION,
+        'stamp': stamp,
+        'files': entries,
+    }))
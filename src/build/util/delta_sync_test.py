@@ -0,0 +1,129 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from src.build.util import delta_sync
+from src.build.util import file_util
+
+
+def _popen_local(cmd):
+  # Stands in for ssh. The "remote" directory is just a local directory.
+  return subprocess.Popen(['sh', '-c', cmd], stdin=subprocess.PIPE,
+                          stdout=subprocess.PIPE)
+
+
+def _write(path, content):
+  file_util.makedirs_safely(os.path.dirname(path) or '.')
+  with open(path, 'w') as f:
+    f.write(content)
+
+
+def _read(path):
+  with open(path) as f:
+    return f.read()
+
+
+class DeltaSyncTest(unittest.TestCase):
+  def setUp(self):
+    self._original_cwd = os.getcwd()
+    self._tmpdir = tempfile.mkdtemp(prefix='delta_sync_test')
+    self._remote_dir = os.path.join(self._tmpdir, 'remote')
+    self._manifest_path = os.path.join(self._tmpdir, 'manifest.json')
+    source_dir = os.path.join(self._tmpdir, 'source')
+    os.mkdir(source_dir)
+    os.chdir(source_dir)
+    _write('src/a.py', 'a')
+    _write('src/a.pyc', 'compiled')
+    _write('src/.a.py.swp', 'swap')
+    _write('src/sub/b.txt', 'b')
+    _write('src/excluded/c.txt', 'c')
+    _write('out/lib.so', 'unstripped')
+    _write('out/stripped/lib.so', 'stripped')
+
+  def tearDown(self):
+    os.chdir(self._original_cwd)
+    shutil.rmtree(self._tmpdir)
+
+  def _collect_files(self):
+    def get_stripped_path(path):
+      stripped_path = os.path.join('out/stripped', os.path.basename(path))
+      if path.startswith('out/') and os.path.isfile(stripped_path):
+        return stripped_path
+      return None
+    return delta_sync.collect_files(
+        ['src', 'out/lib.so'], exclude_paths=['src/excluded'],
+        get_stripped_path=get_stripped_path)
+
+  def _full_sync(self, files):
+    # Stands in for rsync.
+    for path, local_path in files.iteritems():
+      remote_path = os.path.join(self._remote_dir, path)
+      file_util.makedirs_safely(os.path.dirname(remote_path))
+      shutil.copyfile(local_path, remote_path)
+
+  def _push(self):
+    pusher = delta_sync.DeltaPusher(self._manifest_path, _popen_local)
+    files = self._collect_files()
+    sent_paths = pusher.push(files, self._remote_dir)
+    if sent_paths is None:
+      self._full_sync(files)
+      pusher.record(files, self._remote_dir)
+    return sent_paths
+
+  def test_collect_files(self):
+    self.assertEquals({'src/a.py': 'src/a.py',
+                       'src/sub/b.txt': 'src/sub/b.txt',
+                       'out/lib.so': 'out/stripped/lib.so'},
+                      self._collect_files())
+
+  def test_push_delta(self):
+    # There is no manifest yet, so a full sync is needed.
+    self.assertIsNone(self._push())
+    # Nothing is changed.
+    self.assertEquals([], self._push())
+
+    # Add, modify and remove files.
+    _write('src/new.txt', 'new')
+    _write('src/sub/b.txt', 'modified')
+    _write('out/stripped/lib.so', 'rebuilt')
+    os.remove('src/a.py')
+    _write(os.path.join(self._remote_dir, 'src/a.pyc'), 'remote')
+    self.assertEquals(['out/lib.so', 'src/new.txt', 'src/sub/b.txt'],
+                      self._push())
+
+    self.assertEquals('new', _read(os.path.join(self._remote_dir,
+                                                'src/new.txt')))
+    self.assertEquals('modified', _read(os.path.join(self._remote_dir,
+                                                     'src/sub/b.txt')))
+    self.assertEquals('rebuilt', _read(os.path.join(self._remote_dir,
+                                                    'out/lib.so')))
+    self.assertFalse(os.path.exists(os.path.join(self._remote_dir,
+                                                 'src/a.py')))
+    # Files created on the remote side are kept.
+    self.assertTrue(os.path.exists(os.path.join(self._remote_dir,
+                                                'src/a.pyc')))
+    self.assertEquals([], self._push())
+
+  def test_touched_file_is_not_sent(self):
+    self.assertIsNone(self._push())
+    _write('src/sub/b.txt', 'b2')
+    self.assertEquals(['src/sub/b.txt'], self._push())
+    # Now the manifest has the sha1 of the file.
+    os.utime('src/sub/b.txt', (0, 0))
+    self.assertEquals([], self._push())
+
+  def test_stamp_mismatch(self):
+    self.assertIsNone(self._push())
+    os.remove(os.path.join(self._remote_dir, delta_sync.STAMP_FILE))
+    self.assertIsNone(self._push())
+    self.assertEquals([], self._push())
+
+
+if __name__ == '__main__':
+  unittest.main()
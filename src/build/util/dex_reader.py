@@ -0,0 +1,235 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Reads classes and methods from a DEX file without dexdump.
+
+Only the sections needed to enumerate methods are read: string_ids, type_ids,
+proto_ids, method_ids, class_defs, class_data and method annotations. Strings
+and types are decoded on demand, and methods are yielded one by one, so the
+memory usage stays close to the size of the DEX file itself.
+
+The format is described in
+https://source.android.com/devices/tech/dalvik/dex-format.html
+"""
+
+import collections
+import struct
+import zipfile
+
+# Access flags.
+ACC_PUBLIC = 0x1
+ACC_PRIVATE = 0x2
+ACC_PROTECTED = 0x4
+ACC_ABSTRACT = 0x400
+ACC_CONSTRUCTOR = 0x10000
+
+_DEX_MAGIC_PREFIX = 'dex\n'
+_ENDIAN_CONSTANT = 0x12345678
+
+# Offsets of the (size, offset) pairs of each section in the header.
+_STRING_IDS = 0x38
+_TYPE_IDS = 0x40
+_PROTO_IDS = 0x48
+_METHOD_IDS = 0x58
+_CLASS_DEFS = 0x60
+
+_HEADER_SIZE = 0x70
+_PROTO_ID_ITEM_SIZE = 12
+_METHOD_ID_ITEM_SIZE = 8
+_CLASS_DEF_ITEM_SIZE = 32
+
+_UINT = struct.Struct('<I')
+_USHORT = struct.Struct('<H')
+_PROTO_ID_ITEM = struct.Struct('<III')
+_METHOD_ID_ITEM = struct.Struct('<HHI')
+_CLASS_DEF_ITEM = struct.Struct('<IIIIIIII')
+_ANNOTATIONS_DIRECTORY_ITEM = struct.Struct('<IIII')
+
+
+class DexFormatError(Exception):
+  pass
+
+
+# A method defined in a class.
+#
+# |class_descriptor|, |return_type| and |parameter_types| are type
+# descriptors, e.g. 'Lfoo/bar/Baz;' or 'V'. |annotations| is a list of type
+# descriptors of the annotations of the method. Strings are in MUTF-8 as
+# stored in the DEX file, as dexdump outputs them.
+DexMethod = collections.namedtuple(
+    'DexMethod', ['class_descriptor', 'class_access_flags', 'name',
+                  'access_flags', 'return_type', 'parameter_types',
+                  'annotations'])
+
+
+class DexReader(object):
+  def __init__(self, data):
+    """Constructor.
+
+    Args:
+        data: The content of a DEX file, as a str or mmap.
+    """
+    if (len(data) < _HEADER_SIZE or
+        data[:len(_DEX_MAGIC_PREFIX)] != _DEX_MAGIC_PREFIX):
+      raise DexFormatError('Not a DEX file')
+    self._data = data
+    if self._read_uint(0x28) != _ENDIAN_CONSTANT:
+      raise DexFormatError('Unsupported endianness')
+    self._string_ids_size, self._string_ids_off = self._read_section(
+        _STRING_IDS)
+    self._type_ids_size, self._type_ids_off = self._read_section(_TYPE_IDS)
+    self._proto_ids_size, self._proto_ids_off = self._read_section(_PROTO_IDS)
+    self._method_ids_size, self._method_ids_off = self._read_section(
+        _METHOD_IDS)
+    self._class_defs_size, self._class_defs_off = self._read_section(
+        _CLASS_DEFS)
+    self._string_cache = {}
+
+  def _read_uint(self, offset):
+    return _UINT.unpack_from(self._data, offset)[0]
+
+  def _read_section(self, offset):
+    size = self._read_uint(offset)
+    section_offset = self._read_uint(offset + 4)
+    if section_offset + size > len(self._data):
+      raise DexFormatError('Section out of range at 0x%x' % offset)
+    return size, section_offset
+
+  def _read_uleb128(self, offset):
+    """Returns the decoded value and the offset following it."""
+    result = 0
+    shift = 0
+    while True:
+      byte = ord(self._data[offset])
+      offset += 1
+      result |= (byte & 0x7f) << shift
+      if byte < 0x80:
+        return result, offset
+      shift += 7
+
+  def get_string(self, string_idx):
+    result = self._string_cache.get(string_idx)
+    if result is None:
+      offset = self._read_uint(self._string_ids_off + string_idx * 4)
+      # Skip the length in UTF-16 code units. MUTF-8 does not contain '\0'
+      # other than the terminator.
+      _, start = self._read_uleb128(offset)
+      result = self._data[start:self._data.find('\0', start)]
+      self._string_cache[string_idx] = result
+    return result
+
+  def get_type(self, type_idx):
+    return self.get_string(self._read_uint(self._type_ids_off + type_idx * 4))
+
+  def _get_type_list(self, offset):
+    if not offset:
+      return []
+    size = self._read_uint(offset)
+    return [
+        self.get_type(_USHORT.unpack_from(self._data, offset + 4 + i * 2)[0])
+        for i in xrange(size)]
+
+  def _get_method_annotations(self, annotations_off):
+    """Returns a dict from method_idx to annotation type descriptors."""
+    if not annotations_off:
+      return {}
+    _, fields_size, methods_size, _ = _ANNOTATIONS_DIRECTORY_ITEM.unpack_from(
+        self._data, annotations_off)
+    # Skip the field annotations.
+    offset = (annotations_off + _ANNOTATIONS_DIRECTORY_ITEM.size +
+              fields_size * 8)
+    result = {}
+    for i in xrange(methods_size):
+      method_idx, set_off = struct.unpack_from(
+          '<II', self._data, offset + i * 8)
+      annotations = []
+      for j in xrange(self._read_uint(set_off)):
+        item_off = self._read_uint(set_off + 4 + j * 4)
+        # Skip the visibility byte of annotation_item. The type_idx is the
+        # first element of encoded_annotation.
+        type_idx, _ = self._read_uleb128(item_off + 1)
+        annotations.append(self.get_type(type_idx))
+      result[method_idx] = annotations
+    return result
+
+  def _read_encoded_methods(self, offset, count):
+    """Reads a list of encoded_method.
+
+    Returns:
+        A list of (method_idx, access_flags), and the offset following the
+        list.
+    """
+    methods = []
+    method_idx = 0
+    for _ in xrange(count):
+      method_idx_diff, offset = self._read_uleb128(offset)
+      access_flags, offset = self._read_uleb128(offset)
+      _, offset = self._read_uleb128(offset)  # code_off
+      method_idx += method_idx_diff
+      methods.append((method_idx, access_flags))
+    return methods, offset
+
+  def _skip_encoded_fields(self, offset, count):
+    for _ in xrange(count * 2):
+      _, offset = self._read_uleb128(offset)
+    return offset
+
+  def _get_method(self, class_descriptor, class_access_flags, method_idx,
+                  access_flags, annotations):
+    if method_idx >= self._method_ids_size:
+      raise DexFormatError('Invalid method_idx %d' % method_idx)
+    _, proto_idx, name_idx = _METHOD_ID_ITEM.unpack_from(
+        self._data, self._method_ids_off + method_idx * _METHOD_ID_ITEM_SIZE)
+    _, return_type_idx, parameters_off = _PROTO_ID_ITEM.unpack_from(
+        self._data, self._proto_ids_off + proto_idx * _PROTO_ID_ITEM_SIZE)
+    return DexMethod(
+        class_descriptor=class_descriptor,
+        class_access_flags=class_access_flags,
+        name=self.get_string(name_idx),
+        access_flags=access_flags,
+        return_type=self.get_type(return_type_idx),
+        parameter_types=self._get_type_list(parameters_off),
+        annotations=annotations.get(method_idx, []))
+
+  def iter_methods(self):
+    """Yields DexMethod of each method, in the order dexdump outputs them.
+
+    That is, classes are in the order of class_defs, and in each class,
+    direct methods (including constructors) come before virtual methods.
+    """
+    for i in xrange(self._class_defs_size):
+      (class_idx, class_access_flags, _, _, _, annotations_off,
+       class_data_off, _) = _CLASS_DEF_ITEM.unpack_from(
+           self._data, self._class_defs_off + i * _CLASS_DEF_ITEM_SIZE)
+      if not class_data_off:
+        # A marker interface or a class without any members.
+        continue
+      class_descriptor = self.get_type(class_idx)
+      annotations = self._get_method_annotations(annotations_off)
+
+      offset = class_data_off
+      sizes = []
+      for _ in xrange(4):
+        size, offset = self._read_uleb128(offset)
+        sizes.append(size)
+      (static_fields_size, instance_fields_size, direct_methods_size,
+       virtual_methods_size) = sizes
+      offset = self._skip_encoded_fields(
+          offset, static_fields_size + instance_fields_size)
+      direct_methods, offset = self._read_encoded_methods(
+          offset, direct_methods_size)
+      virtual_methods, _ = self._read_encoded_methods(
+          offset, virtual_methods_size)
+      for method_idx, access_flags in direct_methods + virtual_methods:
+        yield self._get_method(class_descriptor, class_access_flags,
+                               method_idx, access_flags, annotations)
+
+
+def read_classes_dex(apk_path):
+  """Returns the content of classes.dex in the apk.
+
+  Raises zipfile.BadZipfile or KeyError if it cannot be read.
+  """
+  with zipfile.ZipFile(apk_path) as apk:
+    return apk.read('classes.dex')
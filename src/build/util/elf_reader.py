@@ -0,0 +1,142 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Reads the dynamic symbols of an ELF file without nm.
+
+Only the ELF header, the section headers, .dynsym and the string table linked
+from it are read. Both 32-bit and 64-bit ELF files in either endianness are
+supported.
+
+The format is described in
+http://www.sco.com/developers/gabi/latest/contents.html
+"""
+
+import collections
+import struct
+
+# Symbol bindings.
+STB_LOCAL = 0
+STB_GLOBAL = 1
+STB_WEAK = 2
+
+# Symbol types.
+STT_NOTYPE = 0
+STT_OBJECT = 1
+STT_FUNC = 2
+STT_GNU_IFUNC = 10
+
+# Special section indexes.
+SHN_UNDEF = 0
+SHN_LORESERVE = 0xff00
+
+# Section flags.
+SHF_EXECINSTR = 0x4
+
+_ELF_MAGIC = '\x7fELF'
+_ELFCLASS32 = 1
+_ELFCLASS64 = 2
+_ELFDATA2LSB = 1
+_ELFDATA2MSB = 2
+_EI_NIDENT = 16
+
+_SHT_DYNSYM = 11
+
+
+class ElfFormatError(Exception):
+  pass
+
+
+# A symbol in .dynsym.
+#
+# |section_flags| are the flags of the section the symbol is defined in, or 0
+# if |section_index| is SHN_UNDEF or a special section index.
+ElfSymbol = collections.namedtuple(
+    'ElfSymbol', ['name', 'binding', 'type', 'section_index',
+                  'section_flags'])
+
+
+class _Layout(object):
+  """The structures whose layout depends on the ELF class and endianness."""
+
+  def __init__(self, elf_class, byte_order):
+    if elf_class == _ELFCLASS32:
+      # e_shoff, e_shentsize, e_shnum.
+      self.header = struct.Struct(byte_order + '16xI10xHH2x')
+      # sh_type, sh_flags, sh_offset, sh_size, sh_link, sh_entsize.
+      self.section_header = struct.Struct(byte_order + '4xII4xIII8xI')
+      # st_name, st_info, st_shndx.
+      self.symbol = struct.Struct(byte_order + 'I8xB1xH')
+    else:
+      self.header = struct.Struct(byte_order + '24xQ10xHH2x')
+      self.section_header = struct.Struct(byte_order + '4xIQ8xQQI12xQ')
+      self.symbol = struct.Struct(byte_order + 'IB1xH16x')
+
+
+class ElfReader(object):
+  def __init__(self, data):
+    """Constructor.
+
+    Args:
+        data: The content of an ELF file, as a str or mmap.
+    """
+    if len(data) < _EI_NIDENT or data[:len(_ELF_MAGIC)] != _ELF_MAGIC:
+      raise ElfFormatError('Not an ELF file')
+    elf_class = ord(data[4])
+    elf_data = ord(data[5])
+    if elf_class not in (_ELFCLASS32, _ELFCLASS64):
+      raise ElfFormatError('Unsupported ELF class %d' % elf_class)
+    if elf_data not in (_ELFDATA2LSB, _ELFDATA2MSB):
+      raise ElfFormatError('Unsupported ELF data encoding %d' % elf_data)
+    self._data = data
+    self._layout = _Layout(elf_class,
+                           '<' if elf_data == _ELFDATA2LSB else '>')
+    self._section_headers = self._read_section_headers()
+
+  def _unpack(self, struct_object, offset):
+    if offset + struct_object.size > len(self._data):
+      raise ElfFormatError('Out of range at 0x%x' % offset)
+    return struct_object.unpack_from(self._data, offset)
+
+  def _read_section_headers(self):
+    """Returns a list of (type, flags, offset, size, link, entsize)."""
+    # The ELF header is laid out from the end of e_ident.
+    shoff, shentsize, shnum = self._unpack(self._layout.header, _EI_NIDENT)
+    if shnum and shentsize < self._layout.section_header.size:
+      raise ElfFormatError('Invalid section header size %d' % shentsize)
+    return [self._unpack(self._layout.section_header, shoff + i * shentsize)
+            for i in xrange(shnum)]
+
+  def _get_section_flags(self, section_index):
+    if (section_index == SHN_UNDEF or section_index >= SHN_LORESERVE or
+        section_index >= len(self._section_headers)):
+      return 0
+    return self._section_headers[section_index][1]
+
+  def iter_dynamic_symbols(self):
+    """Yields ElfSymbol of each symbol in .dynsym, in the order in the file.
+
+    The null symbol at index 0 is skipped. Nothing is yielded if the file has
+    no .dynsym.
+    """
+    for (section_type, _, offset, size, link,
+         entsize) in self._section_headers:
+      if section_type != _SHT_DYNSYM:
+        continue
+      if entsize < self._layout.symbol.size:
+        raise ElfFormatError('Invalid symbol size %d' % entsize)
+      if link >= len(self._section_headers):
+        raise ElfFormatError('Invalid string table index %d' % link)
+      _, _, strtab_offset, strtab_size, _, _ = self._section_headers[link]
+      for symbol_offset in xrange(offset + entsize, offset + size, entsize):
+        name_offset, info, section_index = self._unpack(
+            self._layout.symbol, symbol_offset)
+        if name_offset >= strtab_size:
+          raise ElfFormatError('Invalid symbol name at 0x%x' % symbol_offset)
+        start = strtab_offset + name_offset
+        yield ElfSymbol(
+            name=self._data[start:self._data.find('\0', start)],
+            binding=info >> 4,
+            type=info & 0xf,
+            section_index=section_index,
+            section_flags=self._get_section_flags(section_index))
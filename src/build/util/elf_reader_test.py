@@ -0,0 +1,133 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import struct
+import unittest
+
+from src.build.util import elf_reader
+
+_SHT_PROGBITS = 1
+_SHT_STRTAB = 3
+_SHT_DYNSYM = 11
+
+_SHF_WRITE = 0x1
+_SHF_ALLOC = 0x2
+
+# The indexes of the sections _build_elf creates.
+_TEXT_INDEX = 1
+_DATA_INDEX = 2
+
+_SHN_ABS = 0xfff1
+
+
+def _build_elf(is_64bit, byte_order, symbols):
+  """Builds a minimal ELF file with .text, .data, .dynstr and .dynsym.
+
+  Args:
+      is_64bit: True for ELFCLASS64, False for ELFCLASS32.
+      byte_order: '<' for little endian, '>' for big endian.
+      symbols: A list of (name, binding, type, section_index).
+
+  Returns:
+      The content of the ELF file.
+  """
+  if is_64bit:
+    header = struct.Struct(byte_order + 'HHIQQQIHHHHHH')
+    section_header = struct.Struct(byte_order + 'IIQQQQIIQQ')
+    symbol = struct.Struct(byte_order + 'IBBHQQ')
+  else:
+    header = struct.Struct(byte_order + 'HHIIIIIHHHHHH')
+    section_header = struct.Struct(byte_order + 'IIIIIIIIII')
+    symbol = struct.Struct(byte_order + 'IIIBBH')
+
+  dynstr = '\0'
+  dynsym = '\0' * symbol.size
+  for name, binding, symbol_type, section_index in symbols:
+    info = (binding << 4) | symbol_type
+    if is_64bit:
+      dynsym += symbol.pack(len(dynstr), info, 0, section_index, 0, 0)
+    else:
+      dynsym += symbol.pack(len(dynstr), 0, 0, info, 0, section_index)
+    dynstr += name + '\0'
+
+  ident = '\x7fELF%s%s\x01' % (chr(2 if is_64bit else 1),
+                               chr(1 if byte_order == '<' else 2))
+  ident += '\0' * (16 - len(ident))
+  dynstr_offset = 16 + header.size
+  dynsym_offset = dynstr_offset + len(dynstr)
+  section_headers_offset = dynsym_offset + len(dynsym)
+  sections = [
+      (0, 0, 0, 0, 0, 0),
+      (_SHT_PROGBITS, _SHF_ALLOC | elf_reader.SHF_EXECINSTR, 0, 0, 0, 0),
+      (_SHT_PROGBITS, _SHF_ALLOC | _SHF_WRITE, 0, 0, 0, 0),
+      (_SHT_STRTAB, _SHF_ALLOC, dynstr_offset, len(dynstr), 0, 0),
+      (_SHT_DYNSYM, _SHF_ALLOC, dynsym_offset, len(dynsym), 3, symbol.size),
+  ]
+  content = ident + header.pack(
+      3, 0, 1, 0, 0, section_headers_offset, 0, 16 + header.size, 0, 0,
+      section_header.size, len(sections), 0)
+  content += dynstr + dynsym
+  for section_type, flags, offset, size, link, entsize in sections:
+    content += section_header.pack(0, section_type, flags, 0, offset, size,
+                                   link, 0, 0, entsize)
+  return content
+
+
+_SYMBOLS = [
+    ('open', elf_reader.STB_GLOBAL, elf_reader.STT_FUNC, _TEXT_INDEX),
+    ('weak_func', elf_reader.STB_WEAK, elf_reader.STT_FUNC, _TEXT_INDEX),
+    ('environ', elf_reader.STB_GLOBAL, elf_reader.STT_OBJECT, _DATA_INDEX),
+    ('undefined', elf_reader.STB_GLOBAL, elf_reader.STT_FUNC,
+     elf_reader.SHN_UNDEF),
+    ('absolute', elf_reader.STB_GLOBAL, elf_reader.STT_NOTYPE, _SHN_ABS),
+]
+
+
+class ElfReaderTest(unittest.TestCase):
+  def _assert_symbols(self, data):
+    symbols = list(elf_reader.ElfReader(data).iter_dynamic_symbols())
+    self.assertEquals([
+        elf_reader.ElfSymbol('open', elf_reader.STB_GLOBAL,
+                             elf_reader.STT_FUNC, _TEXT_INDEX,
+                             _SHF_ALLOC | elf_reader.SHF_EXECINSTR),
+        elf_reader.ElfSymbol('weak_func', elf_reader.STB_WEAK,
+                             elf_reader.STT_FUNC, _TEXT_INDEX,
+                             _SHF_ALLOC | elf_reader.SHF_EXECINSTR),
+        elf_reader.ElfSymbol('environ', elf_reader.STB_GLOBAL,
+                             elf_reader.STT_OBJECT, _DATA_INDEX,
+                             _SHF_ALLOC | _SHF_WRITE),
+        elf_reader.ElfSymbol('undefined', elf_reader.STB_GLOBAL,
+                             elf_reader.STT_FUNC, elf_reader.SHN_UNDEF, 0),
+        elf_reader.ElfSymbol('absolute', elf_reader.STB_GLOBAL,
+                             elf_reader.STT_NOTYPE, _SHN_ABS, 0),
+    ], symbols)
+
+  def test_elf32_little_endian(self):
+    self._assert_symbols(_build_elf(False, '<', _SYMBOLS))
+
+  def test_elf32_big_endian(self):
+    self._assert_symbols(_build_elf(False, '>', _SYMBOLS))
+
+  def test_elf64_little_endian(self):
+    self._assert_symbols(_build_elf(True, '<', _SYMBOLS))
+
+  def test_elf64_big_endian(self):
+    self._assert_symbols(_build_elf(True, '>', _SYMBOLS))
+
+  def test_no_symbols(self):
+    self.assertEquals([], list(elf_reader.ElfReader(
+        _build_elf(True, '<', [])).iter_dynamic_symbols()))
+
+  def test_invalid(self):
+    with self.assertRaises(elf_reader.ElfFormatError):
+      elf_reader.ElfReader('#!/bin/sh\n')
+    with self.assertRaises(elf_reader.ElfFormatError):
+      elf_reader.ElfReader('\x7fELF\x03\x01\x01' + '\0' * 57)
+    # The section headers are cut off.
+    with self.assertRaises(elf_reader.ElfFormatError):
+      elf_reader.ElfReader(_build_elf(False, '<', _SYMBOLS)[:-1])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,91 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Keeps a result computed from each file on disk, keyed by its size and mtime.
+
+The results are recomputed only for the files which are new or updated since
+the last run.
+"""
+
+import cPickle
+import os
+
+from src.build.util import file_util
+
+
+class FileResultCache(object):
+  def __init__(self, path, version):
+    """Constructor.
+
+    Args:
+        path: The path of the file to keep the results in, or None not to
+            keep them on disk.
+        version: The version of the results. The results saved with another
+            version are discarded.
+    """
+    self._path = path
+    self._version = version
+    # Maps a file path to a pair of (size, mtime) and the result.
+    self._entries = {}
+    # The number of files the results are computed for, as opposed to read
+    # from the cache.
+    self.computed_count = 0
+    if path and os.path.exists(path):
+      try:
+        with open(path, 'rb') as f:
+          data = cPickle.load(f)
+      except (EOFError, cPickle.UnpicklingError):
+        data = {}
+      if data.get('version') == version:
+        self._entries = data['entries']
+
+  def get_all(self, paths, compute):
+    """Returns the results for |paths|, computing the stale ones.
+
+    Args:
+        paths: The paths of the files.
+        compute: A function which takes a list of the paths whose results
+            are not in the cache or stale, and returns the list of their
+            results in the same order.
+
+    Returns:
+        A list of the results of |paths|, in the same order.
+    """
+    stale_paths = []
+    stale_keys = []
+    for path in paths:
+      st = os.stat(path)
+      key = (st.st_size, st.st_mtime)
+      entry = self._entries.get(path)
+      if not entry or entry[0] != key:
+        stale_paths.append(path)
+        stale_keys.append(key)
+
+    if stale_paths:
+      for path, key, result in zip(stale_paths, stale_keys,
+                                   compute(stale_paths)):
+        self._entries[path] = (key, result)
+      self.computed_count += len(stale_paths)
+
+    return [self._entries[path][1] for path in paths]
+
+  def get(self, path, compute):
+    """Returns the result for |path|, calling compute(path) if stale."""
+    return self.get_all([path], lambda paths: map(compute, paths))[0]
+
+  def save(self):
+    """Saves the results, dropping the ones of the removed files.
+
+    The results of the files not looked up in this run are kept, so that
+    they are not recomputed in another run looking them up.
+    """
+    if not self._path:
+      return
+    entries = dict((path, entry) for path, entry in self._entries.iteritems()
+                   if os.path.exists(path))
+    file_util.makedirs_safely(os.path.dirname(self._path))
+    file_util.generate_file_atomically(
+        self._path, lambda f: cPickle.dump(
+            {'version': self._version, 'entries': entries}, f,
+            cPickle.HIGHEST_PROTOCOL))
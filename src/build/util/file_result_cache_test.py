@@ -0,0 +1,88 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import cPickle
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.build.util import file_result_cache
+
+
+class FileResultCacheTest(unittest.TestCase):
+  def setUp(self):
+    self._tmpdir = tempfile.mkdtemp(prefix='file_result_cache_test')
+    self._cache_path = os.path.join(self._tmpdir, 'out', 'cache.pickle')
+    self._computed_paths = []
+    for name in ['a', 'b', 'c']:
+      self._write(name, name, 100)
+
+  def tearDown(self):
+    shutil.rmtree(self._tmpdir)
+
+  def _path(self, name):
+    return os.path.join(self._tmpdir, name)
+
+  def _write(self, name, content, mtime):
+    with open(self._path(name), 'w') as f:
+      f.write(content)
+    os.utime(self._path(name), (mtime, mtime))
+
+  def _compute(self, path):
+    self._computed_paths.append(os.path.basename(path))
+    with open(path) as f:
+      return f.read().upper()
+
+  def _get_all(self, names, version=1):
+    """Looks up the results of |names| with the cache on disk.
+
+    Returns:
+        The results, and the names of the files the results are computed for.
+    """
+    cache = file_result_cache.FileResultCache(self._cache_path, version)
+    results = cache.get_all(map(self._path, names),
+                            lambda paths: map(self._compute, paths))
+    cache.save()
+    computed_paths = self._computed_paths
+    self._computed_paths = []
+    self.assertEquals(len(computed_paths), cache.computed_count)
+    return results, computed_paths
+
+  def test_get_all(self):
+    self.assertEquals((['A', 'B'], ['a', 'b']), self._get_all(['a', 'b']))
+    self.assertEquals((['A', 'B'], []), self._get_all(['a', 'b']))
+
+    # Only the updated and the new files are computed.
+    self._write('a', 'aa', 200)
+    self.assertEquals((['AA', 'B', 'C'], ['a', 'c']),
+                      self._get_all(['a', 'b', 'c']))
+
+    # The results of the files not looked up are kept.
+    self.assertEquals((['C'], []), self._get_all(['c']))
+    self.assertEquals((['AA', 'B'], []), self._get_all(['a', 'b']))
+
+    # The results saved with another version are discarded.
+    self.assertEquals((['AA'], ['a']), self._get_all(['a'], version=2))
+
+  def test_get(self):
+    cache = file_result_cache.FileResultCache(None, 1)
+    self.assertEquals('A', cache.get(self._path('a'), self._compute))
+    self.assertEquals('A', cache.get(self._path('a'), self._compute))
+    self.assertEquals(['a'], self._computed_paths)
+    # Nothing is written without the path of the cache.
+    cache.save()
+    self.assertFalse(os.path.exists(self._cache_path))
+
+  def test_save_drops_removed_files(self):
+    self._get_all(['a', 'b'])
+    os.remove(self._path('a'))
+    self._get_all(['b'])
+    with open(self._cache_path, 'rb') as f:
+      entries = cPickle.load(f)['entries']
+    self.assertEquals([self._path('b')], entries.keys())
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,295 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Watches files and directories for changes.
+
+Two implementations share the same interface:
+
+ - InotifyWatcher uses Linux inotify through ctypes. It watches the parent
+   directory of each file, so that files replaced by rename, as editors
+   often do, are noticed too.
+ - PollingWatcher compares the stat of each path with the one taken in the
+   previous call. It is used where inotify is not available.
+
+A file is reported as changed when its content, metadata, or existence may
+have changed. A directory is reported as changed when an entry is created,
+removed or renamed in it, which is when the mtime of the directory changes.
+All paths are reported as absolute paths.
+"""
+
+import collections
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+
+# inotify flags from <sys/inotify.h>.
+_IN_MODIFY = 0x2
+_IN_ATTRIB = 0x4
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_DELETE_SELF = 0x400
+_IN_MOVE_SELF = 0x800
+_IN_Q_OVERFLOW = 0x4000
+_IN_IGNORED = 0x8000
+_IN_ONLYDIR = 0x1000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0x80000
+
+_ENTRY_EVENTS = _IN_CREATE | _IN_DELETE | _IN_MOVED_FROM | _IN_MOVED_TO
+_WATCH_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _ENTRY_EVENTS |
+               _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_ONLYDIR)
+
+# struct inotify_event, followed by |len| bytes of the name.
+_INOTIFY_EVENT = struct.Struct('iIII')
+
+_READ_SIZE = 64 * 1024
+
+
+def _get_existing_ancestor(path):
+  while not os.path.isdir(path):
+    parent = os.path.dirname(path)
+    if parent == path:
+      break
+    path = parent
+  return path
+
+
+class PollingWatcher(object):
+  """Finds changes by comparing the stat of each path with the previous one."""
+
+  def __init__(self):
+    self._files = {}
+    self._directories = {}
+
+  @staticmethod
+  def _stat_file(path):
+    try:
+      st = os.stat(path)
+    except OSError:
+      return None
+    return (st.st_mtime, st.st_size, st.st_ino)
+
+  @staticmethod
+  def _stat_directory(path):
+    try:
+      return os.stat(path).st_mtime
+    except OSError:
+      return None
+
+  def set_paths(self, files, directories):
+    """Sets the files and directories to watch.
+
+    Changes of paths which were not watched before this call are not reported.
+    """
+    self._files = self._update_snapshot(self._files, files, self._stat_file)
+    self._directories = self._update_snapshot(
+        self._directories, directories, self._stat_directory)
+
+  @staticmethod
+  def _update_snapshot(snapshot, paths, stat_function):
+    new_snapshot = {}
+    for path in paths:
+      path = os.path.abspath(path)
+      if path in snapshot:
+        new_snapshot[path] = snapshot[path]
+      else:
+        new_snapshot[path] = stat_function(path)
+    return new_snapshot
+
+  def get_changes(self):
+    """Returns the set of paths changed since the previous call."""
+    changes = set()
+    for snapshot, stat_function in ((self._files, self._stat_file),
+                                    (self._directories, self._stat_directory)):
+      for path, old_stat in snapshot.iteritems():
+        new_stat = stat_function(path)
+        if new_stat != old_stat:
+          snapshot[path] = new_stat
+          changes.add(path)
+    return changes
+
+  def close(self):
+    pass
+
+
+class InotifyWatcher(object):
+  """Finds changes with inotify.
+
+  Events are queued in the kernel until get_changes() is called, so no
+  thread is needed to watch. Raises OSError if inotify is not available.
+  """
+
+  def __init__(self):
+    libc_name = ctypes.util.find_library('c')
+    if not libc_name:
+      raise OSError(errno.ENOSYS, 'libc is not found')
+    self._libc = ctypes.CDLL(libc_name, use_errno=True)
+    if not hasattr(self._libc, 'inotify_init1'):
+      raise OSError(errno.ENOSYS, 'inotify is not supported')
+    self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+    if self._fd < 0:
+      self._raise_errno('inotify_init1')
+    self._buffer = ''
+    self._overflowed = False
+
+    # Maps a watch descriptor to the watched directory, and vice versa.
+    self._wd_to_directory = {}
+    self._directory_to_wd = {}
+    # Maps a watched directory to the watched files in it, and to the
+    # directories whose listing is watched.
+    self._files_in_directory = collections.defaultdict(set)
+    self._listed_directories = set()
+    # Maps an existing ancestor directory to the watched paths under it which
+    # do not exist yet.
+    self._missing_paths = collections.defaultdict(set)
+
+  @staticmethod
+  def _raise_errno(name):
+    error = ctypes.get_errno()
+    raise OSError(error, '%s: %s' % (name, os.strerror(error)))
+
+  def _add_watch(self, directory):
+    if directory in self._directory_to_wd:
+      return True
+    wd = self._libc.inotify_add_watch(self._fd, directory, _WATCH_MASK)
+    if wd < 0:
+      if ctypes.get_errno() in (errno.ENOENT, errno.ENOTDIR):
+        # Removed after the ancestor was looked up.
+        return False
+      self._raise_errno('inotify_add_watch')
+    self._wd_to_directory[wd] = directory
+    self._directory_to_wd[directory] = wd
+    return True
+
+  def _remove_watch(self, directory):
+    wd = self._directory_to_wd.pop(directory)
+    del self._wd_to_directory[wd]
+    # The directory may have already been removed, which removes the watch.
+    self._libc.inotify_rm_watch(self._fd, wd)
+
+  def _watch_directory_of(self, path, watched_path):
+    """Watches the directory containing |path|, or its nearest ancestor."""
+    directory = _get_existing_ancestor(path)
+    if directory != path or not os.path.isdir(directory):
+      self._missing_paths[directory].add(watched_path)
+    self._add_watch(directory)
+    return directory
+
+  def set_paths(self, files, directories):
+    """Sets the files and directories to watch.
+
+    Raises OSError with ENOSPC when the number of watches hits the limit of
+    the system.
+    """
+    self._files_in_directory.clear()
+    self._listed_directories.clear()
+    self._missing_paths.clear()
+    needed = set()
+    for path in files:
+      path = os.path.abspath(path)
+      directory = os.path.dirname(path)
+      if os.path.isdir(directory):
+        self._files_in_directory[directory].add(path)
+        needed.add(directory)
+        self._add_watch(directory)
+      else:
+        needed.add(self._watch_directory_of(directory, path))
+    for path in directories:
+      path = os.path.abspath(path)
+      if os.path.isdir(path):
+        self._listed_directories.add(path)
+        needed.add(path)
+        self._add_watch(path)
+      else:
+        needed.add(self._watch_directory_of(path, path))
+    for directory in set(self._directory_to_wd) - needed:
+      self._remove_watch(directory)
+
+  def _read_events(self):
+    while True:
+      try:
+        data = os.read(self._fd, _READ_SIZE)
+      except OSError as e:
+        if e.errno in (errno.EAGAIN, errno.EINTR):
+          return
+        raise
+      if not data:
+        return
+      self._buffer += data
+
+  def _parse_events(self):
+    offset = 0
+    while offset + _INOTIFY_EVENT.size <= len(self._buffer):
+      wd, mask, _, length = _INOTIFY_EVENT.unpack_from(self._buffer, offset)
+      end = offset + _INOTIFY_EVENT.size + length
+      if end > len(self._buffer):
+        break
+      name = self._buffer[offset + _INOTIFY_EVENT.size:end].rstrip('\0')
+      offset = end
+      yield wd, mask, name
+    self._buffer = self._buffer[offset:]
+
+  def _handle_event(self, wd, mask, name, changes):
+    directory = self._wd_to_directory.get(wd)
+    if directory is None:
+      return
+    if mask & (_IN_DELETE_SELF | _IN_MOVE_SELF | _IN_IGNORED):
+      # The directory itself is gone. Everything watched in it has changed.
+      changes.update(self._files_in_directory.get(directory, ()))
+      changes.add(directory)
+      changes.update(self._missing_paths.get(directory, ()))
+      if mask & _IN_IGNORED:
+        del self._wd_to_directory[wd]
+        del self._directory_to_wd[directory]
+      return
+    path = os.path.join(directory, name)
+    if path in self._files_in_directory.get(directory, ()):
+      changes.add(path)
+    if mask & _ENTRY_EVENTS:
+      if directory in self._listed_directories:
+        changes.add(directory)
+      # A watched path which did not exist may have been created.
+      changes.update(self._missing_paths.get(directory, ()))
+
+  def get_changes(self):
+    """Returns the set of paths changed since the previous call.
+
+    Returns None if the kernel dropped events, in which case any watched path
+    may have changed.
+    """
+    readable, _, _ = select.select([self._fd], [], [], 0)
+    if readable:
+      self._read_events()
+    changes = set()
+    for wd, mask, name in self._parse_events():
+      if mask & _IN_Q_OVERFLOW:
+        self._overflowed = True
+        continue
+      self._handle_event(wd, mask, name, changes)
+    if self._overflowed:
+      self._overflowed = False
+      return None
+    return changes
+
+  def close(self):
+    if self._fd >= 0:
+      os.close(self._fd)
+      self._fd = -1
+
+
+def create_watcher():
+  """Returns an InotifyWatcher, or a PollingWatcher if it is not available."""
+  try:
+    return InotifyWatcher()
+  except OSError:
+    logging.info('inotify is not available. Falling back to polling.',
+                 exc_info=True)
+    return PollingWatcher()
@@ -0,0 +1,104 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.build.util import file_util
+from src.build.util import file_watcher
+
+
+def _inotify_is_available():
+  try:
+    file_watcher.InotifyWatcher().close()
+  except OSError:
+    return False
+  return True
+
+
+class _FileWatcherTestMixin(object):
+  def setUp(self):
+    self._tmpdir = tempfile.mkdtemp(prefix='file_watcher_test')
+    self._watcher = self.create_watcher()
+
+  def tearDown(self):
+    self._watcher.close()
+    shutil.rmtree(self._tmpdir)
+
+  def _path(self, *components):
+    return os.path.join(self._tmpdir, *components)
+
+  def _write(self, path, content, mtime):
+    file_util.makedirs_safely(os.path.dirname(path))
+    with open(path, 'w') as f:
+      f.write(content)
+    # Make the change visible to PollingWatcher regardless of the mtime
+    # resolution of the file system.
+    os.utime(path, (mtime, mtime))
+
+  def test_file(self):
+    self._write(self._path('a', 'x'), 'x', 100)
+    self._write(self._path('a', 'y'), 'y', 100)
+    self._watcher.set_paths([self._path('a', 'x')], [])
+    self.assertEquals(set(), self._watcher.get_changes())
+
+    self._write(self._path('a', 'y'), 'y2', 200)
+    self.assertEquals(set(), self._watcher.get_changes())
+    self._write(self._path('a', 'x'), 'x2', 200)
+    self.assertEquals({self._path('a', 'x')}, self._watcher.get_changes())
+    self.assertEquals(set(), self._watcher.get_changes())
+
+    os.remove(self._path('a', 'x'))
+    self.assertEquals({self._path('a', 'x')}, self._watcher.get_changes())
+
+  def test_file_replaced_by_rename(self):
+    self._write(self._path('a', 'x'), 'x', 100)
+    self._watcher.set_paths([self._path('a', 'x')], [])
+    self._write(self._path('a', 'x.tmp'), 'x2', 200)
+    os.rename(self._path('a', 'x.tmp'), self._path('a', 'x'))
+    self.assertEquals({self._path('a', 'x')}, self._watcher.get_changes())
+
+  def test_missing_file(self):
+    self._watcher.set_paths([self._path('a', 'b', 'x')], [])
+    self._write(self._path('a', 'b', 'x'), 'x', 100)
+    self.assertIn(self._path('a', 'b', 'x'), self._watcher.get_changes())
+
+  def test_directory(self):
+    self._write(self._path('a', 'x'), 'x', 100)
+    os.utime(self._path('a'), (100, 100))
+    self._watcher.set_paths([], [self._path('a')])
+
+    # Updating a file in the directory does not change the listing.
+    self._write(self._path('a', 'x'), 'x2', 200)
+    self.assertEquals(set(), self._watcher.get_changes())
+
+    self._write(self._path('a', 'y'), 'y', 200)
+    os.utime(self._path('a'), (200, 200))
+    self.assertEquals({self._path('a')}, self._watcher.get_changes())
+
+  def test_set_paths(self):
+    self._write(self._path('a', 'x'), 'x', 100)
+    self._write(self._path('b', 'y'), 'y', 100)
+    self._watcher.set_paths([self._path('a', 'x')], [])
+    self._watcher.set_paths([self._path('b', 'y')], [])
+    self._write(self._path('a', 'x'), 'x2', 200)
+    self._write(self._path('b', 'y'), 'y2', 200)
+    self.assertEquals({self._path('b', 'y')}, self._watcher.get_changes())
+
+
+class PollingWatcherTest(_FileWatcherTestMixin, unittest.TestCase):
+  def create_watcher(self):
+    return file_watcher.PollingWatcher()
+
+
+@unittest.skipUnless(_inotify_is_available(), 'Requires inotify.')
+class InotifyWatcherTest(_FileWatcherTestMixin, unittest.TestCase):
+  def create_watcher(self):
+    return file_watcher.InotifyWatcher()
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -21,12 +21,15 @@ report with the top failing tests that have not been marked as SKIP.
 import collections
 import os
 import re
-import subprocess
 import sys
 
+from src.build import build_common
+from src.build import run_integration_tests
 from src.build.build_options import OPTIONS
+from src.build.util import file_result_cache
 from src.build.util.test import scoreboard_constants
 from src.build.util.test import suite_results
+from src.build.util.test import test_filter
 
 
 _BOTLOGS_DIR = 'botlogs'
@@ -39,59 +42,89 @@ _INCOMPLETE_RE = re.compile(
     _SECTION_PATTERN % (
         suite_results.VERBOSE_STATUS_TEXT[
             scoreboard_constants.INCOMPLETE]))
-_EXPECTATIONS_RE = re.compile(r'\[(RUN|SKIP)\s+([A-Z_,]+)\s*\] (.*)')
 
+# Keeps the parsed counters of each log file, so that only new or updated
+# logs are parsed.
+_INDEX_FILE = os.path.join(build_common.OUT_DIR,
+                           'find_flaky_tests_index.pickle')
+_INDEX_VERSION = 1
 
-def _get_expectations(extra_flags=None):
-  params = ['./run_integration_tests', '--list', '--buildbot',
-            '--noninja']
-  if extra_flags:
-    params.extend(extra_flags)
+
+def _get_expectations(include_large=False):
+  """Returns the expectations as run_integration_tests --list --buildbot does.
+
+  Returns:
+      A dict from a qualified test name to a pair of 'RUN' or 'SKIP', and the
+      list of the flag names.
+  """
+  test_run_filter = test_filter.TestRunFilter(include_large=include_large)
   expectations = {}
-  for line in subprocess.check_output(params).split('\n'):
-    match = _EXPECTATIONS_RE.match(line)
-    if match:
-      # Test name -> (PASS/SKIP, flag list)
-      expectations[match.group(3)] = [match.group(1),
-                                      match.group(2).split(',')]
+  for runner in run_integration_tests.get_all_suite_runners(
+      on_bot=True, use_gpu=True, remote_host_type=None):
+    # run_integration_tests --buildbot does not list CTS in weird builds.
+    if OPTIONS.weird() and runner.name.startswith('cts.'):
+      continue
+    for test_name, flag in runner.expectation_map.iteritems():
+      run = 'RUN' if test_run_filter.should_run(flag) else 'SKIP'
+      expectations['%s:%s' % (runner.name, test_name)] = [
+          run, str(flag).split(',')]
   return expectations
 
 
-def _parsefile(filename, header_re, collection):
+def _parsefile(filename):
+  """Parses the unexpected failures and incompletes of a log in one pass.
+
+  Only the first section of each kind is counted. A section starts with its
+  header, and ends with a blank line.
+
+  Returns:
+      A pair of dicts from a test name to the number of times it is listed,
+      for the unexpected failures and for the incompletes.
+  """
+  failures = collections.defaultdict(int)
+  incompletes = collections.defaultdict(int)
+  pending_sections = [(_UNEXPECTED_FAILURES_RE, failures),
+                      (_INCOMPLETE_RE, incompletes)]
+  collection = None
   with open(filename, 'r') as log:
     for line in log:
-      if header_re.match(line):
-        break
-    # We found the header. All following lines until the next blank line are
-    # reported errors.
-    for line in log:
-      line = line.strip()
-      if not line:
-        break
-      collection[line] += 1
+      if collection is not None:
+        line = line.strip()
+        if line:
+          collection[line] += 1
+          continue
+        collection = None
+      for section in pending_sections:
+        if section[0].match(line):
+          collection = section[1]
+          pending_sections.remove(section)
+          break
+  return failures, incompletes
 
 
-def _parse(logfiles):
+def _parse(logfiles, index):
   failures = collections.defaultdict(int)
   incompletes = collections.defaultdict(int)
   for logfile in logfiles:
-    _parsefile(logfile, _UNEXPECTED_FAILURES_RE, failures)
-    _parsefile(logfile, _INCOMPLETE_RE, incompletes)
+    file_failures, file_incompletes = index.get(logfile, _parsefile)
+    for collection, counts in ((failures, file_failures),
+                               (incompletes, file_incompletes)):
+      for name, count in counts.iteritems():
+        collection[name] += count
   return failures, incompletes
 
 
-def main():
-  OPTIONS.parse_configure_file()
-  target = OPTIONS.target()
+def _print_flaky_tests(target, index):
+  """Prints the failing tests of the bots for |target|."""
   regular_expectations = _get_expectations()
-  large_expectations = _get_expectations(['--include-large'])
+  large_expectations = _get_expectations(include_large=True)
   for botname in os.listdir(_BOTLOGS_DIR):
     if not botname.replace('-', '_').startswith(target):
       continue
     botdir = os.path.join(_BOTLOGS_DIR, botname)
     lognames = [os.path.join(botdir, filename) for filename in
                 os.listdir(botdir)]
-    failures, incompletes = _parse(lognames)
+    failures, incompletes = _parse(lognames, index)
     top_flake = sorted([(freq, name) for name, freq in failures.iteritems()],
                        reverse=True)
     print '%s:' % botname
@@ -108,6 +141,13 @@ def main():
       print '%5.2f%% fail rate [%-4s %-19s] %s' % (failrate, run,
                                                    ','.join(flags), name)
     print
+
+
+def main():
+  OPTIONS.parse_configure_file()
+  index = file_result_cache.FileResultCache(_INDEX_FILE, _INDEX_VERSION)
+  _print_flaky_tests(OPTIONS.target(), index)
+  index.save()
   return 0
 
 
@@ -0,0 +1,146 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import StringIO
+import sys
+import tempfile
+import unittest
+
+import mock
+
+from src.build.util import file_result_cache
+from src.build.util import find_flaky_tests
+from src.build.util.test import scoreboard_constants
+from src.build.util.test import suite_results
+
+
+def _header(status, count):
+  return '######## %s (%d) ########\n' % (
+      suite_results.VERBOSE_STATUS_TEXT[status], count)
+
+
+_FAILURES_HEADER = _header(scoreboard_constants.UNEXPECTED_FAIL, 2)
+_INCOMPLETE_HEADER = _header(scoreboard_constants.INCOMPLETE, 1)
+
+_LOGS = {
+    'log1': ('Running tests\n' +
+             _FAILURES_HEADER + 'suite:a\nsuite:b\n\n' +
+             _INCOMPLETE_HEADER + 'suite:c\n\n' +
+             'suite:d\n'),
+    # The incomplete section may come first.
+    'log2': (_INCOMPLETE_HEADER + 'suite:c\n\n' +
+             _FAILURES_HEADER + '  suite:a  \n'),
+    # Only the first section of each kind is counted.
+    'log3': (_FAILURES_HEADER + 'suite:b\n\n' +
+             _FAILURES_HEADER + 'suite:a\n\n'),
+    'log4': 'No results\n',
+}
+
+
+class FindFlakyTestsTest(unittest.TestCase):
+  def setUp(self):
+    self._tmpdir = tempfile.mkdtemp(prefix='find_flaky_tests_test')
+    self._logdir = os.path.join(self._tmpdir, 'logs')
+    os.mkdir(self._logdir)
+    for name, content in _LOGS.iteritems():
+      self._write_log(name, content, 100)
+    self._index_path = os.path.join(self._tmpdir, 'out', 'index.pickle')
+
+  def tearDown(self):
+    shutil.rmtree(self._tmpdir)
+
+  def _write_log(self, name, content, mtime):
+    path = os.path.join(self._logdir, name)
+    with open(path, 'w') as f:
+      f.write(content)
+    os.utime(path, (mtime, mtime))
+
+  def _create_index(self):
+    return file_result_cache.FileResultCache(
+        self._index_path, find_flaky_tests._INDEX_VERSION)
+
+  def _parse(self):
+    """Parses all the logs with the index on disk.
+
+    Returns:
+        The failure counts, the incomplete counts, and the number of files
+        parsed.
+    """
+    index = self._create_index()
+    lognames = [os.path.join(self._logdir, name)
+                for name in sorted(os.listdir(self._logdir))]
+    failures, incompletes = find_flaky_tests._parse(lognames, index)
+    index.save()
+    return dict(failures), dict(incompletes), index.computed_count
+
+  def test_parse(self):
+    failures, incompletes, parsed_count = self._parse()
+    self.assertEquals({'suite:a': 2, 'suite:b': 2}, failures)
+    self.assertEquals({'suite:c': 2}, incompletes)
+    self.assertEquals(len(_LOGS), parsed_count)
+
+  def test_index(self):
+    self._parse()
+    failures, incompletes, parsed_count = self._parse()
+    self.assertEquals({'suite:a': 2, 'suite:b': 2}, failures)
+    self.assertEquals({'suite:c': 2}, incompletes)
+    self.assertEquals(0, parsed_count)
+
+    # Only the updated and the new logs are parsed.
+    self._write_log('log4', _FAILURES_HEADER + 'suite:a\n', 200)
+    self._write_log('log5', _INCOMPLETE_HEADER + 'suite:d\n', 200)
+    failures, incompletes, parsed_count = self._parse()
+    self.assertEquals({'suite:a': 3, 'suite:b': 2}, failures)
+    self.assertEquals({'suite:c': 2, 'suite:d': 1}, incompletes)
+    self.assertEquals(2, parsed_count)
+
+    # Removed logs are dropped from the index.
+    os.remove(os.path.join(self._logdir, 'log1'))
+    failures, incompletes, parsed_count = self._parse()
+    self.assertEquals({'suite:a': 2, 'suite:b': 1}, failures)
+    self.assertEquals({'suite:c': 1, 'suite:d': 1}, incompletes)
+    self.assertEquals(0, parsed_count)
+
+  def _print_flaky_tests(self, target, index):
+    """Prints the failing tests of the bots for |target| into a string."""
+    expectations = dict.fromkeys(['suite:a', 'suite:b'], ['RUN', ['PASS']])
+    output = StringIO.StringIO()
+    original_stdout = sys.stdout
+    sys.stdout = output
+    try:
+      with mock.patch.object(find_flaky_tests, '_BOTLOGS_DIR',
+                             self._botlogs_dir), \
+          mock.patch.object(find_flaky_tests, '_get_expectations',
+                            return_value=expectations):
+        find_flaky_tests._print_flaky_tests(target, index)
+    finally:
+      sys.stdout = original_stdout
+    return output.getvalue()
+
+  def test_bots_of_other_targets(self):
+    self._botlogs_dir = os.path.join(self._tmpdir, 'botlogs')
+    for botname in ['nacl-x86_64-bionic', 'bare-metal-i686']:
+      shutil.copytree(self._logdir, os.path.join(self._botlogs_dir, botname))
+
+    for target, botname in [('nacl_x86_64', 'nacl-x86_64-bionic'),
+                            ('bare_metal_i686', 'bare-metal-i686')]:
+      index = self._create_index()
+      output = self._print_flaky_tests(target, index)
+      index.save()
+      self.assertEquals('%s:' % botname, output.splitlines()[0])
+      self.assertEquals(len(_LOGS), index.computed_count)
+
+    # The index keeps the logs of the bots for the other target.
+    for target in ['nacl_x86_64', 'bare_metal_i686']:
+      index = self._create_index()
+      output = self._print_flaky_tests(target, index)
+      index.save()
+      self.assertIn('50.00% fail rate', output)
+      self.assertEquals(0, index.computed_count)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,237 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Samples memory and CPU usage of a process tree in background.
+
+output_handler reads /proc once, when the app start message is found. This
+module instead records a time series of the resident size, private dirty
+pages, PSS and CPU time summed over a process (e.g. Chrome) and all its
+descendants (e.g. the NaCl helpers), during the whole lifetime of the process.
+
+To keep the overhead low, the /proc files of each process are opened only once
+and re-read from the beginning on each sample.
+
+Linux only.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+
+# Columns of each sample.
+COLUMNS = ('time_s', 'res_mb', 'pdirt_mb', 'pss_mb', 'cpu_s')
+_TIME, _RES, _PDIRT, _PSS, _CPU = range(len(COLUMNS))
+
+_PAGE_SIZE_MB = os.sysconf('SC_PAGE_SIZE') / 1024.0 / 1024.0
+_CLOCK_TICKS_PER_SEC = float(os.sysconf('SC_CLK_TCK'))
+
+_PSS_RE = re.compile(r'^Pss:\s*(\d+) kB', re.MULTILINE)
+_PRIVATE_DIRTY_RE = re.compile(r'^Private_Dirty:\s*(\d+) kB', re.MULTILINE)
+
+
+def _read_fd(fd):
+  os.lseek(fd, 0, os.SEEK_SET)
+  chunks = []
+  while True:
+    chunk = os.read(fd, 64 * 1024)
+    if not chunk:
+      return ''.join(chunks)
+    chunks.append(chunk)
+
+
+def _parse_stat(content):
+  """Returns the fields of /proc/<pid>/stat following the command name."""
+  # The command name may contain spaces and parentheses, so split after it.
+  # The first returned field is the state (the 3rd field in man proc).
+  return content[content.rindex(')') + 2:].split()
+
+
+class _ProcessFiles(object):
+  """Keeps the /proc files of a process open."""
+
+  def __init__(self, pid):
+    self._stat_fd = os.open('/proc/%d/stat' % pid, os.O_RDONLY)
+    # smaps_rollup (Linux 4.14+) has the sums pre-computed by the kernel.
+    try:
+      self._smaps_fd = os.open('/proc/%d/smaps_rollup' % pid, os.O_RDONLY)
+    except OSError:
+      self._smaps_fd = os.open('/proc/%d/smaps' % pid, os.O_RDONLY)
+
+  def read(self):
+    """Returns (res_mb, pdirt_mb, pss_mb, cpu_s) of the process."""
+    stat = _parse_stat(_read_fd(self._stat_fd))
+    smaps = _read_fd(self._smaps_fd)
+    # utime, stime, cutime, cstime and rss are the 14th-17th and 24th fields
+    # in man proc. cutime and cstime are included so that the CPU time of
+    # exited (and waited) children is not lost.
+    cpu_s = sum(map(int, stat[11:15])) / _CLOCK_TICKS_PER_SEC
+    res_mb = int(stat[21]) * _PAGE_SIZE_MB
+    pdirt_mb = sum(map(int, _PRIVATE_DIRTY_RE.findall(smaps))) / 1024.0
+    pss_mb = sum(map(int, _PSS_RE.findall(smaps))) / 1024.0
+    return res_mb, pdirt_mb, pss_mb, cpu_s
+
+  def close(self):
+    os.close(self._stat_fd)
+    os.close(self._smaps_fd)
+
+
+def _get_parent_pid(pid):
+  with open('/proc/%d/stat' % pid) as f:
+    return int(_parse_stat(f.read())[1])
+
+
+class ProcessSampler(threading.Thread):
+  """Samples the process tree rooted at |root_pid| every |interval| secs.
+
+  Usage:
+    sampler = ProcessSampler(chrome.pid, 0.1)
+    sampler.start()
+    ...
+    sampler.stop()
+    samples = sampler.get_samples()
+
+  The sampling also stops when the root process exits.
+  """
+
+  def __init__(self, root_pid, interval):
+    super(ProcessSampler, self).__init__(name='ProcessSampler-%d' % root_pid)
+    self.daemon = True
+    self._root_pid = root_pid
+    self._interval = interval
+    self._stop_event = threading.Event()
+    # Map from pid to _ProcessFiles of the processes in the tree.
+    self._process_files = {}
+    # Cache of the parent pid of every pid in /proc at the last update.
+    self._parent_pid_map = {}
+    self._rows = []
+
+  def run(self):
+    start_time = time.time()
+    try:
+      while not self._stop_event.is_set():
+        row = self._sample()
+        if row is None:
+          # The root process exited.
+          break
+        self._rows.append((time.time() - start_time,) + row)
+        self._stop_event.wait(self._interval)
+    finally:
+      for process_files in self._process_files.itervalues():
+        process_files.close()
+      self._process_files.clear()
+
+  def stop(self):
+    self._stop_event.set()
+    self.join()
+
+  def get_samples(self):
+    assert not self.is_alive(), 'get_samples() must be called after stop().'
+    return ProcessSamples(self._interval, self._rows)
+
+  def _update_process_tree(self):
+    tree_pids = set(self._process_files)
+    tree_pids.add(self._root_pid)
+    new_pids = []
+    parent_pid_map = {}
+    for name in os.listdir('/proc'):
+      if not name.isdigit():
+        continue
+      pid = int(name)
+      parent_pid = self._parent_pid_map.get(pid)
+      if parent_pid is None:
+        try:
+          parent_pid = _get_parent_pid(pid)
+        except (IOError, OSError):
+          # The process has already exited.
+          continue
+      parent_pid_map[pid] = parent_pid
+      if pid not in tree_pids:
+        new_pids.append(pid)
+    # Forget the processes which have exited, so that a process reusing the
+    # pid is not taken as a child of the exited one's parent.
+    self._parent_pid_map = parent_pid_map
+
+    # A new process may be a child of another new process, so repeat until
+    # no more process is added.
+    added = True
+    while added:
+      added = False
+      for pid in new_pids:
+        if pid not in tree_pids and parent_pid_map[pid] in tree_pids:
+          tree_pids.add(pid)
+          added = True
+    for pid in tree_pids - set(self._process_files):
+      try:
+        self._process_files[pid] = _ProcessFiles(pid)
+      except OSError:
+        pass
+
+  def _sample(self):
+    """Returns the sum of (res_mb, pdirt_mb, pss_mb, cpu_s) of the tree."""
+    self._update_process_tree()
+    if self._root_pid not in self._process_files:
+      return None
+    total = [0.0] * (len(COLUMNS) - 1)
+    for pid, process_files in self._process_files.items():
+      try:
+        values = process_files.read()
+      except (OSError, ValueError, IndexError):
+        # The process has exited.
+        process_files.close()
+        del self._process_files[pid]
+        if pid == self._root_pid:
+          return None
+        continue
+      for i, value in enumerate(values):
+        total[i] += value
+    return tuple(total)
+
+
+class ProcessSamples(object):
+  """Time series recorded by ProcessSampler."""
+
+  def __init__(self, interval, rows):
+    self.interval = interval
+    # A list of tuples, whose elements correspond to COLUMNS.
+    self.rows = rows
+
+  def _column(self, index):
+    return [row[index] for row in self.rows]
+
+  def get_peak(self, column):
+    """Returns the maximum value of |column|, or NaN if there is no sample."""
+    values = self._column(COLUMNS.index(column))
+    return max(values) if values else float('NaN')
+
+  def get_auc(self, column):
+    """Returns the area under the curve of |column| over time.
+
+    It is computed by the trapezoidal rule, e.g. in MB*s for 'res_mb'.
+    """
+    index = COLUMNS.index(column)
+    return sum((b[_TIME] - a[_TIME]) * (a[index] + b[index]) / 2.0
+               for a, b in zip(self.rows, self.rows[1:]))
+
+  def get_cpu_time(self):
+    """Returns the CPU time consumed by the tree until the last sample."""
+    if not self.rows:
+      return float('NaN')
+    return self.rows[-1][_CPU]
+
+  def to_json(self):
+    """Returns a compact JSON representation of the samples."""
+    return json.dumps({
+        'interval': self.interval,
+        'columns': COLUMNS,
+        'samples': [[round(value, 3) for value in row] for row in self.rows],
+    }, separators=(',', ':'))
+
+
+def write_samples_list(path, samples_list):
+  """Writes the samples of each run in |samples_list| to |path| as JSON."""
+  with open(path, 'w') as f:
+    f.write('[%s]\n' % ',\n'.join(
+        samples.to_json() for samples in samples_list))
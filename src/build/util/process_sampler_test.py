@@ -0,0 +1,104 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import json
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+import mock
+
+from src.build.util import process_sampler
+
+
+class ProcessSamplesTest(unittest.TestCase):
+  def test_metrics(self):
+    samples = process_sampler.ProcessSamples(1, [
+        # time_s, res_mb, pdirt_mb, pss_mb, cpu_s
+        (0, 10, 1, 5, 0.1),
+        (1, 30, 2, 15, 0.5),
+        (3, 20, 3, 10, 0.7),
+    ])
+    self.assertEquals(30, samples.get_peak('res_mb'))
+    self.assertEquals(3, samples.get_peak('pdirt_mb'))
+    self.assertEquals(15, samples.get_peak('pss_mb'))
+    # (10 + 30) / 2 * 1 + (30 + 20) / 2 * 2
+    self.assertEquals(70, samples.get_auc('res_mb'))
+    self.assertEquals(0.7, samples.get_cpu_time())
+
+    self.assertEquals({
+        'interval': 1,
+        'columns': list(process_sampler.COLUMNS),
+        'samples': [[0, 10, 1, 5, 0.1], [1, 30, 2, 15, 0.5],
+                    [3, 20, 3, 10, 0.7]],
+    }, json.loads(samples.to_json()))
+
+  def test_empty(self):
+    samples = process_sampler.ProcessSamples(1, [])
+    self.assertNotEquals(samples.get_peak('res_mb'),
+                         samples.get_peak('res_mb'))  # NaN
+    self.assertEquals(0, samples.get_auc('res_mb'))
+
+
+@unittest.skipUnless(os.path.exists('/proc/self/stat'), 'Requires /proc.')
+class ProcessSamplerTest(unittest.TestCase):
+  def test_sample_process_tree(self):
+    # The root process forks a child, which uses memory.
+    root = subprocess.Popen(
+        ['sh', '-c', '%s -c "x = \'a\' * (64 << 20); '
+         'import time; time.sleep(0.5)"; sleep 0.2' % sys.executable])
+    sampler = process_sampler.ProcessSampler(root.pid, 0.02)
+    sampler.start()
+    root.wait()
+    # The sampling stops by itself, when the root process exits.
+    sampler.join(5)
+    self.assertFalse(sampler.is_alive())
+    samples = sampler.get_samples()
+
+    self.assertGreater(len(samples.rows), 5)
+    times = [row[0] for row in samples.rows]
+    self.assertEquals(sorted(times), times)
+    # The memory of the child is included.
+    self.assertGreater(samples.get_peak('res_mb'), 64)
+    self.assertGreater(samples.get_peak('pdirt_mb'), 64)
+    self.assertGreater(samples.get_peak('pss_mb'), 64)
+    self.assertGreater(samples.get_auc('res_mb'), 0)
+
+  def test_reused_pid(self):
+    parent_pid_map = {100: 1, 200: 100}
+    sampler = process_sampler.ProcessSampler(100, 1)
+    with mock.patch('os.listdir',
+                    side_effect=lambda path: map(str, parent_pid_map)), \
+        mock.patch.object(process_sampler, '_get_parent_pid',
+                          side_effect=parent_pid_map.__getitem__), \
+        mock.patch.object(process_sampler, '_ProcessFiles'):
+      sampler._update_process_tree()
+      self.assertEquals([100, 200], sorted(sampler._process_files))
+
+      # The child exits.
+      del parent_pid_map[200]
+      del sampler._process_files[200]
+      sampler._update_process_tree()
+      self.assertEquals([100], sorted(sampler._process_files))
+
+      # An unrelated process reuses the pid of the child.
+      parent_pid_map[200] = 1
+      sampler._update_process_tree()
+      self.assertEquals([100], sorted(sampler._process_files))
+      self.assertEquals(parent_pid_map, sampler._parent_pid_map)
+
+  def test_stop(self):
+    sampler = process_sampler.ProcessSampler(os.getpid(), 0.01)
+    sampler.start()
+    time.sleep(0.1)
+    sampler.stop()
+    samples = sampler.get_samples()
+    self.assertTrue(samples.rows)
+    self.assertGreater(samples.get_peak('res_mb'), 0)
+
+
+if __name__ == '__main__':
+  unittest.main()
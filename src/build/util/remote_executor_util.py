@@ -21,6 +21,7 @@ from src.build import build_common
 from src.build import toolchain
 from src.build.build_options import OPTIONS
 from src.build.util import concurrent_subprocess
+from src.build.util import delta_sync
 from src.build.util import file_util
 from src.build.util import gdb_util
 from src.build.util import jdb_util
@@ -263,6 +264,11 @@ class RemoteExecutor(object):
       if a file in the host machine is deleted, the corresponding file in the
       remote machine is also deleted after the rsync.
 
+    - Once a full rsync is done, a manifest of the sent files is kept locally
+      per remote directory, and the following calls send only the changed
+      files (see delta_sync.py). rsync runs again only when the manifest turns
+      out not to match the remote directory.
+
     Args:
         source_paths: a list of paths to be sent. Each path can be a file or
             a directory. If the path is directory, all files under the
@@ -273,6 +279,27 @@ class RemoteExecutor(object):
             sending path list. Similar to |source_paths|, if a path is
             directory, all paths under the directory will be excluded.
     """
+    get_stripped_path = None
+    # See _run_rsync() for why the existence of the stripped directory is
+    # checked.
+    if (OPTIONS.is_debug_info_enabled() and
+        os.path.exists(build_common.get_stripped_dir())):
+      get_stripped_path = self._get_stripped_binary_path
+    files = delta_sync.collect_files(
+        source_paths, exclude_paths, get_stripped_path=get_stripped_path)
+    pusher = delta_sync.DeltaPusher(
+        self._get_delta_sync_manifest_path(remote_dest_root),
+        self._popen_ssh)
+    sent_paths = pusher.push(files, remote_dest_root)
+    if sent_paths is not None:
+      logging.info('Sent %d changed files to %s',
+                   len(sent_paths), remote_dest_root)
+      return
+
+    self._run_rsync(source_paths, remote_dest_root, exclude_paths)
+    pusher.record(files, remote_dest_root)
+
+  def _run_rsync(self, source_paths, remote_dest_root, exclude_paths):
     filter_list = (
         self._build_rsync_filter_list(source_paths, exclude_paths or []))
     rsync_options = [
@@ -431,6 +458,27 @@ class RemoteExecutor(object):
 
     return result
 
+  def _get_stripped_binary_path(self, path):
+    """Returns the stripped binary corresponding to |path|, or None."""
+    if not self._has_stripped_binary(path):
+      return None
+    return os.path.join(build_common.get_stripped_dir(),
+                        os.path.relpath(path, build_common.get_build_dir()))
+
+  def _get_delta_sync_manifest_path(self, remote_dest_root):
+    name = '%s@%s:%s%s' % (self._user, self._remote, self._port or '',
+                           remote_dest_root.replace('/', '_'))
+    return os.path.join(build_common.OUT_DIR, 'remote_sync', name + '.json')
+
+  def _popen_ssh(self, cmd):
+    """Runs |cmd| on the remote host, with pipes for stdin and stdout."""
+    # Always specify -T, as a pseudo tty would corrupt binary input.
+    ssh_cmd = (['ssh', '%s@%s' % (self._user, self._remote)] +
+               self._build_shared_command_options() + ['-T', '--', cmd])
+    logging.info('%s', logging_util.format_commandline(ssh_cmd))
+    return subprocess.Popen(ssh_cmd, stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE)
+
   def _has_stripped_binary(self, path):
     """Returns True if a stripped binary corresponding to |path| is found."""
     relpath = os.path.relpath(path, build_common.get_build_dir())
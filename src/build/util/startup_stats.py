@@ -15,12 +15,22 @@ _RAW_STAT_VARS = ['pre_plugin_time_ms',
                   'app_pdirt_mem']
 _DERIVED_STAT_VARS = ['boot_time_ms']
 _ALL_STAT_VARS = _RAW_STAT_VARS + _DERIVED_STAT_VARS
+# Stats computed from the time series recorded by process_sampler. They are
+# available only when the sampling is enabled.
+_SAMPLED_STAT_VARS = ['peak_res_mem',
+                      'peak_pdirt_mem',
+                      'peak_pss_mem',
+                      'res_mem_auc',
+                      'pss_mem_auc',
+                      'cpu_time_ms']
 
 
 class StartupStats:
   def __init__(self):
     for name in _RAW_STAT_VARS:
       setattr(self, name, None)
+    # process_sampler.ProcessSamples of the run, if sampled.
+    self.process_samples = None
 
   def is_complete(self):
     """Returns True when all variables are assigned."""
@@ -31,13 +41,54 @@ class StartupStats:
   def boot_time_ms(self):
     return self.pre_plugin_time_ms + self.on_resume_time_ms
 
+  @property
+  def peak_res_mem(self):
+    return self.process_samples.get_peak('res_mb')
+
+  @property
+  def peak_pdirt_mem(self):
+    return self.process_samples.get_peak('pdirt_mb')
+
+  @property
+  def peak_pss_mem(self):
+    return self.process_samples.get_peak('pss_mb')
+
+  @property
+  def res_mem_auc(self):
+    return self.process_samples.get_auc('res_mb')
+
+  @property
+  def pss_mem_auc(self):
+    return self.process_samples.get_auc('pss_mb')
+
+  @property
+  def cpu_time_ms(self):
+    return self.process_samples.get_cpu_time() * 1000
+
+
+def _get_stat_vars(stats_list):
+  """Returns the names of the stats available in all of |stats_list|."""
+  if stats_list and all(stats.process_samples and stats.process_samples.rows
+                        for stats in stats_list):
+    return _ALL_STAT_VARS + _SAMPLED_STAT_VARS
+  return _ALL_STAT_VARS
+
+
+def _get_unit(name):
+  if name.endswith('_ms'):
+    return 'ms'
+  if name.endswith('_auc'):
+    return 'MBs'
+  return 'MB'
+
 
 def _build_raw_stats(stats_list):
   """Builds a dict from stat key to a list of stat values."""
   raw_stats = collections.defaultdict(list)
+  stat_vars = _get_stat_vars(stats_list)
   for stats in stats_list:
     assert stats.is_complete()
-    for name in _ALL_STAT_VARS:
+    for name in stat_vars:
       raw_stats[name].append(getattr(stats, name))
   return raw_stats
 
@@ -64,8 +115,8 @@ def print_aggregated_stats(stats_list):
   # If there is more than 1 stats, print the VPERF= and VRAWPERF= lines.
   if len(stats_list) > 1:
     # Print VPERF= lines.
-    for name in _ALL_STAT_VARS:
-      unit = 'ms' if name.endswith('_ms') else 'MB'
+    for name in _get_stat_vars(stats_list):
+      unit = _get_unit(name)
       median, p90 = aggregated_stats[name]
       print 'VPERF=%(name)s: %(median).2f%(unit)s 90%%=%(p90).2f' % {
           'name': name,
@@ -79,13 +130,23 @@ def print_aggregated_stats(stats_list):
 
   # Note: since each value is the median for each data set, they are not
   # guaranteed to add up.
-  print ('\nPERF=boot:%dms (preEmbed:%dms + pluginLoad:%dms + onResume:%dms),'
-         '\n     virt:%.1fMB, res:%.1fMB, pdirt:%.1fMB, runs:%d\n' % (
-             aggregated_stats['boot_time_ms'][0],
-             aggregated_stats['pre_embed_time_ms'][0],
-             aggregated_stats['plugin_load_time_ms'][0],
-             aggregated_stats['on_resume_time_ms'][0],
-             aggregated_stats['app_virt_mem'][0],
-             aggregated_stats['app_res_mem'][0],
-             aggregated_stats['app_pdirt_mem'][0],
-             len(stat_list)))
+  perf = ('\nPERF=boot:%dms (preEmbed:%dms + pluginLoad:%dms + onResume:%dms),'
+          '\n     virt:%.1fMB, res:%.1fMB, pdirt:%.1fMB, runs:%d' % (
+              aggregated_stats['boot_time_ms'][0],
+              aggregated_stats['pre_embed_time_ms'][0],
+              aggregated_stats['plugin_load_time_ms'][0],
+              aggregated_stats['on_resume_time_ms'][0],
+              aggregated_stats['app_virt_mem'][0],
+              aggregated_stats['app_res_mem'][0],
+              aggregated_stats['app_pdirt_mem'][0],
+              len(stat_list)))
+  if 'peak_res_mem' in aggregated_stats:
+    perf += ('\n     peak res:%.1fMB, peak pdirt:%.1fMB, peak pss:%.1fMB,'
+             '\n     res AUC:%.1fMBs, pss AUC:%.1fMBs, cpu:%.0fms' % (
+                 aggregated_stats['peak_res_mem'][0],
+                 aggregated_stats['peak_pdirt_mem'][0],
+                 aggregated_stats['peak_pss_mem'][0],
+                 aggregated_stats['res_mem_auc'][0],
+                 aggregated_stats['pss_mem_auc'][0],
+                 aggregated_stats['cpu_time_ms'][0]))
+  print perf + '\n'
@@ -0,0 +1,60 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import StringIO
+import sys
+import unittest
+
+from src.build.util import process_sampler
+from src.build.util import startup_stats
+
+
+def _create_stats(rows):
+  stats = startup_stats.StartupStats()
+  stats.pre_plugin_time_ms = 100
+  stats.pre_embed_time_ms = 50
+  stats.plugin_load_time_ms = 50
+  stats.on_resume_time_ms = 200
+  stats.app_virt_mem = 1000
+  stats.app_res_mem = 100
+  stats.app_pdirt_mem = 10
+  stats.process_samples = process_sampler.ProcessSamples(1, rows)
+  return stats
+
+
+class StartupStatsTest(unittest.TestCase):
+  def _print_aggregated_stats(self, stats_list):
+    output = StringIO.StringIO()
+    original_stdout = sys.stdout
+    sys.stdout = output
+    try:
+      startup_stats.print_aggregated_stats(stats_list)
+    finally:
+      sys.stdout = original_stdout
+    return output.getvalue()
+
+  def test_empty_sampler(self):
+    # A sampler which recorded no rows does not provide the sampled stats.
+    output = self._print_aggregated_stats([_create_stats([]),
+                                           _create_stats([])])
+    self.assertIn('PERF=boot:300ms', output)
+    self.assertNotIn('peak_res_mem', output)
+    self.assertNotIn('cpu:', output)
+
+  def test_sampler(self):
+    rows = [(0, 10, 1, 5, 0.1), (1, 20, 2, 10, 0.25)]
+    output = self._print_aggregated_stats([_create_stats(rows),
+                                           _create_stats(rows)])
+    self.assertIn('VPERF=peak_res_mem: 20.00MB', output)
+    self.assertIn('cpu:250ms', output)
+
+  def test_partly_empty_sampler(self):
+    rows = [(0, 10, 1, 5, 0.1), (1, 20, 2, 10, 0.25)]
+    output = self._print_aggregated_stats([_create_stats(rows),
+                                           _create_stats([])])
+    self.assertNotIn('cpu:', output)
+
+
+if __name__ == '__main__':
+  unittest.main()
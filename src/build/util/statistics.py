@@ -4,6 +4,9 @@
 
 """Utility functions which compute statistical values."""
 
+import bisect
+import random
+
 
 def compute_average(values):
   if not values:
@@ -11,8 +14,7 @@ def compute_average(values):
   return float(sum(values)) / len(values)
 
 
-def compute_median(values):
-  values = sorted(values)
+def _compute_median_of_sorted(values):
   n = len(values)
   if not n:
     return float('NaN')
@@ -22,10 +24,11 @@ def compute_median(values):
     return values[n / 2]
 
 
-def compute_percentiles(values, percentiles=(50, 90)):
-  """Returns the percentiles as a tuple which has as many elements as the
-  percentiles array."""
-  values = sorted(values)
+def compute_median(values):
+  return _compute_median_of_sorted(sorted(values))
+
+
+def _compute_percentiles_of_sorted(values, percentiles):
   n = len(values)
   if n <= 1:
     v = values[0] if values else float('NaN')
@@ -44,3 +47,71 @@ def compute_percentiles(values, percentiles=(50, 90)):
       d.append(((100 - w) * values[idx] +
                 w * values[idx + 1]) / 100.0)
   return tuple(d)
+
+
+def compute_percentiles(values, percentiles=(50, 90)):
+  """Returns the percentiles as a tuple which has as many elements as the
+  percentiles array."""
+  return _compute_percentiles_of_sorted(sorted(values), percentiles)
+
+
+class Accumulator(object):
+  """Accumulates values one by one, and computes their statistics.
+
+  The average and the variance are updated for each value with Welford's
+  algorithm. The values are kept sorted, so the median and percentiles are
+  available at any time without sorting all the values again, and they agree
+  with compute_median and compute_percentiles.
+
+  If |max_samples| is given, only a uniformly random sample (a reservoir) of
+  at most that many values is kept, and the median and percentiles are
+  estimated from the sample. The average and the variance are still exact.
+  """
+
+  def __init__(self, max_samples=None):
+    assert max_samples is None or max_samples > 0
+    self._max_samples = max_samples
+    self._sorted_samples = []
+    self._count = 0
+    self._mean = 0.0
+    self._sum_of_squared_deviations = 0.0
+
+  def add(self, value):
+    self._count += 1
+    delta = value - self._mean
+    self._mean += delta / self._count
+    self._sum_of_squared_deviations += delta * (value - self._mean)
+
+    if (self._max_samples is None or
+        len(self._sorted_samples) < self._max_samples):
+      bisect.insort(self._sorted_samples, value)
+    elif random.randrange(self._count) < self._max_samples:
+      # Replace a random sample. The position in the sorted list is as random
+      # as the sample at the position.
+      del self._sorted_samples[random.randrange(self._max_samples)]
+      bisect.insort(self._sorted_samples, value)
+
+  def get_count(self):
+    return self._count
+
+  def is_approximate(self):
+    """Returns True if the median and percentiles are estimates."""
+    return self._count > len(self._sorted_samples)
+
+  def get_average(self):
+    if not self._count:
+      return float('NaN')
+    return self._mean
+
+  def get_variance(self):
+    """Returns the unbiased sample variance, or NaN if less than 2 values."""
+    if self._count < 2:
+      return float('NaN')
+    return self._sum_of_squared_deviations / (self._count - 1)
+
+  def get_median(self):
+    return _compute_median_of_sorted(self._sorted_samples)
+
+  def get_percentiles(self, percentiles=(50, 90)):
+    """Returns the percentiles as compute_percentiles does."""
+    return _compute_percentiles_of_sorted(self._sorted_samples, percentiles)
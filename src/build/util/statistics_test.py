@@ -5,6 +5,7 @@
 """Tests for stat_util."""
 
 import math
+import random
 import unittest
 
 from src.build.util import statistics
@@ -48,6 +49,58 @@ class TestStatUtil(unittest.TestCase):
                       statistics.compute_percentiles([6, 7, 15, 36, 39, 40,
                                                       41, 42, 43]))
 
+  def test_accumulator_empty(self):
+    accumulator = statistics.Accumulator()
+    self.assertEquals(0, accumulator.get_count())
+    self.assertTrue(math.isnan(accumulator.get_average()))
+    self.assertTrue(math.isnan(accumulator.get_variance()))
+    self.assertTrue(math.isnan(accumulator.get_median()))
+    self.assertTrue(all(map(math.isnan, accumulator.get_percentiles())))
+
+  def test_accumulator(self):
+    rand = random.Random(0)
+    for values in ([42],
+                   [rand.randint(0, 10) for _ in xrange(100)],
+                   [rand.gauss(100, 5) for _ in xrange(1000)]):
+      accumulator = statistics.Accumulator()
+      for i, value in enumerate(values):
+        accumulator.add(value)
+        added = values[:i + 1]
+        self.assertEquals(len(added), accumulator.get_count())
+        self.assertAlmostEquals(statistics.compute_average(added),
+                                accumulator.get_average())
+        self.assertEquals(statistics.compute_median(added),
+                          accumulator.get_median())
+        self.assertEquals(
+            statistics.compute_percentiles(added, (0, 10, 50, 90, 99, 100)),
+            accumulator.get_percentiles((0, 10, 50, 90, 99, 100)))
+        self.assertFalse(accumulator.is_approximate())
+      if len(values) > 1:
+        average = statistics.compute_average(values)
+        variance = (sum((value - average) ** 2 for value in values) /
+                    (len(values) - 1))
+        self.assertAlmostEquals(variance, accumulator.get_variance())
+
+  def test_approximate_accumulator(self):
+    random.seed(0)
+    accumulator = statistics.Accumulator(max_samples=1000)
+    values = [float(i) for i in xrange(100000)]
+    random.shuffle(values)
+    for value in values:
+      accumulator.add(value)
+    self.assertEquals(100000, accumulator.get_count())
+    self.assertTrue(accumulator.is_approximate())
+    self.assertEquals(1000, len(accumulator._sorted_samples))
+    # The average and the variance are exact.
+    self.assertAlmostEquals(statistics.compute_average(values),
+                            accumulator.get_average())
+    self.assertAlmostEquals(1, accumulator.get_variance() / (10 ** 10 / 12.),
+                            places=3)
+    # The median and percentiles are estimated within a few percent.
+    median, p90 = accumulator.get_percentiles()
+    self.assertLess(abs(median - 50000), 5000)
+    self.assertLess(abs(p90 - 90000), 3000)
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -52,15 +52,20 @@ class ArtTestRunner(suite_runner.SuiteRunnerBase):
 
   _SUITE_NAME_RE = re.compile(r'[0-9]+-\w+')
 
-  def __init__(self, suite_name, config, **kwargs):
+  def __init__(self, suite_name, config, cases_per_boot=1, **kwargs):
     """Constructs a ART test suite.
 
     Args:
       suite_name: ART test suite name (e.g. "008-exception").
       config: Suite config dictionary.
+      cases_per_boot: The number of test cases run in an ARC instance before
+          it is rebooted. The test files are pushed once per boot. If None
+          or 0, the instance is booted once for the whole suite. In any case,
+          the instance is rebooted after it crashes.
       **kwargs: Other constructor parameters passed through to SuiteRunnerBase.
     """
     self._suite_name = suite_name
+    self._cases_per_boot = cases_per_boot
     self._source_dir = os.path.join(self.get_source_root(), self._suite_name)
     self._work_dir = os.path.join(self.get_work_root(), self._suite_name)
     self._is_benchmark = os.path.exists(
@@ -159,16 +164,32 @@ class ArtTestRunner(suite_runner.SuiteRunnerBase):
     prep_launch_chrome.prepare_crx_with_raw_args(args)
 
   def run(self, test_methods_to_run, scoreboard):
-    for case_name in test_methods_to_run:
-      output = None
+    pending_cases = list(test_methods_to_run)
+    while pending_cases:
       with system_mode.SystemMode(self) as arc:
         self._push_test_files(arc)
-        begin_time = time.time()
-        output = self._run_test(arc, case_name)
-        elapsed_time = time.time() - begin_time
+        self._run_cases_in_boot(arc, pending_cases, scoreboard)
 
-      # At this point, output can be None because evil SystemMode.__exit__()
-      # quietly suppress an exception raised from SystemMode.run_adb()!
+  def _run_cases_in_boot(self, arc, pending_cases, scoreboard):
+    """Runs test cases in a booted ARC instance.
+
+    Args:
+      arc: SystemMode object, whose test files are already pushed.
+      pending_cases: The list of test case names to run. The cases run are
+          removed from the list.
+      scoreboard: The scoreboard to update with the result of each case.
+    """
+    cases_run = 0
+    while pending_cases:
+      if self._cases_per_boot and cases_run >= self._cases_per_boot:
+        break
+      case_name = pending_cases.pop(0)
+      begin_time = time.time()
+      output = self._run_test(arc, case_name)
+      elapsed_time = time.time() - begin_time
+      cases_run += 1
+
+      # Be defensive against a None output from SystemMode.run_adb().
       if output is None:
         # In this case, arc.run_adb() should have recorded some logs
         # which will be retrieved by arc.get_log() later.
@@ -186,6 +207,13 @@ class ArtTestRunner(suite_runner.SuiteRunnerBase):
 
       scoreboard.update([result])
 
+      if output is None or arc.has_error():
+        # The instance may be broken. Run the remaining cases after reboot.
+        if pending_cases:
+          self._logger.write(
+              'ARC instance is unhealthy after %s. Rebooting.\n' % case_name)
+        break
+
   def _push_test_files(self, arc):
     """Pushes test files via ADB.
 
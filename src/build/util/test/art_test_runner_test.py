@@ -0,0 +1,148 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from src.build.build_options import OPTIONS
+from src.build.util.test import art_test_runner
+from src.build.util.test import flags
+from src.build.util.test import test_method_result
+
+_SUITE_NAME = '999-fake'
+_CASES = ['case%d' % i for i in xrange(5)]
+
+
+class _FakeSystemMode(object):
+  """Stands in for SystemMode, recording boots and adb commands."""
+
+  def __init__(self, recorder):
+    self._recorder = recorder
+    self._has_error = False
+
+  def __enter__(self):
+    self._recorder.boot_count += 1
+    return self
+
+  def __exit__(self, exc_type, exc_value, exc_traceback):
+    pass
+
+  def run_adb(self, commands, **kwargs):
+    if commands[0] == 'push':
+      self._recorder.push_count += 1
+      return ''
+    if commands[0] != 'shell' or 'dalvikvm' not in commands:
+      return ''
+    # The case name is passed as the last VM argument.
+    case_name = commands[commands.index(';', commands.index('dalvikvm')) - 1]
+    self._recorder.cases.append(case_name)
+    if case_name in self._recorder.crashing_cases:
+      self._has_error = True
+    return 'output of %s' % case_name
+
+  def has_error(self):
+    return self._has_error
+
+
+class _Recorder(object):
+  def __init__(self, crashing_cases=()):
+    self.boot_count = 0
+    self.push_count = 0
+    self.cases = []
+    self.crashing_cases = crashing_cases
+
+  def create_system_mode(self, unused_suite_runner):
+    return _FakeSystemMode(self)
+
+
+class _FakeScoreboard(object):
+  def __init__(self):
+    self.results = []
+
+  def update(self, results):
+    self.results.extend(results)
+
+
+class ArtTestRunnerTest(unittest.TestCase):
+  def setUp(self):
+    OPTIONS.parse([])
+    self._source_root = tempfile.mkdtemp(prefix='art_test_runner_test')
+    self._work_root = tempfile.mkdtemp(prefix='art_test_runner_test')
+    os.mkdir(os.path.join(self._source_root, _SUITE_NAME))
+    with open(os.path.join(self._source_root, _SUITE_NAME,
+                           'test_cases'), 'w') as f:
+      for case_name in _CASES:
+        f.write('%s:\n' % case_name)
+    os.mkdir(os.path.join(self._work_root, _SUITE_NAME))
+    open(os.path.join(self._work_root, _SUITE_NAME,
+                      '%s.jar' % _SUITE_NAME), 'w').close()
+
+    patchers = [
+        mock.patch.object(art_test_runner.ArtTestRunner, 'get_source_root',
+                          return_value=self._source_root),
+        mock.patch.object(art_test_runner.ArtTestRunner, 'get_work_root',
+                          return_value=self._work_root),
+        mock.patch.object(
+            art_test_runner.ArtTestRunner, '_check_output',
+            side_effect=lambda case_name, output: (
+                test_method_result.TestMethodResult(
+                    case_name, test_method_result.TestMethodResult.PASS)))]
+    for patcher in patchers:
+      patcher.start()
+      self.addCleanup(patcher.stop)
+
+  def tearDown(self):
+    shutil.rmtree(self._source_root)
+    shutil.rmtree(self._work_root)
+
+  def _run(self, recorder, cases_per_boot):
+    runner = art_test_runner.ArtTestRunner(
+        _SUITE_NAME, config={'flags': flags.FlagSet(flags.PASS)},
+        cases_per_boot=cases_per_boot)
+    runner._logger = mock.MagicMock()
+    scoreboard = _FakeScoreboard()
+    with mock.patch.object(art_test_runner.system_mode, 'SystemMode',
+                           side_effect=recorder.create_system_mode):
+      runner.run(_CASES, scoreboard)
+    self.assertEquals(_CASES, recorder.cases)
+    self.assertEquals(_CASES, [result.name for result in scoreboard.results])
+
+  def _get_pushes_per_boot(self):
+    recorder = _Recorder()
+    self._run(recorder, None)
+    return recorder.push_count
+
+  def test_boot_per_case(self):
+    recorder = _Recorder()
+    self._run(recorder, 1)
+    self.assertEquals(len(_CASES), recorder.boot_count)
+    self.assertEquals(len(_CASES) * self._get_pushes_per_boot(),
+                      recorder.push_count)
+
+  def test_boot_once_per_suite(self):
+    recorder = _Recorder()
+    self._run(recorder, None)
+    self.assertEquals(1, recorder.boot_count)
+    self.assertLess(0, recorder.push_count)
+
+  def test_boot_per_n_cases(self):
+    recorder = _Recorder()
+    self._run(recorder, 2)
+    self.assertEquals(3, recorder.boot_count)
+    self.assertEquals(3 * self._get_pushes_per_boot(), recorder.push_count)
+
+  def test_reboot_after_crash(self):
+    recorder = _Recorder(crashing_cases=['case1', 'case2'])
+    self._run(recorder, None)
+    # Booted for case0-1, case2, and case3-4.
+    self.assertEquals(3, recorder.boot_count)
+    self.assertEquals(3 * self._get_pushes_per_boot(), recorder.push_count)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -6,16 +6,20 @@
 
 """Extracts a list of test methods from .apk file.
 
-This script dumps the method signatures in the .apk file by dexdump,
-and finds the test methods from them.
+This script reads the method signatures in classes.dex of the .apk file,
+and finds the test methods from them. If the .apk file cannot be read by the
+zipfile module, it falls back to dumping the method signatures by dexdump.
 """
 
 import argparse
+import logging
 import subprocess
+import zipfile
 from xml.etree import cElementTree
 
 from src.build import build_options
 from src.build import toolchain
+from src.build.util import dex_reader
 
 
 def _parse_apk(apk_path):
@@ -83,6 +87,61 @@ def _extract_test(dex_xml):
   return test_name_list
 
 
+def _get_test_name(class_descriptor, method_name):
+  """Returns the test name in the same form as _extract_test() does.
+
+  For example, for 'Lpackage/name/Outer$Inner;' and 'testMethod', this returns
+  'package.name.Outer.Inner#testMethod', as dexdump names the inner class
+  'Outer.Inner'.
+  """
+  package_name, _, class_name = class_descriptor[1:-1].rpartition('/')
+  return '%s.%s#%s' % (package_name.replace('/', '.'),
+                       class_name.replace('$', '.'), method_name)
+
+
+def _extract_test_from_dex(reader):
+  """Extracts a list of test cases from classes.dex read by |reader|.
+
+  This returns the same list as _extract_test() does for the output of
+  "dexdump -lxml" of the same DEX file, without building the whole XML tree.
+  """
+  test_name_list = []
+  for method in reader.iter_methods():
+    # See _extract_test() for the conditions.
+    if (not method.class_access_flags & dex_reader.ACC_PUBLIC or
+        method.class_access_flags & dex_reader.ACC_ABSTRACT):
+      continue
+
+    # Constructors (<init> and <clinit>) are not methods in the output of
+    # dexdump.
+    if method.name.startswith('<'):
+      continue
+
+    assert not method.access_flags & dex_reader.ACC_ABSTRACT
+
+    if (not method.access_flags & dex_reader.ACC_PUBLIC or
+        method.return_type != 'V' or
+        not method.name.startswith('test') or
+        method.parameter_types):
+      continue
+
+    test_name_list.append(
+        _get_test_name(method.class_descriptor, method.name))
+  return test_name_list
+
+
+def _extract_test_from_apk(apk_path):
+  try:
+    dex_data = dex_reader.read_classes_dex(apk_path)
+  except (zipfile.BadZipfile, KeyError):
+    # Some .apk files cannot be read by the zipfile module.
+    # See: https://bugs.python.org/issue14315.
+    logging.warning('Failed to read classes.dex from %s. Using dexdump.',
+                    apk_path, exc_info=True)
+    return _extract_test(_parse_apk(apk_path))
+  return _extract_test_from_dex(dex_reader.DexReader(dex_data))
+
+
 def _parse_args():
   parser = argparse.ArgumentParser(
       description='Create a list of test methods in .apk file')
@@ -96,8 +155,7 @@ def main():
   build_options.OPTIONS.parse_configure_file()
   args = _parse_args()
 
-  dex_xml = _parse_apk(args.apk)
-  test_list = _extract_test(dex_xml)
+  test_list = _extract_test_from_apk(args.apk)
   if args.output:
     with open(args.output, mode='w') as stream:
       stream.write('\n'.join(test_list))
@@ -2,11 +2,156 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 
+import os
+import shutil
+import struct
+import tempfile
 import unittest
+import zipfile
 from xml.etree import cElementTree
 
+from src.build.util import dex_reader
 from src.build.util.test import extract_test_list
 
+_ACC_PUBLIC = dex_reader.ACC_PUBLIC
+_ACC_PROTECTED = dex_reader.ACC_PROTECTED
+_ACC_ABSTRACT = dex_reader.ACC_ABSTRACT
+_ACC_CONSTRUCTOR = dex_reader.ACC_CONSTRUCTOR
+
+
+def _encode_uleb128(value):
+  result = ''
+  while value >= 0x80:
+    result += chr(value & 0x7f | 0x80)
+    value >>= 7
+  return result + chr(value)
+
+
+class _DexBuilder(object):
+  """Builds a minimal DEX file, containing only what DexReader reads."""
+
+  def __init__(self):
+    self._strings = []
+    self._types = []
+    self._protos = []
+    self._methods = []
+    # A list of (type_idx, access_flags, direct_methods, virtual_methods,
+    # method_annotations).
+    self._classes = []
+
+  @staticmethod
+  def _intern(table, value):
+    if value not in table:
+      table.append(value)
+    return table.index(value)
+
+  def _add_type(self, descriptor):
+    return self._intern(self._types, self._intern(self._strings, descriptor))
+
+  def add_class(self, descriptor, access_flags, methods):
+    """Adds a class.
+
+    |methods| is a list of (name, access_flags, return_type, parameter_types,
+    annotations). Methods whose name starts with '<' are direct methods.
+    """
+    class_idx = self._add_type(descriptor)
+    direct_methods = []
+    virtual_methods = []
+    method_annotations = []
+    for name, method_flags, return_type, parameter_types, annotations in (
+        methods):
+      proto_idx = self._intern(self._protos, (
+          self._add_type(return_type),
+          tuple(self._add_type(t) for t in parameter_types)))
+      method_idx = len(self._methods)
+      self._methods.append(
+          (class_idx, proto_idx, self._intern(self._strings, name)))
+      if name.startswith('<'):
+        direct_methods.append((method_idx, method_flags))
+      else:
+        virtual_methods.append((method_idx, method_flags))
+      if annotations:
+        method_annotations.append(
+            (method_idx, [self._add_type(a) for a in annotations]))
+    self._classes.append((class_idx, access_flags, direct_methods,
+                          virtual_methods, method_annotations))
+
+  def build(self):
+    data_off = (0x70 + 4 * len(self._strings) + 4 * len(self._types) +
+                12 * len(self._protos) + 8 * len(self._methods) +
+                32 * len(self._classes))
+    data = []
+
+    def add_data(content, alignment=1):
+      offset = data_off + sum(len(chunk) for chunk in data)
+      padding = -offset % alignment
+      data.append('\0' * padding + content)
+      return offset + padding
+
+    string_offsets = [add_data(_encode_uleb128(len(string)) + string + '\0')
+                      for string in self._strings]
+    proto_items = []
+    for return_type_idx, parameter_type_idxs in self._protos:
+      parameters_off = 0
+      if parameter_type_idxs:
+        parameters_off = add_data(struct.pack(
+            '<I%dH' % len(parameter_type_idxs), len(parameter_type_idxs),
+            *parameter_type_idxs), 4)
+      proto_items.append(struct.pack('<III', 0, return_type_idx,
+                                     parameters_off))
+
+    class_defs = []
+    for (class_idx, access_flags, direct_methods, virtual_methods,
+         method_annotations) in self._classes:
+      class_data = ''.join(_encode_uleb128(size) for size in (
+          0, 0, len(direct_methods), len(virtual_methods)))
+      for methods in (direct_methods, virtual_methods):
+        previous_idx = 0
+        for method_idx, method_flags in methods:
+          class_data += ''.join(_encode_uleb128(value) for value in (
+              method_idx - previous_idx, method_flags, 0))
+          previous_idx = method_idx
+      class_data_off = add_data(class_data)
+
+      annotations_off = 0
+      if method_annotations:
+        entries = []
+        for method_idx, type_idxs in method_annotations:
+          # Each annotation_item is a visibility byte, type_idx and no
+          # elements.
+          item_offsets = [add_data('\x01' + _encode_uleb128(type_idx) + '\0')
+                          for type_idx in type_idxs]
+          set_off = add_data(struct.pack(
+              '<I%dI' % len(item_offsets), len(item_offsets), *item_offsets),
+              4)
+          entries.append(struct.pack('<II', method_idx, set_off))
+        annotations_off = add_data(
+            struct.pack('<IIII', 0, 0, len(entries), 0) + ''.join(entries), 4)
+      class_defs.append(struct.pack(
+          '<IIIIIIII', class_idx, access_flags, 0, 0, 0, annotations_off,
+          class_data_off, 0))
+
+    sections = []
+    offset = 0x70
+    for count, item_size in ((len(self._strings), 4), (len(self._types), 4),
+                             (len(self._protos), 12), (0, 0),
+                             (len(self._methods), 8),
+                             (len(self._classes), 32)):
+      sections.append((count, offset if count else 0))
+      offset += count * item_size
+    header = ('dex\n035\0' + '\0' * 24 +
+              struct.pack('<IIIIII', 0, 0x70, 0x12345678, 0, 0, 0) +
+              ''.join(struct.pack('<II', *section) for section in sections) +
+              '\0' * 8)
+    assert len(header) == 0x70
+    return ''.join([
+        header,
+        ''.join(struct.pack('<I', offset) for offset in string_offsets),
+        ''.join(struct.pack('<I', idx) for idx in self._types),
+        ''.join(proto_items),
+        ''.join(struct.pack('<HHI', *method) for method in self._methods),
+        ''.join(class_defs)] + data)
+
 
 class ExtractTestListTest(unittest.TestCase):
   def test_extract_test(self):
@@ -166,6 +311,94 @@ class ExtractTestListTest(unittest.TestCase):
             '</package>',
             '</api>']))))
 
+  def test_extract_test_from_dex(self):
+    # The same classes as test_extract_test().
+    builder = _DexBuilder()
+    builder.add_class('Ltest/package/TestClass1;', _ACC_PUBLIC, [
+        ('<init>', _ACC_PUBLIC | _ACC_CONSTRUCTOR, 'V', [], []),
+        ('testMethod1', _ACC_PUBLIC, 'V', [], []),
+        ('testProtected', _ACC_PROTECTED, 'V', [], []),
+        ('nonTestMethod', _ACC_PUBLIC, 'V', [], []),
+        ('testNonVoid', _ACC_PUBLIC, 'I', [], []),
+        ('testWithParams', _ACC_PUBLIC, 'V', ['I'], []),
+        ('testMethod2', _ACC_PUBLIC, 'V', [], []),
+    ])
+    builder.add_class('Ltest/package/TestClass2;', _ACC_PUBLIC, [
+        ('testMethod1', _ACC_PUBLIC, 'V', [], []),
+    ])
+    builder.add_class('Ltest/package/TestAbstractClass;',
+                      _ACC_PUBLIC | _ACC_ABSTRACT, [
+                          ('testMethod1', _ACC_PUBLIC, 'V', [], []),
+                      ])
+    # Non-public class should be ignored.
+    builder.add_class('Ltest/package/TestPrivateClass;', 0, [
+        ('testMethod1', _ACC_PUBLIC, 'V', [], []),
+    ])
+    self.assertEquals(
+        ['test.package.TestClass1#testMethod1',
+         'test.package.TestClass1#testMethod2',
+         'test.package.TestClass2#testMethod1'],
+        extract_test_list._extract_test_from_dex(
+            dex_reader.DexReader(builder.build())))
+
+  def test_extract_test_from_dex_class_names(self):
+    builder = _DexBuilder()
+    builder.add_class('Ltest/package/Outer$Inner;', _ACC_PUBLIC, [
+        ('testMethod1', _ACC_PUBLIC, 'V', [], []),
+    ])
+    builder.add_class('LNoPackage;', _ACC_PUBLIC, [
+        ('testMethod1', _ACC_PUBLIC, 'V', [], []),
+    ])
+    # Names are the same as dexdump outputs.
+    self.assertEquals(
+        ['test.package.Outer.Inner#testMethod1', '.NoPackage#testMethod1'],
+        extract_test_list._extract_test_from_dex(
+            dex_reader.DexReader(builder.build())))
+
+  def test_extract_test_from_apk(self):
+    builder = _DexBuilder()
+    builder.add_class('Lfoo/Bar;', _ACC_PUBLIC, [
+        ('testFoo', _ACC_PUBLIC, 'V', [], []),
+    ])
+    tmpdir = tempfile.mkdtemp(prefix='extract_test_list_test')
+    try:
+      apk_path = os.path.join(tmpdir, 'test.apk')
+      with zipfile.ZipFile(apk_path, 'w', zipfile.ZIP_DEFLATED) as apk:
+        apk.writestr('classes.dex', builder.build())
+      self.assertEquals(['foo.Bar#testFoo'],
+                        extract_test_list._extract_test_from_apk(apk_path))
+    finally:
+      shutil.rmtree(tmpdir)
+
+  def test_dex_reader(self):
+    builder = _DexBuilder()
+    builder.add_class('Lfoo/Bar;', _ACC_PUBLIC, [
+        ('<init>', _ACC_PUBLIC | _ACC_CONSTRUCTOR, 'V', [], []),
+        ('testFoo', _ACC_PUBLIC, 'V', ['I', 'Ljava/lang/String;'],
+         ['Landroid/test/suitebuilder/annotation/SmallTest;',
+          'Landroid/test/FlakyTest;']),
+        ('testBar', _ACC_PUBLIC, 'Z', [], []),
+    ])
+    methods = list(dex_reader.DexReader(builder.build()).iter_methods())
+    self.assertEquals(['<init>', 'testFoo', 'testBar'],
+                      [method.name for method in methods])
+    self.assertEquals(
+        dex_reader.DexMethod(
+            class_descriptor='Lfoo/Bar;',
+            class_access_flags=_ACC_PUBLIC,
+            name='testFoo',
+            access_flags=_ACC_PUBLIC,
+            return_type='V',
+            parameter_types=['I', 'Ljava/lang/String;'],
+            annotations=['Landroid/test/suitebuilder/annotation/SmallTest;',
+                         'Landroid/test/FlakyTest;']),
+        methods[1])
+    self.assertEquals([], methods[2].annotations)
+
+  def test_dex_reader_invalid_file(self):
+    with self.assertRaises(dex_reader.DexFormatError):
+      dex_reader.DexReader('PK\x03\x04' + '\0' * 0x100)
+
 
 if __name__ == '__main__':
   unittest.main()
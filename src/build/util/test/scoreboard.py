@@ -2,6 +2,7 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 
+import collections
 import time
 
 from src.build.util.test import flags
@@ -33,6 +34,10 @@ class Scoreboard:
     self._end_time = None
     self._expectations = {}
     self._results = {}
+    # Maps a result to the names of the tests with the result, in the order
+    # they got the result. This keeps the counts and the lists cheap, as they
+    # are queried repeatedly while a run progresses.
+    self._tests_by_result = collections.defaultdict(collections.OrderedDict)
 
     # Once a test has not been completed twice, it will be 'blacklisted' so
     # that the SuiteRunner can skip it going forward.
@@ -44,7 +49,7 @@ class Scoreboard:
 
   def reset_results(self, tests):
     for test in tests:
-      self._results[test] = scoreboard_constants.INCOMPLETE
+      self._set_result(test, scoreboard_constants.INCOMPLETE)
 
   @staticmethod
   def map_expectation_flag_to_result(ex):
@@ -102,7 +107,7 @@ class Scoreboard:
     """
     for name in tests_to_run:
       assert name in self._expectations
-      self._results[name] = scoreboard_constants.INCOMPLETE
+      self._set_result(name, scoreboard_constants.INCOMPLETE)
 
   def stop(self, tests_to_run):
     # TODO(lpique): This is just a no-op implementation to ease a near-future
@@ -115,14 +120,13 @@ class Scoreboard:
 
     This is most likely to rerun any incomplete or flaky tests.
     """
-    for name, result in self._results.iteritems():
-      # All remaining tests were not completed (most likely due to other
-      # failures or timeouts).
-      if result == scoreboard_constants.INCOMPLETE:
-        if name in self._did_not_complete_once:
-          self._did_not_complete_blacklist.append(name)
-        else:
-          self._did_not_complete_once.add(name)
+    # All remaining tests were not completed (most likely due to other
+    # failures or timeouts).
+    for name in self.get_incomplete_tests():
+      if name in self._did_not_complete_once:
+        self._did_not_complete_blacklist.append(name)
+      else:
+        self._did_not_complete_once.add(name)
     self._restart_count += 1
     suite_results.report_restart(self, num_retried_tests)
 
@@ -241,10 +245,10 @@ class Scoreboard:
     return self._get_list(scoreboard_constants.UNEXPECTED_FAIL)
 
   def _get_list(self, result):
-    return [key for key, value in self._results.iteritems() if value == result]
+    return list(self._tests_by_result.get(result, ()))
 
   def _get_count(self, result):
-    return self._results.values().count(result)
+    return len(self._tests_by_result.get(result, ()))
 
   def get_incomplete_blacklist(self):
     return self._did_not_complete_blacklist
@@ -273,7 +277,11 @@ class Scoreboard:
     if (name in self._did_not_complete_blacklist and
         result != scoreboard_constants.INCOMPLETE):
       self._did_not_complete_blacklist.remove(name)
+    previous_result = self._results.get(name)
+    if previous_result is not None:
+      del self._tests_by_result[previous_result][name]
     self._results[name] = result
+    self._tests_by_result[result][name] = None
 
   def _finalize_test(self, name, expect):
     assert self._is_valid_expectation(expect)
@@ -525,6 +525,62 @@ class ScoreboardTests(unittest.TestCase):
     }
     self._check_scoreboard(sb, results)
 
+  def test_many_results(self):
+    # Feeds many results, and checks that the counts and the lists match the
+    # ones computed from the results.
+    statuses = [flags.PASS, flags.FAIL, flags.FLAKY, flags.NOT_SUPPORTED]
+    results = [test_method_result.TestMethodResult.PASS,
+               test_method_result.TestMethodResult.FAIL]
+    names = ['test%d' % i for i in xrange(50000)]
+    expectations = dict(
+        (name, flags.FlagSet(statuses[i % len(statuses)]))
+        for i, name in enumerate(names))
+    # The number of reports is not checked here.
+    suite_results.report_results = _noop
+    sb = scoreboard.Scoreboard('suite', expectations)
+    sb.register_tests(names)
+    sb.start(names)
+    # Leave some tests incomplete.
+    for i, name in enumerate(names[:-100]):
+      sb.update([test_method_result.TestMethodResult(
+          name, results[i % 7 % len(results)])])
+      if i % 1000 == 0:
+        # The counts are queried while a run progresses.
+        sb.overall_status
+
+    def check():
+      for attribute, status in (
+          ('expected_passed', scoreboard_constants.EXPECTED_PASS),
+          ('unexpected_passed', scoreboard_constants.UNEXPECTED_PASS),
+          ('expected_failed', scoreboard_constants.EXPECTED_FAIL),
+          ('unexpected_failed', scoreboard_constants.UNEXPECTED_FAIL),
+          ('skipped', scoreboard_constants.SKIPPED)):
+        self.assertEquals(sb._results.values().count(status),
+                          getattr(sb, attribute), attribute)
+      for method, status in (
+          (sb.get_flaky_tests, scoreboard_constants.EXPECTED_FLAKE),
+          (sb.get_skipped_tests, scoreboard_constants.SKIPPED),
+          (sb.get_incomplete_tests, scoreboard_constants.INCOMPLETE),
+          (sb.get_expected_passing_tests, scoreboard_constants.EXPECTED_PASS),
+          (sb.get_unexpected_passing_tests,
+           scoreboard_constants.UNEXPECTED_PASS),
+          (sb.get_expected_failing_tests, scoreboard_constants.EXPECTED_FAIL),
+          (sb.get_unexpected_failing_tests,
+           scoreboard_constants.UNEXPECTED_FAIL)):
+        self.assertEquals(
+            sorted(name for name, result in sb._results.iteritems()
+                   if result == status),
+            sorted(method()), method.__name__)
+
+    check()
+    self.assertEquals(100, sb.incompleted)
+    sb.restart(100)
+    self.assertEquals(100, sb.incompleted)
+    # The flaky tests which did not pass get UNEXPECTED_FAIL on finalize().
+    sb.finalize()
+    check()
+    self.assertEquals([], sb.get_flaky_tests())
+
   def test_get_expectations_works_with_named_tests(self):
     sb = scoreboard.Scoreboard(
         'suite',
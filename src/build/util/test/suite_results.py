@@ -2,6 +2,7 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 
+import atexit
 import collections
 import json
 import os
@@ -892,14 +893,42 @@ class SuiteResultsTracing(object):
   help to visualize the timeline in which tests are executed. This wraps around
   another SuiteResultsBase object, so any method invoked on this class will also
   call the wrapped object.
+
+  The events are buffered, and the file is flushed periodically by a
+  background thread rather than per event. The JSON array is closed by
+  finalize_run(), or at exit if the run is aborted.
+
+  Calls to this class are already serialized by initialize(), which wraps it
+  with synchronized_interface. The lock here only serializes the writes with
+  the periodic flush and with close() at exit, which do not go through the
+  wrapper.
   """
 
+  # The interval in seconds between flushes of the tracing file.
+  _FLUSH_INTERVAL = 1
+
   def __init__(self, wrapped_suite_results, tracing_file):
     self._wrapped = wrapped_suite_results
+    self._lock = threading.Lock()
     self._started_suites = set()
     self._tracing_log = open(tracing_file, 'w')
     self._tracing_log.write('[')
     self._tracing_log.flush()
+    self._separator = '\n'
+    self._closed = threading.Event()
+    self._flush_thread = threading.Thread(
+        target=self._flush_periodically,
+        args=(SuiteResultsTracing._FLUSH_INTERVAL,),
+        name='SuiteResultsTracingFlush')
+    self._flush_thread.daemon = True
+    self._flush_thread.start()
+    atexit.register(self.close)
+
+  def _flush_periodically(self, interval):
+    while not self._closed.wait(interval):
+      with self._lock:
+        if not self._tracing_log.closed:
+          self._tracing_log.flush()
 
   def _event(self, name, event_type):
     return {
@@ -910,50 +939,63 @@ class SuiteResultsTracing(object):
         'ts': time.time() * 1e6,
     }
 
+  def _write_event_locked(self, event):
+    if self._tracing_log.closed:
+      return
+    self._tracing_log.write(self._separator + json.dumps(event))
+    self._separator = ',\n'
+
   def _write_start_suite_event(self, suite_name):
-    if suite_name not in self._started_suites:
-      event = self._event(suite_name, 'B')
-      self._tracing_log.write(json.dumps(event) + ',\n')
-      self._tracing_log.flush()
-      self._started_suites.add(suite_name)
+    with self._lock:
+      if suite_name not in self._started_suites:
+        self._write_event_locked(self._event(suite_name, 'B'))
+        self._started_suites.add(suite_name)
 
   def _write_restart_suite_event(self, suite_name):
     event = self._event(suite_name, 'E')
     event['args'] = {
         'status': 'Restarted',
     }
-    self._tracing_log.write(json.dumps(event) + ',\n')
-    self._tracing_log.flush()
-    self._started_suites.discard(suite_name)
+    with self._lock:
+      self._write_event_locked(event)
+      self._started_suites.discard(suite_name)
 
   def _write_finish_test_event(self, suite_name, test_name, test_status,
                                test_duration):
     begin = (time.time() - test_duration) * 1e6
-    if suite_name not in self._started_suites:
-      event = self._event(suite_name, 'B')
-      event['ts'] = begin
-      self._tracing_log.write(json.dumps(event) + ',\n')
-      self._tracing_log.flush()
-      self._started_suites.add(suite_name)
     event = self._event(test_name, 'X')
     event['ts'] = begin
     event['dur'] = test_duration * 1e6
     event['args'] = {
         'status': VERBOSE_STATUS_TEXT[test_status],
     }
-    self._tracing_log.write(json.dumps(event) + ',\n')
-    self._tracing_log.flush()
+    with self._lock:
+      if suite_name not in self._started_suites:
+        suite_event = self._event(suite_name, 'B')
+        suite_event['ts'] = begin
+        self._write_event_locked(suite_event)
+        self._started_suites.add(suite_name)
+      self._write_event_locked(event)
 
   def _write_finish_suite_event(self, suite_name, suite_status):
     event = self._event(suite_name, 'E')
     event['args'] = {
         'status': VERBOSE_STATUS_TEXT[suite_status],
     }
-    if suite_name not in self._started_suites:
-      event['ph'] = 'X'
-      event['dur'] = 1000
-    self._tracing_log.write(json.dumps(event) + ',\n')
-    self._tracing_log.flush()
+    with self._lock:
+      if suite_name not in self._started_suites:
+        event['ph'] = 'X'
+        event['dur'] = 1000
+      self._write_event_locked(event)
+
+  def close(self):
+    """Closes the JSON array, and the tracing file."""
+    self._closed.set()
+    self._flush_thread.join()
+    with self._lock:
+      if not self._tracing_log.closed:
+        self._tracing_log.write('\n]\n')
+        self._tracing_log.close()
 
   def start_suite(self, *args, **kwargs):
     return self._wrapped.start_suite(*args, **kwargs)
@@ -980,6 +1022,7 @@ class SuiteResultsTracing(object):
     self._wrapped.finish_suite(scoreboard)
 
   def finalize_run(self, *args, **kwargs):
+    self.close()
     return self._wrapped.finalize_run(*args, **kwargs)
 
   def report_expected_results(self, *args, **kwargs):
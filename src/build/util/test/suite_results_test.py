@@ -3,6 +3,12 @@
 # found in the LICENSE file.
 
 import collections
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
 import unittest
 
 from util.test import scoreboard_constants
@@ -143,5 +149,98 @@ class FormatStatusCountsTests(unittest.TestCase):
     self.assertEqual('    0S     99P      0XF',
                      _format(counts))
 
+
+class _FakeScoreboard(object):
+  def __init__(self, name):
+    self.name = name
+    self.overall_status = scoreboard_constants.EXPECTED_PASS
+
+
+class _FakeSuiteResults(object):
+  def finish_test(self, *args):
+    pass
+
+  def finish_suite(self, *args):
+    pass
+
+  def finalize_run(self, *args):
+    pass
+
+
+class SuiteResultsTracingTests(unittest.TestCase):
+  """Tests for SuiteResultsTracing"""
+
+  def setUp(self):
+    self._tmpdir = tempfile.mkdtemp(prefix='suite_results_test')
+    self._tracing_file = os.path.join(self._tmpdir, 'tracing.json')
+
+  def tearDown(self):
+    shutil.rmtree(self._tmpdir)
+
+  def _read_events(self):
+    with open(self._tracing_file) as f:
+      return json.load(f)
+
+  def test_concurrent_events(self):
+    tracing = suite_results.SuiteResultsTracing(
+        _FakeSuiteResults(), self._tracing_file)
+
+    def emit(suite_index):
+      scoreboard = _FakeScoreboard('suite%d' % suite_index)
+      for i in xrange(1000):
+        tracing.finish_test(scoreboard, '%s#test%d' % (scoreboard.name, i),
+                            scoreboard_constants.EXPECTED_PASS, 0.1)
+
+    threads = [threading.Thread(target=emit, args=(i,)) for i in xrange(32)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    tracing.finalize_run(self._tmpdir)
+
+    events = self._read_events()
+    # Each suite has a begin event, and an event per test.
+    self.assertEqual(32 * 1001, len(events))
+    test_names = set(event['name'] for event in events if event['ph'] == 'X')
+    self.assertEqual(32 * 1000, len(test_names))
+    self.assertEqual(
+        32, len([event for event in events if event['ph'] == 'B']))
+
+  def test_close_without_finalize(self):
+    tracing = suite_results.SuiteResultsTracing(
+        _FakeSuiteResults(), self._tracing_file)
+    tracing.finish_suite(_FakeScoreboard('suite'))
+    # This is called at exit if the run is aborted.
+    tracing.close()
+    self.assertEqual(['suite'],
+                     [event['name'] for event in self._read_events()])
+
+  def test_flush_periodically(self):
+    original_interval = suite_results.SuiteResultsTracing._FLUSH_INTERVAL
+    suite_results.SuiteResultsTracing._FLUSH_INTERVAL = 0.01
+    try:
+      tracing = suite_results.SuiteResultsTracing(
+          _FakeSuiteResults(), self._tracing_file)
+    finally:
+      suite_results.SuiteResultsTracing._FLUSH_INTERVAL = original_interval
+    tracing.finish_suite(_FakeScoreboard('suite'))
+    # The event is flushed without another event following it.
+    deadline = time.time() + 5
+    while time.time() < deadline:
+      with open(self._tracing_file) as f:
+        if '"suite"' in f.read():
+          break
+      time.sleep(0.01)
+    else:
+      self.fail('The event is not flushed.')
+    tracing.close()
+
+  def test_no_events(self):
+    tracing = suite_results.SuiteResultsTracing(
+        _FakeSuiteResults(), self._tracing_file)
+    tracing.close()
+    self.assertEqual([], self._read_events())
+
+
 if __name__ == '__main__':
   unittest.main()
@@ -9,6 +9,9 @@ import re
 
 from src.build.util.test import flags
 
+# Characters which have a special meaning in fnmatch patterns.
+_GLOB_SPECIAL_CHARS_RE = re.compile(r'[*?[]')
+
 
 def _build_re(pattern_list):
   """Builds a regular expression string from |pattern_list|.
@@ -31,15 +34,79 @@ def _build_re(pattern_list):
                for pattern in pattern_list))
 
 
+def _is_literal(pattern):
+  return not _GLOB_SPECIAL_CHARS_RE.search(pattern)
+
+
+class _PatternIndex(object):
+  """Matches a name against a list of glob patterns.
+
+  It is equivalent to:
+
+    any(fnmatch.fnmatchcase(name, pattern) for pattern in pattern_list)
+
+  but most patterns are either exact test names or a literal prefix followed
+  by a single trailing "*" (run_integration_tests appends "*" to any pattern
+  without one). Exact names are kept in a set, and prefixes in a character
+  trie, so that matching those costs O(len(name)) regardless of how many
+  patterns are given. Only the remaining general patterns fall back to a
+  combined regular expression.
+  """
+  # Key in a trie node, which marks that a prefix pattern ends at the node.
+  # Trie edges are single characters, so this never collides with them.
+  _TERMINAL = ''
+
+  def __init__(self, pattern_list):
+    self._exact_names = set()
+    self._prefix_trie = {}
+    self._match_all = False
+    general_pattern_list = []
+    for pattern in pattern_list:
+      if pattern == '*':
+        self._match_all = True
+      elif _is_literal(pattern):
+        self._exact_names.add(pattern)
+      elif pattern.endswith('*') and _is_literal(pattern[:-1]):
+        self._add_prefix(pattern[:-1])
+      else:
+        general_pattern_list.append(pattern)
+    self._general_re = (
+        _build_re(general_pattern_list) if general_pattern_list else None)
+
+  def _add_prefix(self, prefix):
+    node = self._prefix_trie
+    for c in prefix:
+      node = node.setdefault(c, {})
+    node[_PatternIndex._TERMINAL] = True
+
+  def _match_prefix(self, name):
+    node = self._prefix_trie
+    if not node:
+      return False
+    for c in name:
+      if _PatternIndex._TERMINAL in node:
+        return True
+      node = node.get(c)
+      if node is None:
+        return False
+    return _PatternIndex._TERMINAL in node
+
+  def match(self, name):
+    return bool(self._match_all or
+                name in self._exact_names or
+                self._match_prefix(name) or
+                (self._general_re and self._general_re.match(name)))
+
+
 class TestListFilter(object):
   def __init__(self, include_pattern_list=None, exclude_pattern_list=None):
     # By default we include all test names and exclude none of them.
-    self._include_re = _build_re(include_pattern_list or ['*'])
-    self._exclude_re = _build_re(exclude_pattern_list or [])
+    self._include_index = _PatternIndex(include_pattern_list or ['*'])
+    self._exclude_index = _PatternIndex(exclude_pattern_list or [])
 
   def should_include(self, test_name):
-    return (bool(self._include_re.match(test_name) and
-                 not self._exclude_re.match(test_name)))
+    return (self._include_index.match(test_name) and
+            not self._exclude_index.match(test_name))
 
 
 class TestRunFilter(object):
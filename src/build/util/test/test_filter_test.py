@@ -2,6 +2,7 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 
+import fnmatch
 import unittest
 
 from src.build.util.test import flags
@@ -68,6 +69,31 @@ class TestListFilterTest(unittest.TestCase):
     # Mathes with no patterns.
     self.assertFalse(instance.should_include('unknown-test-name'))
 
+  def test_matches_fnmatch(self):
+    # Exact names, prefix patterns and general glob patterns are handled by
+    # different code paths. All of them should agree with fnmatch.
+    pattern_list = ['suite1:Class#test1', 'suite2:*', 'suite3:Class#*',
+                    'suite3:Class', 'suite4:*#test?', 'suite5:[ab]*',
+                    'suite6*', 'suite6:Long#name*']
+    name_list = ['', 'suite1:Class#test1', 'suite1:Class#test10',
+                 'suite1:Class#test', 'suite2:', 'suite2:Class#test1',
+                 'suite3:Class', 'suite3:Class#', 'suite3:Class#test1',
+                 'suite3:Clas', 'suite4:Class#test1', 'suite4:Class#test12',
+                 'suite5:a', 'suite5:b#test', 'suite5:c', 'suite6',
+                 'suite6:Long#name1', 'suite7:Class#test1']
+    instance = test_filter.TestListFilter(include_pattern_list=pattern_list)
+    for name in name_list:
+      self.assertEquals(
+          any(fnmatch.fnmatchcase(name, pattern) for pattern in pattern_list),
+          instance.should_include(name), name)
+
+    instance = test_filter.TestListFilter(exclude_pattern_list=pattern_list)
+    for name in name_list:
+      self.assertEquals(
+          not any(fnmatch.fnmatchcase(name, pattern)
+                  for pattern in pattern_list),
+          instance.should_include(name), name)
+
 
 class TestRunFilterTest(unittest.TestCase):
   def test_should_run(self):